@@ -71,6 +71,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware_session.SlidingSessionMiddleware',  # Renueva expiración sin escribir en cada request
+    'core.middleware_metrics.RequestMetricsMiddleware',  # Consultas SQL y latencia por request
     'core.middleware.CompanyMiddleware',  # Multi-tenant middleware
     'core.middleware_security.SecurityAlertMiddleware',  # Detección cambio IP
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -143,9 +145,63 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 
+# Cache: local-memory por defecto (tests/desarrollo, un solo proceso). Producción
+# exige un backend compartido (CACHE_URL en production.py) para que las
+# invalidaciones por usuario y por empresa sean visibles en todos los workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pymes-default',
+    }
+}
+# Segundos que viven los datos cacheados por empresa (KPIs del dashboard, etc.);
+# se invalidan antes al cambiar las operaciones de la empresa
+TENANT_CACHE_TIMEOUT = int(os.getenv('TENANT_CACHE_TIMEOUT') or config('TENANT_CACHE_TIMEOUT', default='300'))
+# Segundos que CompanyMiddleware reutiliza la membresía resuelta de un usuario
+# (se invalida además al guardar/borrar Membership o Company)
+MEMBERSHIP_CACHE_TIMEOUT = 60
+# Segundos que cada proceso reutiliza la CompanySettings de una empresa
+# (config_app.services; se invalida además al guardarla, en todos los procesos
+# solo con un caché compartido)
+COMPANY_SETTINGS_CACHE_TTL = 30
+# Listados con paginación por cursor (core.utils.pagination): se cuentan como
+# máximo estas filas para el total aproximado ("Más de N resultados"); 0 = sin conteo
+KEYSET_PAGINATION_COUNT_LIMIT = 1000
+
+# Instrumentación de requests (core.middleware_metrics.RequestMetricsMiddleware)
+REQUEST_METRICS_ENABLED = str(config('REQUEST_METRICS_ENABLED', default='True')).lower() in ('1', 'true', 'yes')
+# Requests más lentas que este umbral (ms) se registran en el log 'performance'
+REQUEST_METRICS_SLOW_MS = int(config('REQUEST_METRICS_SLOW_MS', default='500'))
+# Muestras recientes que se guardan por vista para calcular p50/p95/p99
+REQUEST_METRICS_SAMPLES = 1000
+
+# Auditoría (core.utils.audit): en modo asíncrono las entradas se encolan al
+# confirmar la transacción y un thread las inserta con bulk_create cada
+# AUDIT_LOG_FLUSH_INTERVAL segundos o al juntar AUDIT_LOG_BATCH_SIZE.
+# Síncrono por defecto (tests/desarrollo); producción lo activa.
+AUDIT_LOG_ASYNC = False
+AUDIT_LOG_BATCH_SIZE = 200
+AUDIT_LOG_FLUSH_INTERVAL = 2.0
+# Destino de archive_audit_logs (archivos mensuales .jsonl.gz por empresa)
+AUDIT_ARCHIVE_DIR = config('AUDIT_ARCHIVE_DIR', default=str(BASE_DIR / 'archives' / 'audit'))
+
+# Reportes en segundo plano (reports.models.ReportJob + manage.py run_report_worker).
+# Los archivos se guardan en MEDIA_ROOT/report_jobs/ y se borran pasadas REPORT_JOB_TTL_HOURS.
+REPORT_WORKER_PROCESSES = int(config('REPORT_WORKER_PROCESSES', default='2'))
+REPORT_WORKER_POLL_INTERVAL = 2.0
+REPORT_JOB_TTL_HOURS = int(config('REPORT_JOB_TTL_HOURS', default='24'))
+# Segundos tras los cuales un trabajo "Generando" se da por fallido (worker caído)
+REPORT_JOB_TIMEOUT = 900
+
 # Session settings
+# Backend: db (default), cached_db (lecturas desde caché) o signed_cookies (sin tabla;
+# la sesión no se puede revocar del lado servidor hasta que expira)
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.db')
 SESSION_COOKIE_AGE = 86400  # 24 horas
-SESSION_SAVE_EVERY_REQUEST = True
+# La sesión solo se guarda si cambian sus datos; la expiración deslizante la
+# renueva core.middleware_session.SlidingSessionMiddleware cada SESSION_REFRESH_INTERVAL
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = int(config('SESSION_REFRESH_INTERVAL', default='300'))  # segundos
 
 # Security headers (siempre activos; producción añade SSL/HSTS)
 SECURE_BROWSER_XSS_FILTER = True
@@ -171,6 +227,9 @@ handler500 = 'core.views.handler500'
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
+# Importación masiva (core.utils.bulk_import): tamaño máximo del archivo subido.
+# Por encima de FILE_UPLOAD_MAX_MEMORY_SIZE Django lo guarda en un temporal y se lee en stream.
+IMPORT_MAX_UPLOAD_SIZE = 52428800  # 50MB
 
 # Logging configuration base
 # Se extiende en development.py y production.py
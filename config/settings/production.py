@@ -4,6 +4,8 @@ Django production settings.
 Configuración para entorno de producción.
 """
 
+from django.core.exceptions import ImproperlyConfigured
+
 from .base import *
 try:
     from decouple import config
@@ -31,6 +33,27 @@ DATABASES = {
     )
 }
 
+# Cache compartido entre workers (ej. redis://127.0.0.1:6379/1), obligatorio: las
+# membresías cacheadas (core.utils.tenant), los KPIs por empresa y la configuración
+# de cada empresa se invalidan con versiones guardadas en el caché. Con el
+# local-memory de base.py cada worker vería solo sus propias invalidaciones (una
+# membresía revocada seguiría autorizada en los demás hasta que venza su entrada).
+CACHE_URL = config('CACHE_URL', default='')
+if not CACHE_URL:
+    raise ImproperlyConfigured(
+        'CACHE_URL es obligatorio en producción: se necesita un caché compartido '
+        'entre workers (ej. redis://127.0.0.1:6379/1).'
+    )
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    }
+}
+
+# Auditoría asíncrona por lotes (ver base.py)
+AUDIT_LOG_ASYNC = config('AUDIT_LOG_ASYNC', default=True, cast=bool)
+
 # Security settings (headers XSS/NOSNIFF/X_FRAME en base.py; aquí SSL/HSTS)
 SECURE_SSL_REDIRECT = config('SECURE_SSL_REDIRECT', default=True, cast=bool)
 SESSION_COOKIE_SECURE = True
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ConfigAppConfig(AppConfig):
     name = 'config_app'
+
+    def ready(self):
+        from config_app import signals  # noqa: F401
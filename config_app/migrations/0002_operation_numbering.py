@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companysettings',
+            name='operation_number_padding',
+            field=models.PositiveSmallIntegerField(default=6, help_text='Se completa con ceros a la izquierda (6 → 000001).', verbose_name='Dígitos del número de operación'),
+        ),
+        migrations.AddField(
+            model_name='companysettings',
+            name='purchase_number_prefix',
+            field=models.CharField(blank=True, default='', help_text='Ej: "C-". Vacío = solo el número.', max_length=20, verbose_name='Prefijo de numeración de compras'),
+        ),
+        migrations.AddField(
+            model_name='companysettings',
+            name='sale_number_prefix',
+            field=models.CharField(blank=True, default='', help_text='Ej: "V-". Vacío = solo el número.', max_length=20, verbose_name='Prefijo de numeración de ventas'),
+        ),
+    ]
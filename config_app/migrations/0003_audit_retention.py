@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config_app', '0002_operation_numbering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companysettings',
+            name='audit_retention_days',
+            field=models.PositiveIntegerField(default=365, help_text='Los registros más viejos se archivan con archive_audit_logs. 0 = conservar siempre.', verbose_name='Retención del log de auditoría (días)'),
+        ),
+    ]
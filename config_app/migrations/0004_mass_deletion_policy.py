@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config_app', '0003_audit_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companysettings',
+            name='mass_deletion_threshold',
+            field=models.PositiveIntegerField(default=3, help_text='Alerta de seguridad al superar esta cantidad de eliminaciones/cancelaciones en la ventana.', verbose_name='Umbral de eliminaciones masivas'),
+        ),
+        migrations.AddField(
+            model_name='companysettings',
+            name='mass_deletion_window_minutes',
+            field=models.PositiveIntegerField(default=10, verbose_name='Ventana de eliminaciones masivas (minutos)'),
+        ),
+    ]
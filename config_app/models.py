@@ -30,6 +30,39 @@ class CompanySettings(models.Model):
         default='01-01',
         help_text='Formato: MM-DD'
     )
+    sale_number_prefix = models.CharField(
+        'Prefijo de numeración de ventas',
+        max_length=20,
+        blank=True,
+        default='',
+        help_text='Ej: "V-". Vacío = solo el número.'
+    )
+    purchase_number_prefix = models.CharField(
+        'Prefijo de numeración de compras',
+        max_length=20,
+        blank=True,
+        default='',
+        help_text='Ej: "C-". Vacío = solo el número.'
+    )
+    operation_number_padding = models.PositiveSmallIntegerField(
+        'Dígitos del número de operación',
+        default=6,
+        help_text='Se completa con ceros a la izquierda (6 → 000001).'
+    )
+    audit_retention_days = models.PositiveIntegerField(
+        'Retención del log de auditoría (días)',
+        default=365,
+        help_text='Los registros más viejos se archivan con archive_audit_logs. 0 = conservar siempre.'
+    )
+    mass_deletion_threshold = models.PositiveIntegerField(
+        'Umbral de eliminaciones masivas',
+        default=3,
+        help_text='Alerta de seguridad al superar esta cantidad de eliminaciones/cancelaciones en la ventana.'
+    )
+    mass_deletion_window_minutes = models.PositiveIntegerField(
+        'Ventana de eliminaciones masivas (minutos)',
+        default=10
+    )
     custom_fields = models.JSONField('Campos personalizados', default=dict, blank=True)
     updated_at = models.DateTimeField('Fecha de actualización', auto_now=True)
     
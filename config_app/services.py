@@ -0,0 +1,88 @@
+"""
+Servicios del módulo config_app: acceso memoizado a CompanySettings.
+
+La configuración de la empresa se lee en caminos calientes (cada recálculo de
+totales pide la tasa de impuesto, cada alta de operación el formato de número).
+get_company_settings la resuelve en tres niveles:
+
+1. Request: se memoiza en la instancia de Company recibida (las vistas y los
+   servicios de una request comparten request.current_company).
+2. Proceso: diccionario por empresa con TTL (settings.COMPANY_SETTINGS_CACHE_TTL),
+   validado contra la versión del caché por empresa (core.utils.cache). Con un
+   caché compartido (obligatorio en producción, ver CACHE_URL) un cambio hecho en
+   otro proceso invalida la copia local sin esperar al TTL; con local-memory la
+   versión es por proceso y los demás procesos lo ven recién al vencer el TTL.
+3. Base de datos.
+
+Guardar o borrar una CompanySettings (config_app.signals) invalida los tres
+niveles. Las actualizaciones masivas (QuerySet.update) no disparan señales: quien
+las haga debe llamar a invalidate_company_settings. Los objetos devueltos se
+comparten entre requests del proceso: son de solo lectura.
+"""
+
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from core.utils.cache import bump_tenant_version, get_tenant_version
+
+from .models import CompanySettings
+
+COMPANY_SETTINGS_CACHE_NAMESPACE = 'company_settings'
+
+# Atributo de la instancia de Company donde se memoiza durante la request
+_MEMO_ATTR = '_company_settings_memo'
+_UNSET = object()
+
+# company_id -> (versión, vence (monotonic), CompanySettings | None)
+_process_cache = {}
+
+
+def get_company_settings_ttl():
+    """Vida de la copia por proceso en segundos (settings.COMPANY_SETTINGS_CACHE_TTL)."""
+    return getattr(settings, 'COMPANY_SETTINGS_CACHE_TTL', 30)
+
+
+def get_company_settings(company):
+    """
+    CompanySettings de la empresa (o None si no tiene), como máximo una consulta
+    por request. Acepta una instancia de Company o su id.
+    """
+    company_id = getattr(company, 'pk', company)
+    if company_id is None:
+        return None
+    memo = getattr(company, _MEMO_ATTR, _UNSET)
+    if memo is not _UNSET:
+        return memo
+
+    version = get_tenant_version(company_id, COMPANY_SETTINGS_CACHE_NAMESPACE)
+    now = time.monotonic()
+    entry = _process_cache.get(company_id)
+    if entry is not None and entry[0] == version and entry[1] > now:
+        company_settings = entry[2]
+    else:
+        company_settings = CompanySettings.objects.filter(company_id=company_id).first()
+        _process_cache[company_id] = (version, now + get_company_settings_ttl(), company_settings)
+
+    if hasattr(company, 'pk'):
+        setattr(company, _MEMO_ATTR, company_settings)
+    return company_settings
+
+
+def invalidate_company_settings(company):
+    """
+    Descarta la configuración cacheada de la empresa: la copia del proceso y la
+    memoizada en la instancia (si se pasa una), e incrementa la versión compartida
+    ya y al confirmar la transacción actual (para los demás procesos).
+    """
+    company_id = getattr(company, 'pk', company)
+    if hasattr(company, _MEMO_ATTR):
+        delattr(company, _MEMO_ATTR)
+
+    def _bump():
+        _process_cache.pop(company_id, None)
+        bump_tenant_version(company_id, COMPANY_SETTINGS_CACHE_NAMESPACE)
+
+    _bump()
+    transaction.on_commit(_bump)
@@ -0,0 +1,27 @@
+"""
+Señales del módulo config_app.
+Invalidan la configuración cacheada (config_app.services) cuando cambia una
+CompanySettings o se crea una Company.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Company
+
+from .models import CompanySettings
+from .services import invalidate_company_settings
+
+
+@receiver([post_save, post_delete], sender=CompanySettings)
+def company_settings_changed(sender, instance, **kwargs):
+    # Si la relación está cargada, limpiar también la memoización de esa instancia
+    company = instance.company if CompanySettings.company.is_cached(instance) else instance.company_id
+    invalidate_company_settings(company)
+
+
+@receiver(post_save, sender=Company)
+def company_created(sender, instance, created=False, **kwargs):
+    # Un id nuevo no debe heredar una entrada previa (ids reutilizados, ej. tras un rollback)
+    if created:
+        invalidate_company_settings(instance.pk)
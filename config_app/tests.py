@@ -1,3 +1,73 @@
-from django.test import TestCase
+"""
+Tests del módulo config_app.
+Verifica el acceso memoizado a CompanySettings.
+"""
 
-# Create your tests here.
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from config_app.models import CompanySettings
+from config_app.services import get_company_settings, invalidate_company_settings
+from core.models import Company
+from customers.models import Customer
+from operations.services import add_item_to_operation, create_operation, get_company_tax_rate
+from products.models import Product
+
+
+class CompanySettingsCacheTestCase(TestCase):
+    """Tests de config_app.services.get_company_settings."""
+    
+    def setUp(self):
+        self.company = Company.objects.create(name='Empresa Config', active=True)
+        self.settings = CompanySettings.objects.create(company=self.company, tax_rate_default=Decimal('21.00'))
+    
+    def _settings_queries(self, captured):
+        return [q for q in captured.captured_queries if 'config_app_companysettings' in q['sql']]
+    
+    def test_memoized_per_instance_and_per_process(self):
+        """Una consulta la primera vez; después ni la misma instancia ni otra de la empresa consultan."""
+        with self.assertNumQueries(1):
+            self.assertEqual(get_company_settings(self.company), self.settings)
+        with self.assertNumQueries(0):
+            get_company_settings(self.company)
+        other_instance = Company.objects.get(pk=self.company.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_company_settings(other_instance).tax_rate_default, Decimal('21.00'))
+    
+    def test_save_and_explicit_invalidation(self):
+        """Guardar invalida; update() masivo requiere invalidate_company_settings."""
+        self.assertEqual(get_company_tax_rate(self.company), Decimal('21.00'))
+        self.settings.tax_rate_default = Decimal('10.50')
+        self.settings.save()
+        self.assertEqual(get_company_tax_rate(self.company), Decimal('10.50'))
+        
+        CompanySettings.objects.filter(pk=self.settings.pk).update(tax_rate_default=Decimal('5.00'))
+        self.assertEqual(get_company_tax_rate(self.company), Decimal('10.50'))
+        invalidate_company_settings(self.company)
+        self.assertEqual(get_company_tax_rate(self.company), Decimal('5.00'))
+        
+        self.settings.delete()
+        self.assertEqual(get_company_tax_rate(self.company), Decimal('0.00'))
+    
+    @override_settings(COMPANY_SETTINGS_CACHE_TTL=0)
+    def test_process_copy_expires(self):
+        """Vencido el TTL, otra instancia vuelve a consultar."""
+        get_company_settings(self.company)
+        with self.assertNumQueries(1):
+            get_company_settings(self.company.pk)
+    
+    def test_item_changes_read_settings_once(self):
+        """Agregar varias líneas a una operación lee la configuración una sola vez."""
+        customer = Customer.objects.create(company=self.company, code='C001', name='Cliente')
+        product = Product.objects.create(company=self.company, code='P001', name='Producto', price=Decimal('10.00'))
+        invalidate_company_settings(self.company)
+        with CaptureQueriesContext(connection) as captured:
+            operation = create_operation(company=self.company, type='sale', date='2024-01-01', customer=customer)
+            for _ in range(3):
+                add_item_to_operation(operation, product, Decimal('1'), Decimal('10.00'))
+        self.assertEqual(len(self._settings_queries(captured)), 1)
+        operation.refresh_from_db()
+        self.assertEqual(operation.total, Decimal('36.30'))
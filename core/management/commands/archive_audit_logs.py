@@ -0,0 +1,71 @@
+"""
+Management command para archivar el log de auditoría según la retención por empresa.
+
+Uso:
+    python manage.py archive_audit_logs
+    python manage.py archive_audit_logs --company-id=1 --dry-run
+    python manage.py archive_audit_logs --days=90 --batch-size=5000
+
+Mueve los AuditLog más viejos que CompanySettings.audit_retention_days a
+archivos mensuales JSON Lines + gzip en AUDIT_ARCHIVE_DIR y los borra de la tabla.
+Pensado para correr periódicamente (cron).
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import Company
+from core.utils.audit_archive import archive_company_audit_logs, get_archive_dir
+
+
+class Command(BaseCommand):
+    help = 'Archiva (JSON Lines + gzip, por mes) y borra los registros de auditoría fuera de la retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='ID de la empresa a archivar (por defecto: todas)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Retención en días para esta corrida (por defecto: la de cada empresa)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Registros por lote (default: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informa cuántos registros se archivarían'
+        )
+
+    def handle(self, *args, **options):
+        company_id = options.get('company_id')
+        dry_run = options['dry_run']
+
+        companies = Company.objects.all().order_by('id')
+        if company_id:
+            companies = companies.filter(id=company_id)
+            if not companies.exists():
+                self.stdout.write(self.style.ERROR(f'Empresa con ID {company_id} no existe.'))
+                return
+
+        total = 0
+        for company in companies:
+            archived = archive_company_audit_logs(
+                company,
+                retention_days=options.get('days'),
+                batch_size=options['batch_size'],
+                dry_run=dry_run,
+            )
+            total += archived
+            self.stdout.write(f'  {company.name}: {archived} registros')
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f'✓ {total} registros a archivar (sin cambios)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ {total} registros archivados en {get_archive_dir()}'))
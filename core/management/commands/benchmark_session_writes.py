@@ -0,0 +1,90 @@
+"""
+Management command para medir escrituras de sesión por request.
+
+Uso:
+    python manage.py benchmark_session_writes --username=admin
+    python manage.py benchmark_session_writes --username=admin --requests=100 --path=/dashboard/data/
+
+Ejecuta la misma serie de GET autenticados dos veces con el cliente de pruebas de
+Django: "antes" (SESSION_SAVE_EVERY_REQUEST = True, comportamiento anterior) y
+"después" (configuración actual), contando INSERT/UPDATE sobre la tabla de sesiones.
+Con backends sin tabla (signed_cookies) las escrituras son siempre 0.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+
+
+class _SessionWriteCounter:
+    """execute_wrapper que cuenta INSERT/UPDATE sobre la tabla de sesiones."""
+
+    def __init__(self):
+        self.table = Session._meta.db_table
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        statement = sql.lstrip().upper()
+        if self.table.upper() in statement and statement.startswith(('INSERT', 'UPDATE')):
+            self.writes += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Compara escrituras de sesión por request antes y después de eliminar SESSION_SAVE_EVERY_REQUEST'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            required=True,
+            help='Usuario con el que se hacen las requests (debe tener empresa activa)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Cantidad de requests por corrida (default: 50)'
+        )
+        parser.add_argument(
+            '--path',
+            default='/dashboard/data/',
+            help='Ruta a consultar (default: /dashboard/data/, el polling HTMX del dashboard)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            self.stdout.write(self.style.ERROR(f'Usuario {options["username"]} no existe.'))
+            return
+
+        count = options['requests']
+        path = options['path']
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+
+        before = self._run(user, path, count, host, SESSION_SAVE_EVERY_REQUEST=True)
+        after = self._run(user, path, count, host)
+
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        self.stdout.write(self.style.SUCCESS('ESCRITURAS DE SESIÓN'))
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        self.stdout.write(f'Ruta: {path} - {count} requests - backend: {settings.SESSION_ENGINE}')
+        self.stdout.write(f'Antes  (SESSION_SAVE_EVERY_REQUEST=True): {before} escrituras ({before / count:.2f}/request)')
+        self.stdout.write(f'Después (configuración actual):        {after} escrituras ({after / count:.2f}/request)')
+
+    def _run(self, user, path, count, host, **overrides):
+        """Hace `count` GET autenticados y retorna las escrituras de sesión (sin contar el login)."""
+        with override_settings(**overrides):
+            client = Client(HTTP_HOST=host)
+            client.force_login(user)
+            # Primera request: selecciona empresa y guarda la IP (escrituras esperables)
+            client.get(path, secure=not settings.DEBUG)
+            counter = _SessionWriteCounter()
+            with connection.execute_wrapper(counter):
+                for _ in range(count):
+                    client.get(path, secure=not settings.DEBUG)
+            client.logout()
+        return counter.writes
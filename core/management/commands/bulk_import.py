@@ -0,0 +1,91 @@
+"""
+Management command para importar productos, clientes o proveedores desde CSV/XLSX.
+
+Uso:
+    python manage.py bulk_import products catalogo.csv --company-id=1
+    python manage.py bulk_import customers clientes.xlsx --company-id=1 --dry-run
+    python manage.py bulk_import suppliers proveedores.csv --company-id=1 --batch-size=5000
+
+Mismas reglas que la importación desde la web (core.utils.bulk_import): upsert
+por (empresa, código) en lotes y errores informados por número de línea.
+"""
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company
+from core.utils.bulk_import import IMPORT_BATCH_SIZE, IMPORTERS, detect_import_format, get_importer_class
+
+
+class Command(BaseCommand):
+    help = 'Importa productos, clientes o proveedores desde un archivo CSV o XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'importer',
+            choices=sorted(IMPORTERS),
+            help='Qué importar'
+        )
+        parser.add_argument(
+            'path',
+            help='Ruta del archivo .csv o .xlsx'
+        )
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            required=True,
+            help='ID de la empresa destino'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo validar, sin guardar cambios'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Filas por lote (default: {IMPORT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        company_id = options['company_id']
+        company = Company.objects.filter(id=company_id).first()
+        if company is None:
+            self.stdout.write(self.style.ERROR(f'Empresa con ID {company_id} no existe.'))
+            return
+
+        path = options['path']
+        importer = get_importer_class(options['importer'])(company, batch_size=options['batch_size'])
+        try:
+            fmt = detect_import_format(path)
+            with open(path, 'rb') as fileobj:
+                result = importer.run(fileobj, fmt, dry_run=options['dry_run'])
+        except OSError as exc:
+            raise CommandError(f'No se pudo abrir {path}: {exc}')
+        except ValidationError as exc:
+            # Los lotes escritos antes del error quedan guardados: informarlos y auditarlos
+            partial = importer.result
+            if partial is not None and not partial.dry_run and partial.imported:
+                importer.audit(partial, filename=path)
+                self.stdout.write(self.style.WARNING(
+                    f'  Antes del error: creados: {partial.created} | actualizados: {partial.updated}'
+                ))
+            raise CommandError(' '.join(exc.messages))
+
+        if not result.dry_run and result.imported:
+            importer.audit(result, filename=path)
+
+        for line, message in result.errors:
+            self.stdout.write(self.style.WARNING(f'  Línea {line}: {message}'))
+        if result.errors_truncated:
+            self.stdout.write(f'  ... y {result.error_count - len(result.errors)} errores más')
+
+        self.stdout.write(
+            f'  Filas: {result.total} | creados: {result.created} | '
+            f'actualizados: {result.updated} | con errores: {result.error_count}'
+        )
+        if result.dry_run:
+            self.stdout.write(self.style.SUCCESS('✓ Validación completa (no se guardaron cambios)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Importación de {importer.label} completa'))
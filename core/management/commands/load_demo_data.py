@@ -22,6 +22,7 @@ from django.utils import timezone
 from django.core.exceptions import ValidationError
 
 from core.models import Company, Membership
+from core.services import invalidate_dashboard_cache
 from config_app.models import CompanySettings
 from customers.models import Customer
 from suppliers.models import Supplier
@@ -359,6 +360,7 @@ class Command(BaseCommand):
                     )
                 if not operation.items.exists():
                     operation.delete()
+                    invalidate_dashboard_cache(company)
                     self._warning("Venta sin ítems válidos omitida.")
                     continue
                 confirm_operation(operation, user=user)
@@ -3,27 +3,31 @@ Management command para cargar datos masivos para stress test.
 
 Uso:
     python manage.py load_stress_test_data --company-id=1
+    python manage.py load_stress_test_data --company-id=1 --skip-operations
+    python manage.py load_stress_test_data --company-id=1 --operations=1000000 --items-per-op=5 --years=3
+    python manage.py load_stress_test_data --company-id 1 2 3 4 --processes=4 --seed=42
 
-Carga:
+Carga por defecto (configurable):
     - 500 clientes
     - 100 proveedores
     - 5000 productos/servicios
-    - 100 operaciones
+    - 100 operaciones en los últimos 6 meses
+
+Inserta con bulk_create por lotes, un lote por transacción (core.utils.stress_data).
+Con varias empresas y --processes, cada empresa se carga en un proceso aparte
+(solo PostgreSQL: SQLite bloquea la base entera en cada escritura).
 """
 
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from django.utils import timezone
-from datetime import datetime, timedelta
-from decimal import Decimal
-import random
+from django.db import connection, connections
 
+from core import stress_worker
 from core.models import Company
-from customers.models import Customer
-from suppliers.models import Supplier
-from products.models import Product
-from operations.models import Operation, OperationItem
-from operations.services import create_operation, add_item_to_operation, confirm_operation
+from core.utils.stress_data import STRESS_BATCH_SIZE, load_company
 
 
 class Command(BaseCommand):
@@ -33,420 +37,131 @@ class Command(BaseCommand):
         parser.add_argument(
             '--company-id',
             type=int,
+            nargs='+',
             required=True,
-            help='ID de la empresa para la cual cargar los datos'
+            help='ID de la empresa (o varias) para la cual cargar los datos'
+        )
+        parser.add_argument('--customers', type=int, default=500, help='Clientes a crear (default: 500)')
+        parser.add_argument('--suppliers', type=int, default=100, help='Proveedores a crear (default: 100)')
+        parser.add_argument('--products', type=int, default=5000, help='Productos/servicios a crear (default: 5000)')
+        parser.add_argument('--operations', type=int, default=100, help='Operaciones a crear (default: 100)')
+        parser.add_argument(
+            '--items-per-op',
+            type=int,
+            default=5,
+            help='Máximo de items por operación; cada una lleva entre 1 y este valor (default: 5)'
+        )
+        parser.add_argument(
+            '--years',
+            type=float,
+            default=0.5,
+            help='Período (hasta hoy) en el que se reparten las operaciones, en años (default: 0.5)'
         )
         parser.add_argument(
             '--skip-operations',
             action='store_true',
             help='Saltar la carga de operaciones (solo cargar clientes, proveedores y productos)'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=STRESS_BATCH_SIZE,
+            help=f'Filas por bulk_create y por transacción (default: {STRESS_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=0,
+            help='Procesos en paralelo, una empresa por proceso (0 = en este proceso; default: 0)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Semilla para generar siempre los mismos datos'
+        )
 
     def handle(self, *args, **options):
-        company_id = options['company_id']
-        skip_operations = options.get('skip_operations', False)
-        
-        try:
-            company = Company.objects.get(id=company_id)
-        except Company.DoesNotExist:
-            self.stdout.write(self.style.ERROR(f'Empresa con ID {company_id} no existe.'))
+        company_ids = list(dict.fromkeys(options['company_id']))
+        companies = {company.id: company for company in Company.objects.filter(id__in=company_ids)}
+        for company_id in company_ids:
+            if company_id not in companies:
+                self.stdout.write(self.style.ERROR(f'Empresa con ID {company_id} no existe.'))
+                return
+        if options['items_per_op'] < 1 or options['batch_size'] < 1:
+            self.stdout.write(self.style.ERROR('--items-per-op y --batch-size deben ser mayores a cero.'))
             return
-        
-        self.stdout.write(self.style.SUCCESS(f'Iniciando carga de datos para: {company.name}'))
-        
-        with transaction.atomic():
-            # FASE 1: Clientes (500)
-            self.stdout.write('Cargando 500 clientes...')
-            customers = self._create_customers(company, 500)
-            self.stdout.write(self.style.SUCCESS(f'✓ {len(customers)} clientes creados'))
-            
-            # FASE 2: Proveedores (100)
-            self.stdout.write('Cargando 100 proveedores...')
-            suppliers = self._create_suppliers(company, 100)
-            self.stdout.write(self.style.SUCCESS(f'✓ {len(suppliers)} proveedores creados'))
-            
-            # FASE 3: Productos/Servicios (5000)
-            self.stdout.write('Cargando 5000 productos/servicios...')
-            products = self._create_products(company, 5000)
-            self.stdout.write(self.style.SUCCESS(f'✓ {len(products)} productos/servicios creados'))
-            
-            # FASE 4: Operaciones (100)
-            if not skip_operations:
-                self.stdout.write('Cargando 100 operaciones...')
-                operations = self._create_operations(company, customers, suppliers, products, 100)
-                self.stdout.write(self.style.SUCCESS(f'✓ {len(operations)} operaciones creadas'))
+
+        volumes = {
+            'customers': options['customers'],
+            'suppliers': options['suppliers'],
+            'products': options['products'],
+            'operations': 0 if options['skip_operations'] else options['operations'],
+            'items_per_op': options['items_per_op'],
+            'years': options['years'],
+        }
+        if options['skip_operations']:
+            self.stdout.write(self.style.WARNING('Operaciones omitidas (--skip-operations)'))
+
+        processes = min(max(options['processes'], 0), len(company_ids))
+        if processes and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite no admite escrituras en paralelo: se carga de a una empresa.'))
+            processes = 0
+
+        try:
+            if processes:
+                self._run_pool(company_ids, companies, volumes, options, processes)
             else:
-                self.stdout.write(self.style.WARNING('Operaciones omitidas (--skip-operations)'))
-        
+                self._run_inline(company_ids, companies, volumes, options)
+        except ValidationError as exc:
+            self.stdout.write(self.style.ERROR(' '.join(exc.messages)))
+            return
+
         self.stdout.write(self.style.SUCCESS('\n✓ Carga de datos completada exitosamente'))
 
-    def _create_customers(self, company, count):
-        """Crea clientes con datos realistas de Argentina."""
-        customers = []
-        
-        # Nombres y apellidos comunes en Argentina
-        nombres = [
-            'Juan', 'María', 'Carlos', 'Ana', 'Luis', 'Laura', 'Pedro', 'Sofía',
-            'Diego', 'Valentina', 'Martín', 'Camila', 'Andrés', 'Lucía', 'Fernando',
-            'Isabella', 'Roberto', 'Emma', 'Javier', 'Olivia', 'Miguel', 'Mía',
-            'Ricardo', 'Sara', 'Gustavo', 'Elena', 'Daniel', 'Carmen', 'Alejandro', 'Rosa'
-        ]
-        
-        apellidos = [
-            'García', 'Rodríguez', 'González', 'Fernández', 'López', 'Martínez',
-            'Sánchez', 'Pérez', 'Gómez', 'Martín', 'Jiménez', 'Ruiz', 'Hernández',
-            'Díaz', 'Moreno', 'Muñoz', 'Álvarez', 'Romero', 'Alonso', 'Gutiérrez',
-            'Navarro', 'Torres', 'Domínguez', 'Vázquez', 'Ramos', 'Gil', 'Ramírez',
-            'Serrano', 'Blanco', 'Suárez'
-        ]
-        
-        # Razones sociales comunes
-        razones_sociales = [
-            'Comercial', 'Distribuidora', 'Servicios', 'Industrias', 'Construcciones',
-            'Inversiones', 'Importadora', 'Exportadora', 'Logística', 'Tecnología'
-        ]
-        
-        # Localidades argentinas
-        localidades = [
-            'Buenos Aires', 'Córdoba', 'Rosario', 'Mendoza', 'Tucumán',
-            'La Plata', 'Mar del Plata', 'Salta', 'Santa Fe', 'San Juan'
-        ]
-        
-        # Distribución: 20% frecuentes, 60% normales, 20% ocasionales
-        frecuentes_count = int(count * 0.2)
-        normales_count = int(count * 0.6)
-        ocasionales_count = count - frecuentes_count - normales_count
-        
-        customer_id = 1
-        
-        # Clientes frecuentes (personas físicas y empresas)
-        for i in range(frecuentes_count):
-            is_company = random.choice([True, False])
-            
-            if is_company:
-                name = f"{random.choice(razones_sociales)} {random.choice(apellidos)} S.A."
-                tax_id = f"30-{random.randint(10000000, 99999999)}-{random.randint(1, 9)}"
-            else:
-                name = f"{random.choice(nombres)} {random.choice(apellidos)}"
-                tax_id = f"{random.randint(20000000, 49999999)}"
-            
-            customer = Customer.objects.create(
-                company=company,
-                code=f"CLI-{customer_id:06d}",
-                name=name,
-                tax_id=tax_id,
-                email=f"cliente{customer_id}@example.com",
-                phone=f"+54 11 {random.randint(1000, 9999)}-{random.randint(1000, 9999)}",
-                address=f"{random.choice(['Av.', 'Calle', 'Bv.'])} {random.randint(100, 9999)} {random.choice(localidades)}, Buenos Aires",
-                active=True
-            )
-            customers.append(customer)
-            customer_id += 1
-        
-        # Clientes normales
-        for i in range(normales_count):
-            is_company = random.choice([True, False])
-            
-            if is_company:
-                name = f"{random.choice(razones_sociales)} {random.choice(apellidos)} S.R.L."
-                tax_id = f"30-{random.randint(10000000, 99999999)}-{random.randint(1, 9)}"
-            else:
-                name = f"{random.choice(nombres)} {random.choice(apellidos)}"
-                tax_id = f"{random.randint(20000000, 49999999)}"
-            
-            customer = Customer.objects.create(
-                company=company,
-                code=f"CLI-{customer_id:06d}",
-                name=name,
-                tax_id=tax_id,
-                email=f"cliente{customer_id}@example.com",
-                phone=f"+54 11 {random.randint(1000, 9999)}-{random.randint(1000, 9999)}",
-                address=f"{random.choice(['Av.', 'Calle', 'Bv.'])} {random.randint(100, 9999)} {random.choice(localidades)}, Buenos Aires",
-                active=True
-            )
-            customers.append(customer)
-            customer_id += 1
-        
-        # Clientes ocasionales
-        for i in range(ocasionales_count):
-            is_company = random.choice([True, False])
-            
-            if is_company:
-                name = f"{random.choice(razones_sociales)} {random.choice(apellidos)}"
-                tax_id = f"30-{random.randint(10000000, 99999999)}-{random.randint(1, 9)}"
-            else:
-                name = f"{random.choice(nombres)} {random.choice(apellidos)}"
-                tax_id = f"{random.randint(20000000, 49999999)}"
-            
-            customer = Customer.objects.create(
-                company=company,
-                code=f"CLI-{customer_id:06d}",
-                name=name,
-                tax_id=tax_id,
-                email=f"cliente{customer_id}@example.com",
-                phone=f"+54 11 {random.randint(1000, 9999)}-{random.randint(1000, 9999)}",
-                address=f"{random.choice(['Av.', 'Calle', 'Bv.'])} {random.randint(100, 9999)} {random.choice(localidades)}, Buenos Aires",
-                active=True
-            )
-            customers.append(customer)
-            customer_id += 1
-        
-        return customers
+    def _seed(self, options, company_id):
+        """Semilla por empresa (la misma empresa recibe los mismos datos en paralelo o no)."""
+        return None if options['seed'] is None else options['seed'] + company_id
 
-    def _create_suppliers(self, company, count):
-        """Crea proveedores con datos realistas."""
-        suppliers = []
-        
-        rubros = [
-            'Insumos Industriales', 'Materiales de Construcción', 'Equipamiento',
-            'Servicios Técnicos', 'Logística y Transporte', 'Tecnología',
-            'Materias Primas', 'Herramientas', 'Repuestos', 'Suministros'
-        ]
-        
-        razones_sociales = [
-            'Distribuidora', 'Proveedora', 'Comercial', 'Industrias', 'Importadora',
-            'Suministros', 'Servicios', 'Tecnología', 'Logística', 'Equipamientos'
-        ]
-        
-        apellidos = [
-            'García', 'Rodríguez', 'González', 'Fernández', 'López', 'Martínez',
-            'Sánchez', 'Pérez', 'Gómez', 'Martín', 'Jiménez', 'Ruiz', 'Hernández',
-            'Díaz', 'Moreno', 'Muñoz', 'Álvarez', 'Romero', 'Alonso', 'Gutiérrez'
-        ]
-        
-        localidades = [
-            'Buenos Aires', 'Córdoba', 'Rosario', 'Mendoza', 'Tucumán',
-            'La Plata', 'Mar del Plata', 'Salta', 'Santa Fe', 'San Juan'
-        ]
-        
-        for i in range(count):
-            rubro = random.choice(rubros)
-            razon = random.choice(razones_sociales)
-            apellido = random.choice(apellidos)
-            
-            name = f"{razon} {rubro} {apellido} S.A."
-            tax_id = f"30-{random.randint(10000000, 99999999)}-{random.randint(1, 9)}"
-            
-            supplier = Supplier.objects.create(
-                company=company,
-                code=f"PROV-{i+1:04d}",
-                name=name,
-                tax_id=tax_id,
-                email=f"proveedor{i+1}@example.com",
-                phone=f"+54 11 {random.randint(1000, 9999)}-{random.randint(1000, 9999)}",
-                address=f"{random.choice(['Av.', 'Calle', 'Bv.'])} {random.randint(100, 9999)} {random.choice(localidades)}, Buenos Aires",
-                active=True
-            )
-            suppliers.append(supplier)
-        
-        return suppliers
+    def _summary(self, company, result):
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {company.name}: {result['customers']} clientes, {result['suppliers']} proveedores, "
+            f"{result['products']} productos/servicios, {result['operations']} operaciones "
+            f"({result['items']} items) en {result['seconds']}s"
+        ))
 
-    def _create_products(self, company, count):
-        """Crea productos y servicios con datos realistas."""
-        products = []
-        
-        # 70% productos, 30% servicios
-        productos_count = int(count * 0.7)
-        servicios_count = count - productos_count
-        
-        # Categorías de productos
-        categorias_productos = [
-            'Tornillo', 'Tuerca', 'Arandela', 'Perno', 'Clavo', 'Remache',
-            'Repuesto', 'Componente', 'Material', 'Insumo', 'Herramienta',
-            'Equipo', 'Máquina', 'Dispositivo', 'Accesorio', 'Pieza',
-            'Rodamiento', 'Válvula', 'Manguera', 'Cable', 'Filtro',
-            'Bomba', 'Motor', 'Transmisión', 'Sistema', 'Módulo'
-        ]
-        
-        tipos_productos = [
-            'galvanizado', 'inoxidable', 'acerado', 'plástico', 'aluminio',
-            'hierro', 'cobre', 'bronce', 'niquelado', 'cromado',
-            'estándar', 'premium', 'industrial', 'comercial', 'residencial'
-        ]
-        
-        medidas = ['3cm', '5cm', '10cm', '15cm', '20cm', '25cm', '30cm', '1/2"', '3/4"', '1"']
-        
-        # Categorías de servicios
-        categorias_servicios = [
-            'Mantenimiento', 'Reparación', 'Instalación', 'Consultoría',
-            'Soporte', 'Capacitación', 'Auditoría', 'Diseño', 'Desarrollo',
-            'Implementación', 'Configuración', 'Monitoreo', 'Optimización',
-            'Análisis', 'Testing', 'Migración', 'Integración', 'Seguridad'
-        ]
-        
-        tipos_servicios = [
-            'mensual', 'trimestral', 'anual', 'por hora', 'por proyecto',
-            'preventivo', 'correctivo', 'emergencia', 'programado', 'express'
-        ]
-        
-        product_id = 1
-        
-        # Crear productos
-        for i in range(productos_count):
-            categoria = random.choice(categorias_productos)
-            tipo = random.choice(tipos_productos)
-            medida = random.choice(medidas)
-            
-            # Alta rotación: 20%, Media: 50%, Baja: 30%
-            rotacion = random.choices(
-                ['alta', 'media', 'baja'],
-                weights=[20, 50, 30]
-            )[0]
-            
-            if rotacion == 'alta':
-                price = Decimal(random.uniform(100, 5000))
-            elif rotacion == 'media':
-                price = Decimal(random.uniform(5000, 50000))
-            else:
-                price = Decimal(random.uniform(50000, 500000))
-            
-            name = f"{categoria} {tipo} {medida}"
-            code = f"PROD-{product_id:06d}"
-            
-            product = Product.objects.create(
-                company=company,
-                code=code,
-                name=name,
-                type='product',
-                description=f"Producto {categoria.lower()} de calidad {tipo}",
-                price=price,
-                unit_of_measure=random.choice(['unidad', 'kg', 'm', 'm²', 'm³', 'litro']),
-                stock=Decimal(random.uniform(0, 1000)) if random.random() > 0.3 else None,
-                active=True
+    def _run_inline(self, company_ids, companies, volumes, options):
+        for company_id in company_ids:
+            company = companies[company_id]
+            self.stdout.write(self.style.SUCCESS(f'Iniciando carga de datos para: {company.name}'))
+            result = load_company(
+                company_id,
+                volumes,
+                batch_size=options['batch_size'],
+                seed=self._seed(options, company_id),
+                log=self.stdout.write,
             )
-            products.append(product)
-            product_id += 1
-        
-        # Crear servicios
-        for i in range(servicios_count):
-            categoria = random.choice(categorias_servicios)
-            tipo = random.choice(tipos_servicios)
-            
-            # Servicios con precios más altos
-            price = Decimal(random.uniform(5000, 200000))
-            
-            name = f"Servicio de {categoria} {tipo}"
-            code = f"SERV-{product_id:06d}"
-            
-            product = Product.objects.create(
-                company=company,
-                code=code,
-                name=name,
-                type='service',
-                description=f"Servicio profesional de {categoria.lower()}",
-                price=price,
-                unit_of_measure='hora' if 'por hora' in tipo else 'unidad',
-                active=True
-            )
-            products.append(product)
-            product_id += 1
-        
-        return products
+            self._summary(company, result)
 
-    def _create_operations(self, company, customers, suppliers, products, count):
-        """Crea operaciones distribuidas en los últimos 6 meses."""
-        operations = []
-        
-        # 70% ventas, 30% compras
-        ventas_count = int(count * 0.7)
-        compras_count = count - ventas_count
-        
-        # Fechas distribuidas en los últimos 6 meses
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=180)
-        
-        # Obtener usuario admin o crear uno temporal
-        from django.contrib.auth.models import User
-        try:
-            user = User.objects.filter(is_superuser=True).first()
-            if not user:
-                user = User.objects.first()
-        except:
-            user = None
-        
-        # Crear ventas
-        for i in range(ventas_count):
-            # Fecha aleatoria en el rango
-            days_offset = random.randint(0, 180)
-            date = start_date + timedelta(days=days_offset)
-            
-            # Cliente aleatorio
-            customer = random.choice(customers)
-            
-            # Crear operación
-            operation = create_operation(
-                company=company,
-                type='sale',
-                date=date,
-                customer=customer,
-                created_by=user
-            )
-            
-            # Agregar items (1-5 items por operación)
-            num_items = random.randint(1, 5)
-            operation_products = random.sample(products, min(num_items, len(products)))
-            
-            for product in operation_products:
-                quantity = Decimal(random.uniform(1, 100))
-                unit_price = product.price * Decimal(random.uniform(0.8, 1.2))  # Variación de precio
-                
-                add_item_to_operation(
-                    operation=operation,
-                    product=product,
-                    quantity=quantity,
-                    unit_price=unit_price
-                )
-            
-            # Confirmar algunas operaciones (80% confirmadas, 20% borrador)
-            if random.random() < 0.8:
-                try:
-                    confirm_operation(operation, user=user)
-                except:
-                    pass  # Si falla, queda en borrador
-            
-            operations.append(operation)
-        
-        # Crear compras
-        for i in range(compras_count):
-            # Fecha aleatoria en el rango
-            days_offset = random.randint(0, 180)
-            date = start_date + timedelta(days=days_offset)
-            
-            # Proveedor aleatorio
-            supplier = random.choice(suppliers)
-            
-            # Crear operación
-            operation = create_operation(
-                company=company,
-                type='purchase',
-                date=date,
-                supplier=supplier,
-                created_by=user
-            )
-            
-            # Agregar items (1-5 items por operación)
-            num_items = random.randint(1, 5)
-            operation_products = random.sample(products, min(num_items, len(products)))
-            
-            for product in operation_products:
-                quantity = Decimal(random.uniform(1, 100))
-                unit_price = product.price * Decimal(random.uniform(0.7, 0.95))  # Precio de compra menor
-                
-                add_item_to_operation(
-                    operation=operation,
-                    product=product,
-                    quantity=quantity,
-                    unit_price=unit_price
+    def _run_pool(self, company_ids, companies, volumes, options, processes):
+        self.stdout.write(self.style.SUCCESS(f'Iniciando carga de {len(company_ids)} empresas en {processes} procesos'))
+        # spawn: los procesos hijos no heredan conexiones a la base del padre
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=context,
+            initializer=stress_worker.init_worker_process,
+        ) as executor:
+            futures = [
+                executor.submit(
+                    stress_worker.load_company,
+                    company_id,
+                    volumes,
+                    batch_size=options['batch_size'],
+                    seed=self._seed(options, company_id),
                 )
-            
-            # Confirmar algunas operaciones (80% confirmadas, 20% borrador)
-            if random.random() < 0.8:
-                try:
-                    confirm_operation(operation, user=user)
-                except:
-                    pass  # Si falla, queda en borrador
-            
-            operations.append(operation)
-        
-        return operations
-
+                for company_id in company_ids
+            ]
+            for future in as_completed(futures):
+                company_id, result = future.result()
+                self._summary(companies[company_id], result)
@@ -0,0 +1,48 @@
+"""
+Management command para recalcular los documentos de búsqueda.
+
+Uso:
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --company-id=1
+    python manage.py rebuild_search_index --batch-size=5000
+
+Necesario después de cargas masivas (bulk_create / update), que no disparan las
+señales que mantienen core.SearchDocument al día.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import Company
+from core.utils.search import SEARCH_BATCH_SIZE, get_searchable_models, model_label, rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los documentos de búsqueda de clientes, proveedores, productos y operaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='ID de la empresa a reindexar (por defecto: todas)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEARCH_BATCH_SIZE,
+            help=f'Registros por lote (default: {SEARCH_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        company_id = options.get('company_id')
+        if company_id:
+            company = Company.objects.filter(id=company_id).first()
+            if company is None:
+                self.stdout.write(self.style.ERROR(f'Empresa con ID {company_id} no existe.'))
+                return
+
+        for model in get_searchable_models():
+            total = rebuild_search_documents(model, company=company, batch_size=options['batch_size'])
+            self.stdout.write(f'  {model_label(model)}: {total} documentos')
+
+        self.stdout.write(self.style.SUCCESS('✓ Índice de búsqueda reconstruido'))
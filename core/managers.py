@@ -28,6 +28,15 @@ class CompanyQuerySet(models.QuerySet):
             raise Http404('El objeto no existe o no pertenece a su empresa.')
         return obj
 
+    def search(self, term, ranked=False):
+        """
+        Filtra por texto sobre los documentos de búsqueda del modelo
+        (core.utils.search): cada palabra del término debe aparecer en los
+        search_fields. Con ranked=True anota search_rank y ordena por relevancia.
+        """
+        from core.utils.search import search_queryset
+        return search_queryset(self, term, ranked=ranked)
+
 
 class CompanyManager(models.Manager):
     """
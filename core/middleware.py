@@ -7,7 +7,7 @@ GARANTIZA que request.current_company siempre sea válida o None.
 import logging
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.auth.models import AnonymousUser
-from core.models import Membership, Company
+from core.utils.tenant import get_active_membership
 from core.utils.request import get_client_ip
 
 logger = logging.getLogger('security')
@@ -60,17 +60,12 @@ class CompanyMiddleware(MiddlewareMixin):
             company_id = request.session.get('current_company_id')
             
             if company_id:
-                try:
-                    # Verificar que la membresía existe y está activa
-                    membership = Membership.objects.select_related('company').get(
-                        user=request.user,
-                        company_id=company_id,
-                        active=True,
-                        company__active=True  # También verificar que la empresa esté activa
-                    )
+                # Verificar que la membresía existe y está activa (cacheada, ver core.utils.tenant)
+                membership = get_active_membership(request.user, company_id)
+                if membership:
                     request.current_company = membership.company
                     request.current_membership = membership
-                except Membership.DoesNotExist:
+                else:
                     # Si la membresía no existe o no está activa, limpiar sesión
                     if 'current_company_id' in request.session:
                         del request.session['current_company_id']
@@ -84,11 +79,7 @@ class CompanyMiddleware(MiddlewareMixin):
                     )
                     
                     # Buscar la primera membresía activa disponible
-                    membership = Membership.objects.select_related('company').filter(
-                        user=request.user,
-                        active=True,
-                        company__active=True
-                    ).first()
+                    membership = get_active_membership(request.user)
                     
                     if membership:
                         request.current_company = membership.company
@@ -108,11 +99,7 @@ class CompanyMiddleware(MiddlewareMixin):
                         )
             else:
                 # Si no hay empresa en sesión, buscar la primera membresía activa
-                membership = Membership.objects.select_related('company').filter(
-                    user=request.user,
-                    active=True,
-                    company__active=True
-                ).first()
+                membership = get_active_membership(request.user)
                 
                 if membership:
                     request.current_company = membership.company
@@ -0,0 +1,79 @@
+"""
+Middleware de instrumentación: consultas SQL y latencia por request.
+
+Para cada request mide la cantidad de consultas, el tiempo total en SQL y el
+tiempo de respuesta; los expone en el header Server-Timing, registra en el log
+'performance' las requests más lentas que settings.REQUEST_METRICS_SLOW_MS y
+acumula percentiles por vista en core.utils.metrics.request_metrics.
+Se instala justo antes de CompanyMiddleware para medir también la resolución
+de la empresa. Funciona con DEBUG=False (usa execute_wrapper, no connection.queries).
+"""
+
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core.utils.metrics import request_metrics
+
+logger = logging.getLogger('performance')
+
+
+class _QueryCounter:
+    """execute_wrapper que cuenta consultas y acumula su duración."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide consultas SQL y latencia de cada request.
+    Se desactiva con settings.REQUEST_METRICS_ENABLED = False.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        counter = _QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+        sql_ms = counter.duration * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name if match else None) or '<sin resolver>'
+        company = getattr(request, 'current_company', None)
+
+        response['Server-Timing'] = (
+            f'db;dur={sql_ms:.1f};desc="{counter.count} queries", '
+            f'app;dur={max(duration_ms - sql_ms, 0):.1f}, '
+            f'total;dur={duration_ms:.1f}'
+        )
+        request_metrics.record(view_name, duration_ms, counter.count, sql_ms)
+
+        if duration_ms >= getattr(settings, 'REQUEST_METRICS_SLOW_MS', 500):
+            logger.warning(
+                f'Request lenta. view={view_name}, path={request.path}, method={request.method}, '
+                f'status={response.status_code}, company_id={company.pk if company else None}, '
+                f'duration_ms={duration_ms:.1f}, queries={counter.count}, sql_ms={sql_ms:.1f}'
+            )
+        return response
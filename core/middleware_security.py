@@ -32,12 +32,12 @@ class SecurityAlertMiddleware(MiddlewareMixin):
             return None
 
         last_ip = request.session.get(SESSION_KEY_LAST_IP)
-        request.session[SESSION_KEY_LAST_IP] = current_ip
-
-        if last_ip is None:
+        if last_ip == current_ip:
+            # Sin cambios: no tocar la sesión (evita escribirla en cada request)
             return None
 
-        if last_ip == current_ip:
+        request.session[SESSION_KEY_LAST_IP] = current_ip
+        if last_ip is None:
             return None
 
         company = getattr(request, 'current_company', None)
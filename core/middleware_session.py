@@ -0,0 +1,33 @@
+"""
+Middleware de sesión con expiración deslizante.
+
+Con SESSION_SAVE_EVERY_REQUEST = False la sesión solo se escribe cuando cambian
+sus datos. Para que una sesión activa no expire a las SESSION_COOKIE_AGE desde
+el login, este middleware la marca como modificada a lo sumo una vez cada
+settings.SESSION_REFRESH_INTERVAL segundos: así se renueva la expiración sin
+escribir en cada request (polling HTMX, fragmentos de listados, etc.).
+Debe ejecutarse después de SessionMiddleware y AuthenticationMiddleware.
+"""
+
+import time
+
+from django.conf import settings
+
+SESSION_KEY_REFRESHED_AT = 'session_refreshed_at'
+
+
+class SlidingSessionMiddleware:
+    """Renueva la expiración de la sesión autenticada como máximo una vez por intervalo."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            now = int(time.time())
+            interval = getattr(settings, 'SESSION_REFRESH_INTERVAL', 300)
+            refreshed_at = request.session.get(SESSION_KEY_REFRESHED_AT, 0)
+            if now - refreshed_at >= interval:
+                request.session[SESSION_KEY_REFRESHED_AT] = now
+        return self.get_response(request)
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_auditlog_timestamp_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='core_auditl_user_id_2a1528_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['company', 'user', '-timestamp'], name='core_auditl_company_522200_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['company', 'action', '-timestamp'], name='core_auditl_company_949666_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.utils.search import create_search_index, drop_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_auditlog_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID del objeto')),
+                ('content', models.TextField(blank=True, verbose_name='Contenido')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Documento de búsqueda',
+                'verbose_name_plural': 'Documentos de búsqueda',
+                'indexes': [models.Index(fields=['company', 'model'], name='core_search_company_5f743e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id'), name='searchdocument_unique_object')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
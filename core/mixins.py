@@ -102,6 +102,31 @@ class CompanyContextMixin:
         return get_client_ip(self.request)
 
 
+class KeysetPaginationMixin:
+    """
+    Paginación por cursor (core.utils.pagination.KeysetPaginator) para ListView.
+    Reemplaza OFFSET + COUNT(*) por index seeks: ?cursor=<...> en lugar de ?page=N.
+    Las vistas definen:
+    - keyset_ordering: orden del listado, terminado en un campo único (ej. ('name', 'id'))
+    - keyset_count_limit: tope del conteo aproximado (None = settings; 0 = sin conteo)
+    """
+    keyset_ordering = ('id',)
+    keyset_count_limit = None
+    cursor_kwarg = 'cursor'
+    
+    def paginate_queryset(self, queryset, page_size):
+        """Devuelve (paginator, page, object_list, is_paginated) como ListView."""
+        from core.utils.pagination import KeysetPaginator
+        paginator = KeysetPaginator(
+            queryset,
+            page_size,
+            self.keyset_ordering,
+            count_limit=self.keyset_count_limit,
+        )
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
 class HTMXResponseMixin:
     """
     Mixin para detectar requests HTMX y devolver templates parciales.
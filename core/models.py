@@ -85,7 +85,8 @@ class AuditLog(models.Model):
     model_name = models.CharField('Modelo', max_length=100)
     object_id = models.CharField('ID del objeto', max_length=100, blank=True, null=True)
     changes = models.JSONField('Cambios', default=dict, blank=True)
-    timestamp = models.DateTimeField('Fecha y hora', auto_now_add=True)
+    # default (no auto_now_add): las entradas encoladas conservan la hora del evento
+    timestamp = models.DateTimeField('Fecha y hora', default=timezone.now)
     ip_address = models.GenericIPAddressField('Dirección IP', blank=True, null=True)
     
     class Meta:
@@ -94,7 +95,10 @@ class AuditLog(models.Model):
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['company', '-timestamp']),
-            models.Index(fields=['user', '-timestamp']),
+            # Actividad de un usuario en la empresa por rango de tiempo (investigación de alertas)
+            models.Index(fields=['company', 'user', '-timestamp']),
+            # Alertas de seguridad del dashboard: company + action, más recientes primero
+            models.Index(fields=['company', 'action', '-timestamp']),
             models.Index(fields=['model_name', '-timestamp']),
         ]
     
@@ -143,3 +147,34 @@ class CompanyModelMixin(models.Model):
         indexes = [
             models.Index(fields=['company']),
         ]
+
+
+class SearchDocument(models.Model):
+    """
+    Documento de búsqueda de un registro (cliente, proveedor, producto u operación).
+
+    content es el texto normalizado (minúsculas, sin acentos) de los campos
+    declarados en `search_fields` del modelo; se mantiene con señales
+    (core.signals) y se consulta con CompanyQuerySet.search(). Sobre esta tabla
+    se crea el índice de texto del motor (FTS5 trigram en SQLite, pg_trgm en
+    PostgreSQL), ver core.utils.search.
+    """
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='search_documents')
+    model = models.CharField('Modelo', max_length=100)
+    object_id = models.PositiveBigIntegerField('ID del objeto')
+    content = models.TextField('Contenido', blank=True)
+    updated_at = models.DateTimeField('Fecha de actualización', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Documento de búsqueda'
+        verbose_name_plural = 'Documentos de búsqueda'
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='searchdocument_unique_object'),
+        ]
+        indexes = [
+            models.Index(fields=['company', 'model']),
+        ]
+
+    def __str__(self):
+        return f'{self.model}#{self.object_id}'
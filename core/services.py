@@ -0,0 +1,316 @@
+"""
+Servicios del módulo core.
+Motor de KPIs del dashboard: concentra en pocas consultas fijas todos los
+indicadores que usan DashboardView, DashboardDataView y ExportDashboardPDFView.
+Los resultados se cachean por empresa y se invalidan por eventos
+(confirmar/cancelar operaciones, altas/bajas/cambios de clientes y productos).
+"""
+
+from datetime import datetime, timedelta
+
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+from core.models import Company
+from core.utils.cache import get_or_set_tenant_cache, invalidate_tenant_cache
+
+
+DASHBOARD_CACHE_NAMESPACE = 'dashboard'
+
+PERIOD_CHOICES = ('7d', 'this_month', 'last_month')
+DEFAULT_PERIOD = 'this_month'
+
+# Moneda de los montos del dashboard si la empresa no tiene CompanySettings
+DEFAULT_CURRENCY = 'ARS'
+
+
+def normalize_period(period):
+    """Devuelve el período si es válido; si no, el período por defecto ('this_month')."""
+    return period if period in PERIOD_CHOICES else DEFAULT_PERIOD
+
+
+def get_company_currency(company):
+    """Moneda de la empresa (CompanySettings memoizada, ver config_app.services)."""
+    from config_app.services import get_company_settings
+    settings = get_company_settings(company)
+    return (settings.currency if settings is not None else '') or DEFAULT_CURRENCY
+
+
+def get_period_dates(period, today=None):
+    """Devuelve (start_date, end_date, period_label) para period in ('7d', 'this_month', 'last_month')."""
+    today = today or datetime.now().date()
+    if period == '7d':
+        start = today - timedelta(days=6)
+        return start, today, 'Últimos 7 días'
+    if period == 'this_month':
+        start = today.replace(day=1)
+        return start, today, 'Este Mes'
+    if period == 'last_month':
+        first_this = today.replace(day=1)
+        last_prev = first_this - timedelta(days=1)
+        start = last_prev.replace(day=1)
+        return start, last_prev, 'Mes Pasado'
+    start = today.replace(day=1)
+    return start, today, 'Este Mes'
+
+
+def _count_subquery(queryset):
+    """Subquery escalar COUNT(*) correlacionada con Company (0 si no hay filas)."""
+    counted = (
+        queryset.filter(company=OuterRef('pk'))
+        .order_by()
+        .values('company')
+        .annotate(c=Count('id'))
+        .values('c')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+class DashboardKPIService:
+    """
+    Calcula los KPIs del dashboard de una empresa para un período.
+
+    Consultas (fijas, independientes del período y del volumen de datos):
+    - operation_kpis: una pasada de agregación condicional sobre OperationDailySummary
+      (mes en curso, período, últimos 30 días y 30 días previos).
+    - catalogue_counts: una consulta con subqueries escalares (clientes activos,
+      productos activos y operaciones en borrador).
+    - chart_sales_vs_purchases / chart_top_customers: una consulta cada uno.
+    Los resultados se memorizan por instancia.
+    """
+
+    def __init__(self, company, period=DEFAULT_PERIOD, today=None):
+        self.company = company
+        self.period = normalize_period(period)
+        self.today = today or datetime.now().date()
+        self.start_date, self.end_date, self.period_label = get_period_dates(self.period, self.today)
+
+    def _windows(self):
+        """Ventanas de fechas (inicio, fin) usadas por los KPIs."""
+        return {
+            'month': (self.today.replace(day=1), self.today),
+            'period': (self.start_date, self.end_date),
+            'last_30': (self.today - timedelta(days=29), self.today),
+            'prev_30': (self.today - timedelta(days=59), self.today - timedelta(days=30)),
+        }
+
+    @cached_property
+    def operation_kpis(self):
+        """Totales y cantidades de operaciones confirmadas por ventana, en una sola consulta."""
+        from operations.models import OperationDailySummary
+
+        windows = self._windows()
+        aggregates = {}
+        for name, (start, end) in windows.items():
+            for type_, prefix in (('sale', 'sales'), ('purchase', 'purchases')):
+                window_q = Q(type=type_, date__gte=start, date__lte=end)
+                aggregates[f'{name}_{prefix}_total'] = Sum('total', filter=window_q)
+                aggregates[f'{name}_{prefix}_count'] = Sum('count', filter=window_q)
+
+        min_date = min(start for start, _ in windows.values())
+        max_date = max(end for _, end in windows.values())
+        result = (
+            OperationDailySummary.objects.for_company(self.company)
+            .filter(date__gte=min_date, date__lte=max_date)
+            .aggregate(**aggregates)
+        )
+        return {key: value or 0 for key, value in result.items()}
+
+    @cached_property
+    def catalogue_counts(self):
+        """Clientes activos, productos activos y operaciones en borrador, en una sola consulta."""
+        from customers.models import Customer
+        from operations.models import Operation
+        from products.models import Product
+
+        counts = (
+            Company.objects.filter(pk=self.company.pk)
+            .annotate(
+                active_customers=_count_subquery(Customer.objects.filter(active=True)),
+                active_products=_count_subquery(Product.objects.filter(active=True)),
+                pending_operations=_count_subquery(Operation.objects.filter(status='draft')),
+            )
+            .values('active_customers', 'active_products', 'pending_operations')
+            .first()
+        )
+        return counts or {'active_customers': 0, 'active_products': 0, 'pending_operations': 0}
+
+    def chart_sales_vs_purchases(self):
+        """Para cada día del período, total de ventas y compras confirmadas."""
+        from operations.models import OperationDailySummary
+
+        by_date = {}
+        rows = (
+            OperationDailySummary.objects.for_company(self.company)
+            .filter(date__gte=self.start_date, date__lte=self.end_date)
+            .values_list('date', 'type', 'total')
+        )
+        for date, type_, total in rows:
+            key = 'sales' if type_ == 'sale' else 'purchases'
+            by_date.setdefault(date, {'sales': 0, 'purchases': 0})[key] = float(total or 0)
+
+        days = []
+        d = self.start_date
+        while d <= self.end_date:
+            day = by_date.get(d, {})
+            days.append({
+                'date': d.isoformat(),
+                'date_label': d.strftime('%d/%m'),
+                'sales': day.get('sales', 0),
+                'purchases': day.get('purchases', 0),
+            })
+            d += timedelta(days=1)
+        return days
+
+    def chart_top_customers(self):
+        """Top 5 clientes por ventas confirmadas en el período."""
+        from customers.models import Customer
+
+        top = (
+            Customer.objects.for_company(self.company)
+            .filter(
+                operations__type='sale',
+                operations__status='confirmed',
+                operations__company=self.company,
+                operations__date__gte=self.start_date,
+                operations__date__lte=self.end_date,
+            )
+            .annotate(total_sales=Sum('operations__total'))
+            .order_by('-total_sales')[:5]
+        )
+        return [{'name': c.name, 'total': float(c.total_sales or 0)} for c in top]
+
+    def sales_trend(self):
+        """
+        Variación porcentual de ventas confirmadas: últimos 30 días vs 30 días previos.
+        Si no hubo ventas en los 30 días previos retorna 100.0 (o 0.0 si tampoco hay ahora).
+        """
+        sales_last_30 = self.operation_kpis['last_30_sales_total']
+        sales_prev_30 = self.operation_kpis['prev_30_sales_total']
+        if sales_prev_30 == 0:
+            if sales_last_30 > 0:
+                return 100.0  # Todo el crecimiento es "nuevo"
+            return 0.0
+        diff = float(sales_last_30) - float(sales_prev_30)
+        return round((diff / float(sales_prev_30)) * 100, 1)
+
+    def period_data(self, include_charts=True):
+        """
+        Datos del dashboard para el período: ventas/compras del período y (opcional) gráficos.
+        Se incluye en dashboard_context (ver get_dashboard_kpis).
+        """
+        kpis = self.operation_kpis
+        data = {
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'period_label': self.period_label,
+            'period': self.period,
+            'period_sales': kpis['period_sales_total'],
+            'period_purchases': kpis['period_purchases_total'],
+            'period_operations': kpis['period_sales_count'] + kpis['period_purchases_count'],
+        }
+        if include_charts:
+            data['chart_sales_vs_purchases'] = self.chart_sales_vs_purchases()
+            data['chart_top_customers'] = self.chart_top_customers()
+        return data
+
+    def dashboard_context(self):
+        """Contexto completo de KPIs para DashboardView (sin alertas de seguridad)."""
+        kpis = self.operation_kpis
+        counts = self.catalogue_counts
+        data = self.period_data()
+        return {
+            'start_date': data['start_date'],
+            'end_date': data['end_date'],
+            'sales_month_total': kpis['month_sales_total'],
+            'sales_month_count': kpis['month_sales_count'],
+            'purchases_month_total': kpis['month_purchases_total'],
+            'purchases_month_count': kpis['month_purchases_count'],
+            'pending_operations': counts['pending_operations'],
+            'active_customers': counts['active_customers'],
+            'active_products': counts['active_products'],
+            'period': data['period'],
+            'period_label': data['period_label'],
+            'period_sales': data['period_sales'],
+            'period_purchases': data['period_purchases'],
+            'period_operations': data['period_operations'],
+            'has_data': (
+                data['period_operations'] > 0
+                or counts['active_customers'] > 0
+                or counts['active_products'] > 0
+            ),
+            'ventas_tendencia': self.sales_trend(),
+            'chart_sales_vs_purchases': data['chart_sales_vs_purchases'],
+            'chart_top_customers': data['chart_top_customers'],
+        }
+
+
+def invalidate_dashboard_cache(company):
+    """Invalida los KPIs cacheados de la empresa (al confirmar la transacción en curso)."""
+    invalidate_tenant_cache(company, DASHBOARD_CACHE_NAMESPACE)
+
+
+def get_dashboard_kpis(company, period):
+    """
+    Contexto completo de KPIs del dashboard (ver DashboardKPIService.dashboard_context),
+    cacheado por (empresa, período, día, versión de la empresa).
+    """
+    service = DashboardKPIService(company, period)
+    return get_or_set_tenant_cache(
+        company,
+        DASHBOARD_CACHE_NAMESPACE,
+        ('kpis', service.period, service.today.isoformat()),
+        service.dashboard_context,
+    )
+
+
+def render_dashboard_pdf(company, period):
+    """
+    Genera el PDF del reporte del dashboard para el período: KPIs cacheados del
+    dashboard más las últimas 20 operaciones confirmadas del período.
+
+    Returns:
+        tuple: (contenido en bytes, nombre de archivo sugerido)
+
+    Raises:
+        ImportError: si xhtml2pdf no está instalado
+        RuntimeError: si xhtml2pdf no pudo generar el PDF
+    """
+    from io import BytesIO
+
+    from django.template.loader import render_to_string
+    from xhtml2pdf import pisa
+
+    from operations.models import Operation
+
+    period = normalize_period(period)
+    data = get_dashboard_kpis(company, period)
+    start_date = data['start_date']
+    end_date = data['end_date']
+
+    operations = (
+        Operation.objects.for_company(company)
+        .filter(date__gte=start_date, date__lte=end_date, status='confirmed')
+        .select_related('customer', 'supplier')
+        .order_by('-date', '-id')[:20]
+    )
+    context = {
+        'company_name': company.name,
+        'period_label': data['period_label'],
+        'period_sales': data['period_sales'],
+        'period_purchases': data['period_purchases'],
+        'period_operations': data['period_operations'],
+        'active_customers': data['active_customers'],
+        'active_products': data['active_products'],
+        'operations': operations,
+        'currency': get_company_currency(company),
+        'report_date': datetime.now(),
+    }
+    html = render_to_string('core/reports/dashboard_pdf.html', context)
+
+    result = BytesIO()
+    pisa_status = pisa.CreatePDF(BytesIO(html.encode('utf-8')), dest=result, encoding='utf-8')
+    if pisa_status.err:
+        raise RuntimeError('Error al generar el PDF.')
+    return result.getvalue(), f'reporte-dashboard-{period}-{end_date}.pdf'
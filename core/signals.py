@@ -0,0 +1,52 @@
+"""
+Señales del módulo core.
+Invalidan la membresía cacheada (core.utils.tenant) cuando cambia una
+Membership o una Company, para que una revocación o desactivación se aplique
+en la request siguiente, y mantienen los documentos de búsqueda
+(core.utils.search) de los modelos con search_fields.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Company, Membership
+from core.utils.search import (
+    delete_instance_document,
+    get_searchable_models,
+    index_instance,
+    model_label,
+    reindex_dependents,
+    search_fields_touched,
+)
+from core.utils.tenant import invalidate_user_memberships
+
+
+@receiver([post_save, post_delete], sender=Membership)
+def membership_changed(sender, instance, **kwargs):
+    invalidate_user_memberships([instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=Company)
+def company_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    user_ids = Membership.objects.filter(company_id=instance.pk).values_list('user_id', flat=True)
+    invalidate_user_memberships(user_ids)
+
+
+def search_document_saved(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not search_fields_touched(sender, update_fields):
+        return
+    if index_instance(instance) and not created:
+        reindex_dependents(instance)
+
+
+def search_document_deleted(sender, instance, **kwargs):
+    delete_instance_document(instance)
+
+
+for _model in get_searchable_models():
+    post_save.connect(search_document_saved, sender=_model, dispatch_uid=f'search_saved:{model_label(_model)}')
+    post_delete.connect(search_document_deleted, sender=_model, dispatch_uid=f'search_deleted:{model_label(_model)}')
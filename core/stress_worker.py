@@ -0,0 +1,22 @@
+"""
+Puntos de entrada de los procesos del pool de load_stress_test_data.
+
+Con el contexto spawn, cada proceso hijo importa este módulo antes de que Django
+esté configurado: por eso no importa modelos a nivel de módulo.
+"""
+
+import django
+
+
+def init_worker_process():
+    """Inicializa Django en el proceso hijo."""
+    django.setup()
+
+
+def load_company(company_id, volumes, batch_size, seed=None):
+    """Carga una empresa (core.utils.stress_data.load_company) con el avance prefijado por empresa."""
+    from core.utils.stress_data import load_company
+
+    def log(message):
+        print(f'[empresa {company_id}] {message}', flush=True)
+    return company_id, load_company(company_id, volumes, batch_size=batch_size, seed=seed, log=log)
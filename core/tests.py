@@ -3,13 +3,41 @@ Tests del módulo core.
 Verifica middleware multi-tenant y acceso de superuser.
 """
 
+import gzip
+import json
 import logging
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
 from unittest.mock import patch
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
-from core.models import Company, Membership
+from django.utils import timezone
+from config_app.models import CompanySettings
+from core.models import AuditLog, Company, Membership, SearchDocument
+from core.utils.bulk_import import get_importer_class
+from core.utils.audit import AuditLogWriter, audit_writer, build_audit_log, log_audit
+from core.utils.csv_export import CSV_ROWS_PER_BLOCK, export_csv_response
+from core.utils.metrics import RequestMetricsRegistry, request_metrics
+from core.utils.pagination import KeysetPaginator
+from core.utils.search import normalize_search_text
+from core.utils.security_services import check_anomalous_behavior
+from core.services import DashboardKPIService, get_dashboard_kpis, invalidate_dashboard_cache
 from customers.models import Customer
+from operations.models import Operation, OperationDailySummary, OperationSequence
+from operations.services import create_operation
+from products.models import Product
+from suppliers.models import Supplier
 
 
 class CompanyMiddlewareTestCase(TestCase):
@@ -249,3 +277,818 @@ class CompanyMiddlewareTestCase(TestCase):
         response2 = self.client.get(reverse('core:dashboard'))
         # Debe redirigir a login porque no está autenticado
         self.assertIn('login', response2.url)
+
+
+class DashboardKPIServiceTestCase(TestCase):
+    """Tests del motor de KPIs del dashboard."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        self.company = Company.objects.create(name='Empresa KPI', active=True)
+        self.today = date(2024, 3, 15)
+        Customer.objects.create(company=self.company, code='C001', name='Cliente 1', active=True)
+        Customer.objects.create(company=self.company, code='C002', name='Cliente 2', active=False)
+        Product.objects.create(company=self.company, code='P001', name='Producto 1', active=True)
+        OperationDailySummary.objects.create(
+            company=self.company, date=date(2024, 3, 10), type='sale', count=2, total=Decimal('300.00')
+        )
+        OperationDailySummary.objects.create(
+            company=self.company, date=date(2024, 2, 20), type='sale', count=1, total=Decimal('100.00')
+        )
+        OperationDailySummary.objects.create(
+            company=self.company, date=date(2024, 3, 1), type='purchase', count=1, total=Decimal('50.00')
+        )
+    
+    def test_kpis_are_computed_from_daily_summaries(self):
+        """Los KPIs del mes, del período y de catálogo son correctos."""
+        context = DashboardKPIService(self.company, 'this_month', today=self.today).dashboard_context()
+        
+        self.assertEqual(context['sales_month_total'], Decimal('300.00'))
+        self.assertEqual(context['sales_month_count'], 2)
+        self.assertEqual(context['purchases_month_total'], Decimal('50.00'))
+        self.assertEqual(context['period_operations'], 3)
+        self.assertEqual(context['active_customers'], 1)
+        self.assertEqual(context['active_products'], 1)
+        self.assertEqual(context['pending_operations'], 0)
+        
+        last_month = DashboardKPIService(self.company, 'last_month', today=self.today).period_data()
+        self.assertEqual(last_month['period_sales'], Decimal('100.00'))
+    
+    def test_query_count_is_constant_regardless_of_period(self):
+        """La cantidad de consultas no depende del período elegido."""
+        query_counts = set()
+        for period in ('7d', 'this_month', 'last_month'):
+            with CaptureQueriesContext(connection) as ctx:
+                DashboardKPIService(self.company, period, today=self.today).dashboard_context()
+            query_counts.add(len(ctx.captured_queries))
+        
+        self.assertEqual(len(query_counts), 1)
+        # KPIs de operaciones + conteos de catálogo + gráfico diario + top clientes
+        self.assertEqual(query_counts.pop(), 4)
+
+
+class DashboardCacheTestCase(TestCase):
+    """Tests del caché de KPIs por empresa con invalidación por versión."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        cache.clear()
+        self.company = Company.objects.create(name='Empresa Cache', active=True)
+        self.other_company = Company.objects.create(name='Otra Empresa', active=True)
+        Customer.objects.create(company=self.company, code='C001', name='Cliente 1', active=True)
+    
+    def test_second_call_is_served_from_cache(self):
+        """La segunda lectura de KPIs no ejecuta consultas."""
+        first = get_dashboard_kpis(self.company, 'this_month')
+        with self.assertNumQueries(0):
+            second = get_dashboard_kpis(self.company, 'this_month')
+        self.assertEqual(first, second)
+    
+    def test_invalidation_bumps_only_that_company(self):
+        """Invalidar una empresa recalcula sus KPIs sin afectar a otras."""
+        get_dashboard_kpis(self.company, 'this_month')
+        get_dashboard_kpis(self.other_company, 'this_month')
+        
+        Customer.objects.create(company=self.company, code='C002', name='Cliente 2', active=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_dashboard_cache(self.company)
+        
+        self.assertEqual(get_dashboard_kpis(self.company, 'this_month')['active_customers'], 2)
+        with self.assertNumQueries(0):
+            get_dashboard_kpis(self.other_company, 'this_month')
+
+    def test_new_draft_invalidates_pending_operations(self):
+        """Crear un borrador actualiza las operaciones pendientes del dashboard."""
+        self.assertEqual(get_dashboard_kpis(self.company, 'this_month')['pending_operations'], 0)
+
+        customer = Customer.objects.for_company(self.company).get(code='C001')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_operation(self.company, 'sale', timezone.now().date(), customer=customer)
+
+        self.assertEqual(get_dashboard_kpis(self.company, 'this_month')['pending_operations'], 1)
+
+
+class StreamingCSVExportTestCase(TestCase):
+    """Tests del exportador CSV en streaming."""
+    
+    def test_rows_are_consumed_lazily_in_blocks(self):
+        """Las filas se leen de un generador y se envían en bloques, con BOM al inicio."""
+        consumed = []
+        
+        def rows():
+            for i in range(CSV_ROWS_PER_BLOCK * 2 + 1):
+                consumed.append(i)
+                yield [i, f'fila {i}']
+        
+        response = export_csv_response('prueba', ['N', 'Texto'], rows())
+        self.assertTrue(response.streaming)
+        self.assertEqual(consumed, [])
+        
+        blocks = list(response.streaming_content)
+        self.assertTrue(blocks[0].startswith('\ufeff'.encode('utf-8')))
+        # Encabezado + 3 bloques de filas
+        self.assertEqual(len(blocks), 4)
+        self.assertIn(b'fila 1000', b''.join(blocks))
+
+
+class RequestMetricsTestCase(TestCase):
+    """Tests del middleware de instrumentación y del endpoint de métricas."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        request_metrics.reset()
+        self.superuser = User.objects.create_superuser(username='admin', password='testpass123')
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa Test', active=True)
+        Membership.objects.create(user=self.user, company=self.company, role='admin', active=True)
+    
+    def test_server_timing_header_and_per_view_metrics(self):
+        """Cada request expone Server-Timing y se acumula bajo el nombre de su vista."""
+        self.client.login(username='user1', password='testpass123')
+        response = self.client.get(reverse('core:dashboard'))
+        
+        self.assertIn('Server-Timing', response)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+, total;dur=[\d.]+')
+        rows = {row['view']: row for row in request_metrics.snapshot()}
+        self.assertEqual(rows['core:dashboard']['requests'], 1)
+        self.assertGreater(rows['core:dashboard']['avg_queries'], 0)
+    
+    @override_settings(REQUEST_METRICS_SLOW_MS=0)
+    def test_slow_requests_are_logged(self):
+        """Las requests por encima del umbral se registran en el log 'performance'."""
+        self.client.login(username='user1', password='testpass123')
+        with self.assertLogs('performance', level='WARNING') as logs:
+            self.client.get(reverse('core:dashboard'))
+        self.assertIn('view=core:dashboard', logs.output[0])
+        self.assertIn(f'company_id={self.company.pk}', logs.output[0])
+    
+    def test_metrics_endpoint_is_superuser_only(self):
+        """Solo un superusuario puede ver las métricas."""
+        self.client.login(username='user1', password='testpass123')
+        response = self.client.get(reverse('core:request_metrics'))
+        self.assertEqual(response.status_code, 302)
+        
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get(reverse('core:request_metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('views', response.json())
+    
+    def test_percentiles(self):
+        """p50/p95/p99 por rango más cercano sobre las muestras de la vista."""
+        registry = RequestMetricsRegistry(max_samples=100)
+        for ms in range(1, 101):
+            registry.record('v', float(ms), 2, 1.0)
+        row = registry.snapshot()[0]
+        self.assertEqual((row['p50_ms'], row['p95_ms'], row['p99_ms']), (50.0, 95.0, 99.0))
+        self.assertEqual(row['avg_queries'], 2.0)
+
+
+class CachedMembershipTestCase(TestCase):
+    """Tests de la membresía cacheada en CompanyMiddleware."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa Test', active=True)
+        self.membership = Membership.objects.create(
+            user=self.user, company=self.company, role='admin', active=True
+        )
+        self.client.login(username='user1', password='testpass123')
+        self.url = reverse('core:dashboard')
+    
+    def _membership_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        queries = [q['sql'] for q in ctx.captured_queries if 'core_membership' in q['sql']]
+        return response, queries
+    
+    def test_second_request_resolves_membership_without_queries(self):
+        """Tras la primera request, la empresa se resuelve sin consultar Membership."""
+        self._membership_queries()
+        response, queries = self._membership_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+        self.assertEqual(response.wsgi_request.current_company, self.company)
+        self.assertEqual(response.wsgi_request.current_membership.role, 'admin')
+    
+    def test_revoked_membership_applies_on_next_request(self):
+        """Desactivar la membresía invalida el caché: la request siguiente ya no tiene empresa."""
+        self._membership_queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.membership.active = False
+            self.membership.save()
+        
+        response, queries = self._membership_queries()
+        self.assertNotEqual(queries, [])
+        self.assertIsNone(response.wsgi_request.current_company)
+    
+    def test_deactivated_company_applies_on_next_request(self):
+        """Desactivar la empresa invalida el caché de sus miembros."""
+        self._membership_queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company.active = False
+            self.company.save()
+        
+        response, _ = self._membership_queries()
+        self.assertIsNone(response.wsgi_request.current_company)
+    
+    def test_role_change_applies_on_next_request(self):
+        """Un cambio de rol se ve en la request siguiente."""
+        self._membership_queries()
+        self.membership.role = 'viewer'
+        self.membership.save()
+        
+        response, _ = self._membership_queries()
+        self.assertEqual(response.wsgi_request.current_membership.role, 'viewer')
+
+
+class SessionWritesTestCase(TestCase):
+    """Las requests de lectura no deben escribir la sesión salvo que cambien sus datos."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa Test', active=True)
+        Membership.objects.create(user=self.user, company=self.company, role='admin', active=True)
+        self.client.login(username='user1', password='testpass123')
+        self.url = reverse('core:dashboard_data')
+        self.client.get(self.url)  # selecciona empresa y guarda la IP
+    
+    def _session_writes(self, requests=10, **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(requests):
+                self.client.get(self.url, **extra)
+        return sum(
+            1 for q in ctx.captured_queries
+            if 'django_session' in q['sql'] and q['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE'))
+        )
+    
+    def test_no_writes_before_and_after(self):
+        """Antes: una escritura por request. Ahora: ninguna mientras no cambie la sesión."""
+        with override_settings(SESSION_SAVE_EVERY_REQUEST=True):
+            self.assertEqual(self._session_writes(), 10)
+        self.assertEqual(self._session_writes(), 0)
+    
+    def test_sliding_expiry_refreshes_once_per_interval(self):
+        """Pasado SESSION_REFRESH_INTERVAL la sesión se renueva una sola vez."""
+        with patch('core.middleware_session.time.time', return_value=10 ** 10):
+            self.assertEqual(self._session_writes(), 1)
+    
+    def test_ip_change_still_writes_and_alerts(self):
+        """Un cambio de IP actualiza la sesión y registra la alerta."""
+        self.assertEqual(self._session_writes(requests=1, REMOTE_ADDR='10.0.0.99'), 1)
+        self.assertTrue(
+            AuditLog.objects.filter(company=self.company, action='security_alert').exists()
+        )
+
+
+@override_settings(AUDIT_LOG_ASYNC=True, AUDIT_LOG_FLUSH_INTERVAL=0, AUDIT_LOG_BATCH_SIZE=3)
+class AuditLogWriterTestCase(TestCase):
+    """Tests del modo asíncrono de auditoría (buffer + bulk_create)."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        self.company = Company.objects.create(name='Empresa Test', active=True)
+        audit_writer.flush()
+    
+    def tearDown(self):
+        audit_writer.flush()
+    
+    def _log(self, n=1):
+        for i in range(n):
+            log_audit(self.company, None, 'update', 'Product', object_id=i, changes={'password': 'x'})
+    
+    def test_entries_are_queued_on_commit_and_flushed_by_size(self):
+        """Las entradas se encolan al confirmar y se insertan juntas al llegar al tamaño de lote."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._log(2)
+        self.assertEqual(audit_writer.pending(), 2)
+        self.assertFalse(AuditLog.objects.exists())
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self._log(1)
+        self.assertEqual(audit_writer.pending(), 0)
+        self.assertEqual(AuditLog.objects.filter(company=self.company).count(), 3)
+        self.assertEqual(AuditLog.objects.first().changes, {'password': '[REDACTED]'})
+    
+    def test_rolled_back_entries_are_discarded(self):
+        """Si la transacción se revierte, sus entradas no se encolan."""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._log(1)
+                    raise RuntimeError('rollback')
+            except RuntimeError:
+                pass
+        self.assertEqual(audit_writer.pending(), 0)
+    
+    def test_shutdown_flushes_pending_entries(self):
+        """Al apagar el writer no se pierden las entradas encoladas."""
+        writer = AuditLogWriter()
+        writer._enqueue([build_audit_log(self.company, None, 'create', 'Customer', object_id=1)])
+        self.assertFalse(AuditLog.objects.exists())
+        writer.shutdown()
+        self.assertEqual(AuditLog.objects.filter(company=self.company, model_name='Customer').count(), 1)
+
+    
+    def test_invalid_entry_does_not_block_the_buffer(self):
+        """Una entrada que no se puede insertar se descarta sola; el resto del lote se guarda."""
+        writer = AuditLogWriter()
+        writer._buffer = [
+            build_audit_log(self.company, None, 'create', 'Customer', object_id=1),
+            build_audit_log(self.company, None, 'create', 'Customer', object_id=2, changes={'when': object()}),
+            build_audit_log(self.company, None, 'create', 'Customer', object_id=3),
+        ]
+        with self.assertLogs('core', level='ERROR'):
+            self.assertEqual(writer.flush(), 2)
+        self.assertEqual(writer.pending(), 0)
+        self.assertCountEqual(
+            AuditLog.objects.filter(company=self.company).values_list('object_id', flat=True), ['1', '3']
+        )
+
+class AuditArchiveTestCase(TestCase):
+    """Tests del archivado de auditoría por retención."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+        self.company = Company.objects.create(name='Empresa Test', active=True)
+        CompanySettings.objects.create(company=self.company, audit_retention_days=30)
+        now = timezone.now()
+        self.old = [
+            AuditLog.objects.create(
+                company=self.company, action='delete', model_name='Customer', object_id=str(i),
+                changes={'n': i}, timestamp=now - timedelta(days=days),
+            )
+            for i, days in enumerate([40, 41, 75])
+        ]
+        self.recent = AuditLog.objects.create(
+            company=self.company, action='update', model_name='Product', timestamp=now - timedelta(days=1),
+        )
+    
+    def _read_archive(self):
+        rows = []
+        company_dir = Path(self.archive_dir) / f'company_{self.company.pk}'
+        for path in sorted(company_dir.glob('audit_*.jsonl.gz')):
+            with gzip.open(path, 'rt', encoding='utf-8') as fh:
+                rows.extend(json.loads(line) for line in fh)
+        return rows
+    
+    def test_old_rows_are_archived_by_month_and_deleted(self):
+        """Los registros fuera de la retención pasan a archivos mensuales y salen de la tabla."""
+        with override_settings(AUDIT_ARCHIVE_DIR=self.archive_dir):
+            call_command('archive_audit_logs', '--batch-size=2', stdout=StringIO())
+        
+        self.assertEqual(list(AuditLog.objects.filter(company=self.company)), [self.recent])
+        rows = self._read_archive()
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(log.pk for log in self.old))
+        self.assertEqual({row['changes']['n'] for row in rows}, {0, 1, 2})
+        months = {log.timestamp.strftime('%Y-%m') for log in self.old}
+        files = {p.name for p in (Path(self.archive_dir) / f'company_{self.company.pk}').iterdir()}
+        self.assertEqual(files, {f'audit_{m}.jsonl.gz' for m in months})
+    
+    def test_dry_run_and_keep_forever(self):
+        """--dry-run no cambia nada y retención 0 conserva todo."""
+        out = StringIO()
+        with override_settings(AUDIT_ARCHIVE_DIR=self.archive_dir):
+            call_command('archive_audit_logs', '--dry-run', stdout=out)
+            self.assertIn('3 registros', out.getvalue())
+            self.assertEqual(AuditLog.objects.count(), 4)
+            
+            CompanySettings.objects.filter(company=self.company).update(audit_retention_days=0)
+            call_command('archive_audit_logs', stdout=StringIO())
+        self.assertEqual(AuditLog.objects.count(), 4)
+        self.assertEqual(self._read_archive(), [])
+
+
+class MassDeletionDetectorTestCase(TestCase):
+    """Tests del detector de eliminaciones masivas con contadores en caché."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        cache.clear()
+        # Los contadores en caché solo se usan con un caché compartido entre procesos
+        shared_cache = patch('core.utils.security_services.is_shared_cache', return_value=True)
+        shared_cache.start()
+        self.addCleanup(shared_cache.stop)
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa Test', active=True)
+    
+    def _alerts(self):
+        return AuditLog.objects.filter(
+            company=self.company, action='security_alert', changes__alert_type='MASS_DELETION'
+        )
+    
+    def test_one_alert_per_burst_without_reading_auditlog(self):
+        """Supera el umbral en la 4ª acción, alerta una vez y no consulta AuditLog."""
+        results = []
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(8):
+                results.append(check_anomalous_behavior(self.user, self.company))
+        self.assertEqual(results, [False, False, False, True, False, False, False, False])
+        self.assertFalse(any('SELECT' in q['sql'] and 'core_auditlog' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(self._alerts().count(), 1)
+        self.assertEqual(self._alerts().get().changes['count'], 4)
+    
+    def test_window_slides(self):
+        """Las acciones fuera de la ventana no cuentan."""
+        with patch('core.utils.security_services.time.time', return_value=60 * 1000):
+            for _ in range(3):
+                check_anomalous_behavior(self.user, self.company)
+        with patch('core.utils.security_services.time.time', return_value=60 * 1011):
+            self.assertFalse(check_anomalous_behavior(self.user, self.company))
+        self.assertFalse(self._alerts().exists())
+    
+    def test_threshold_per_company(self):
+        """El umbral y la ventana salen de CompanySettings."""
+        CompanySettings.objects.create(
+            company=self.company, mass_deletion_threshold=1, mass_deletion_window_minutes=5
+        )
+        self.assertFalse(check_anomalous_behavior(self.user, self.company))
+        self.assertTrue(check_anomalous_behavior(self.user, self.company))
+        self.assertEqual(self._alerts().get().changes['window_minutes'], 5)
+
+
+class MassDeletionWithoutSharedCacheTestCase(TestCase):
+    """Sin caché compartido el detector cuenta en AuditLog (los contadores serían por proceso)."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa Test', active=True)
+    
+    def _delete(self):
+        log_audit(company=self.company, user=self.user, action='delete', model_name='Customer', object_id=1)
+        return check_anomalous_behavior(self.user, self.company)
+    
+    def test_burst_split_across_workers_still_alerts(self):
+        """Una ráfaga repartida entre procesos (caché vacío en cada uno) alerta una sola vez."""
+        results = []
+        for _ in range(6):
+            # Cada acción la atiende otro worker: su local-memory no vio las anteriores
+            cache.clear()
+            results.append(self._delete())
+        self.assertEqual(results, [False, False, False, True, False, False])
+        alert = AuditLog.objects.get(action='security_alert', changes__alert_type='MASS_DELETION')
+        self.assertEqual(alert.changes['count'], 4)
+    
+    def test_counts_only_destructive_actions(self):
+        """Solo cuentan eliminaciones y cancelaciones de operaciones."""
+        for _ in range(4):
+            log_audit(company=self.company, user=self.user, action='update', model_name='Customer', object_id=1)
+        log_audit(
+            company=self.company, user=self.user, action='update', model_name='Operation',
+            object_id=1, changes={'status': 'cancelled'},
+        )
+        self.assertFalse(check_anomalous_behavior(self.user, self.company))
+        self.assertFalse(self._delete())
+        self.assertFalse(self._delete())
+        self.assertTrue(self._delete())
+
+
+class KeysetPaginationTestCase(TestCase):
+    """Tests de la paginación por cursor (core.utils.pagination) y su uso en listados."""
+    
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name='Empresa Cursor', email='cursor@test.com', active=True)
+        self.user = User.objects.create_user(username='cursor', password='testpass123')
+        Membership.objects.create(user=self.user, company=self.company, role='admin', active=True)
+        # Nombres repetidos para ejercitar el desempate por id
+        for i in range(11):
+            Customer.objects.create(company=self.company, code=f'C{i:03d}', name=f'Cliente {i // 2}', active=True)
+        self.queryset = Customer.objects.for_company(self.company)
+        self.expected = list(self.queryset.order_by('name', 'id').values_list('id', flat=True))
+    
+    def _walk(self, paginator):
+        """Recorre todas las páginas hacia adelante y vuelve hacia atrás."""
+        forward, pages = [], []
+        page = paginator.page()
+        while True:
+            pages.append(page)
+            forward.extend(obj.id for obj in page)
+            if not page.has_next():
+                break
+            page = paginator.page(page.next_cursor)
+        backward = []
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            backward = [obj.id for obj in page] + backward
+        return forward, backward, pages
+    
+    def test_walk_forward_and_backward(self):
+        """Recorrer con next/previous devuelve todas las filas en orden, sin repetir."""
+        paginator = KeysetPaginator(self.queryset, 4, ('name', 'id'), count_limit=0)
+        forward, backward, pages = self._walk(paginator)
+        self.assertEqual(forward, self.expected)
+        self.assertEqual(backward, self.expected[:-3])
+        self.assertEqual([len(p) for p in pages], [4, 4, 3])
+        self.assertFalse(pages[0].has_previous())
+        self.assertFalse(pages[-1].has_next())
+    
+    def test_descending_ordering_with_dates(self):
+        """Orden descendente por fecha y número (listado de operaciones)."""
+        today = timezone.now().date()
+        customer = Customer.objects.for_company(self.company).first()
+        for offset in (0, 0, 1, 2, 2, 3):
+            create_operation(company=self.company, type='sale', date=today - timedelta(days=offset), customer=customer)
+        ordering = ('-date', '-number', '-id')
+        queryset = Operation.objects.for_company(self.company)
+        expected = list(queryset.order_by(*ordering).values_list('id', flat=True))
+        forward, backward, _ = self._walk(KeysetPaginator(queryset, 4, ordering, count_limit=0))
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, expected[:4])
+    
+    def test_one_query_per_page_and_invalid_cursor(self):
+        """Cada página es una consulta (sin COUNT); un cursor inválido vuelve a la primera página."""
+        paginator = KeysetPaginator(self.queryset, 4, ('name', 'id'), count_limit=0)
+        first = paginator.page()
+        with CaptureQueriesContext(connection) as ctx:
+            page = paginator.page(first.next_cursor)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('COUNT', ctx.captured_queries[0]['sql'].upper())
+        self.assertNotIn('OFFSET', ctx.captured_queries[0]['sql'].upper())
+        self.assertEqual([o.id for o in page], self.expected[4:8])
+        
+        self.assertEqual([o.id for o in paginator.page('no-es-un-cursor')], self.expected[:4])
+    
+    def test_approximate_count_is_capped(self):
+        """El conteo se corta en count_limit e informa si hay más."""
+        self.assertEqual(KeysetPaginator(self.queryset, 4, ('name', 'id'), count_limit=100).count, 11)
+        capped = KeysetPaginator(self.queryset, 4, ('name', 'id'), count_limit=5)
+        self.assertEqual(capped.count, 5)
+        self.assertTrue(capped.count_is_capped)
+        self.assertIsNone(KeysetPaginator(self.queryset, 4, ('name', 'id'), count_limit=0).count)
+    
+    def test_list_view_uses_cursor_links(self):
+        """El listado (y su parcial HTMX) pagina con ?cursor= conservando la búsqueda."""
+        for i in range(30):
+            Customer.objects.create(company=self.company, code=f'X{i:03d}', name=f'Extra {i:02d}', active=True)
+        client = Client()
+        client.login(username='cursor', password='testpass123')
+        session = client.session
+        session['current_company_id'] = self.company.id
+        session.save()
+        
+        url = reverse('customers:list')
+        response = client.get(url, {'search': 'Extra'})
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertTrue(page.is_keyset)
+        self.assertTrue(page.has_next())
+        self.assertContains(response, f'?cursor={page.next_cursor}&search=Extra')
+        self.assertContains(response, '30 resultados')
+        
+        response = client.get(url, {'search': 'Extra', 'cursor': page.next_cursor}, HTTP_HX_REQUEST='true')
+        self.assertEqual([c.name for c in response.context['customers']], [f'Extra {i:02d}' for i in range(25, 30)])
+        self.assertContains(response, 'Anterior')
+
+
+class SearchDocumentTestCase(TestCase):
+    """Tests de la búsqueda de texto (core.utils.search / CompanyQuerySet.search)."""
+    
+    def setUp(self):
+        self.company = Company.objects.create(name='Empresa Búsqueda', email='busqueda@test.com', active=True)
+        self.other = Company.objects.create(name='Otra Empresa', email='otra@test.com', active=True)
+        self.acme = Customer.objects.create(company=self.company, code='C001', name='Ñandú Distribuciones', email='ventas@nandu.com')
+        self.beta = Customer.objects.create(company=self.company, code='C002', name='Beta Comercial', tax_id='30-123')
+        Customer.objects.create(company=self.other, code='C001', name='Ñandú Otra Empresa')
+    
+    def _search(self, term, **kwargs):
+        return list(Customer.objects.for_company(self.company).search(term, **kwargs))
+    
+    def test_document_is_normalized_and_kept_on_save(self):
+        """El documento se crea al guardar, normalizado (minúsculas, sin acentos)."""
+        document = SearchDocument.objects.get(model='customers.customer', object_id=self.acme.pk)
+        self.assertEqual(document.content, 'c001 nandu distribuciones ventas@nandu.com')
+        self.assertEqual(document.company, self.company)
+        self.assertEqual(normalize_search_text('  Árbol   GRANDE '), 'arbol grande')
+        
+        self.acme.name = 'Acme Distribuciones'
+        self.acme.save()
+        document.refresh_from_db()
+        self.assertIn('acme', document.content)
+        
+        self.acme.delete()
+        self.assertFalse(SearchDocument.objects.filter(model='customers.customer', object_id=self.acme.pk).exists())
+    
+    def test_search_matches_substrings_accents_and_all_words(self):
+        """Cada palabra debe aparecer (subcadena, sin acentos ni mayúsculas); aislado por empresa."""
+        self.assertEqual(self._search('ÑANDU'), [self.acme])
+        self.assertEqual(self._search('nandú distrib'), [self.acme])
+        self.assertEqual(self._search('123'), [self.beta])
+        self.assertCountEqual(self._search('c0'), [self.acme, self.beta])  # palabra corta (LIKE)
+        self.assertEqual(self._search('nandu beta'), [])
+        self.assertEqual(len(self._search('   ')), 2)
+    
+    def test_ranked_search_prefers_prefix_matches(self):
+        """ranked=True ordena primero coincidencias al inicio de palabra."""
+        middle = Customer.objects.create(company=self.company, code='C003', name='Sucomercial SA')
+        results = self._search('comercial', ranked=True)
+        self.assertEqual(results, [self.beta, middle])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+    
+    def test_operations_follow_related_names(self):
+        """Las operaciones se buscan por número y por nombre del cliente, aun tras renombrarlo."""
+        operation = create_operation(company=self.company, type='sale', date=timezone.now().date(), customer=self.beta)
+        operations = Operation.objects.for_company(self.company)
+        self.assertEqual(list(operations.search(operation.number[-3:])), [operation])
+        self.assertEqual(list(operations.search('beta')), [operation])
+        
+        self.beta.name = 'Gamma Comercial'
+        self.beta.save()
+        self.assertEqual(list(operations.search('gamma')), [operation])
+        self.assertEqual(list(operations.search('beta')), [])
+    
+    def test_rebuild_command_indexes_bulk_rows(self):
+        """bulk_create no dispara señales: rebuild_search_index completa el índice."""
+        Customer.objects.bulk_create([
+            Customer(company=self.company, code=f'B{i:02d}', name=f'Masivo {i}') for i in range(3)
+        ])
+        self.assertEqual(self._search('masivo'), [])
+        call_command('rebuild_search_index', company_id=self.company.id, stdout=StringIO())
+        self.assertEqual(len(self._search('masivo')), 3)
+
+
+class BulkImportTestCase(TestCase):
+    """Tests de la importación masiva (core.utils.bulk_import)."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='importador', email='imp@test.com', password='testpass123')
+        self.company = Company.objects.create(name='Empresa Importación', email='imp@empresa.com', active=True)
+        self.other = Company.objects.create(name='Otra Empresa', email='otra@test.com', active=True)
+        Membership.objects.create(user=self.user, company=self.company, role='admin', active=True)
+        self.existing = Customer.objects.create(company=self.company, code='C001', name='Nombre Viejo', email='viejo@test.com')
+        Customer.objects.create(company=self.other, code='C001', name='De Otra Empresa')
+    
+    def _run(self, name, content, dry_run=False, batch_size=2):
+        importer = get_importer_class(name)(self.company, user=self.user, batch_size=batch_size)
+        return importer.run(BytesIO(content.encode('utf-8')), 'csv', dry_run=dry_run)
+    
+    def test_upsert_with_export_headers(self):
+        """El CSV de la exportación (con ';' de Excel) crea los códigos nuevos y actualiza los existentes."""
+        content = (
+            '\ufeffCódigo;Nombre;CUIT/RUT/NIT;Email;Teléfono;Dirección;Estado\n'
+            'C001;Nombre Nuevo;30-111;nuevo@test.com;;;Activo\n'
+            'C002;Cliente Dos;;;;;Inactivo\n'
+            'C003;Cliente Tres;;;;;\n'
+        )
+        result = self._run('customers', content)
+        self.assertEqual((result.total, result.created, result.updated, result.error_count), (3, 2, 1, 0))
+        
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.tax_id), ('Nombre Nuevo', '30-111'))
+        self.assertEqual(self.existing.pk, Customer.objects.get(company=self.company, code='C001').pk)
+        self.assertFalse(Customer.objects.get(company=self.company, code='C002').active)
+        self.assertEqual(Customer.objects.get(company=self.other, code='C001').name, 'De Otra Empresa')
+        # bulk_create no dispara señales: el importador mantiene el índice de búsqueda
+        self.assertEqual(list(Customer.objects.for_company(self.company).search('tres')), [
+            Customer.objects.get(company=self.company, code='C003')
+        ])
+    
+    def test_row_errors_are_reported_and_skipped(self):
+        """Las filas inválidas se informan con su línea y no frenan al resto."""
+        content = (
+            'code,name,email,active\n'
+            'S001,Proveedor Uno,uno@test.com,si\n'
+            'S002,Proveedor Dos,no-es-email,si\n'
+            'S003,,,\n'
+            'S001,Repetido,,\n'
+            'S004,Proveedor Cuatro,,quizás\n'
+            ',,,\n'
+            'S005,Proveedor Cinco,,no\n'
+        )
+        result = self._run('suppliers', content)
+        self.assertEqual((result.total, result.created, result.error_count), (6, 2, 4))
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 5, 6])
+        self.assertIn('Email', result.errors[0][1])
+        self.assertIn('repetido en el archivo (línea 2)', result.errors[2][1])
+        self.assertCountEqual(
+            Supplier.objects.filter(company=self.company).values_list('code', flat=True), ['S001', 'S005']
+        )
+    
+    def test_dry_run_and_missing_columns(self):
+        """dry_run valida sin escribir; sin columnas obligatorias el archivo se rechaza."""
+        content = 'Código,Nombre,Tipo,Precio\nP001,Tornillo,Producto,"1.234,50"\nP002,Flete,Servicio,abc\n'
+        result = self._run('products', content, dry_run=True)
+        self.assertEqual((result.created, result.error_count), (1, 1))
+        self.assertFalse(Product.objects.filter(company=self.company).exists())
+        
+        result = self._run('products', content)
+        product = Product.objects.get(company=self.company, code='P001')
+        self.assertEqual((product.type, product.price), ('product', Decimal('1234.50')))
+        
+        with self.assertRaises(ValidationError):
+            self._run('products', 'Código,Precio\nP009,10\n')
+    
+    def test_renamed_customers_reindex_their_operations(self):
+        """Renombrar por importación actualiza el documento de búsqueda de sus operaciones."""
+        operation = create_operation(company=self.company, type='sale', date=timezone.now().date(), customer=self.existing)
+        self._run('customers', 'Código,Nombre\nC001,Renombrado Masivo\n')
+        operations = Operation.objects.for_company(self.company)
+        self.assertEqual(list(operations.search('renombrado')), [operation])
+        self.assertEqual(list(operations.search('viejo')), [])
+    
+    def test_file_error_midway_keeps_written_batches(self):
+        """Un error a mitad del archivo conserva los lotes escritos: se informan, se auditan y se invalidan los cachés."""
+        content = 'Código,Nombre\nC010,Uno\nC011,Dos\nC012,Tres\n'.encode('utf-8') + b'C013,\xff\xfe\n'
+        importer = get_importer_class('customers')(self.company, user=self.user, batch_size=2)
+        with patch.object(importer, 'after_import') as after_import:
+            with self.assertRaises(ValidationError):
+                importer.run(BytesIO(content), 'csv')
+        after_import.assert_called_once()
+        self.assertEqual((importer.result.created, importer.result.imported), (2, 2))
+        self.assertTrue(Customer.objects.filter(company=self.company, code='C011').exists())
+        
+        self.client.login(username='importador', password='testpass123')
+        upload = SimpleUploadedFile('clientes.csv', content.replace(b'C01', b'C02'))
+        def small_batches(view):
+            return get_importer_class('customers')(view.get_company(), user=view.request.user, batch_size=2)
+        with patch('customers.views.CustomerImportView.get_importer', small_batches):
+            response = self.client.post(reverse('customers:import'), {'file': upload})
+        self.assertEqual(response.context['result'].created, 2)
+        self.assertTrue(AuditLog.objects.filter(company=self.company, model_name='Customer').exists())
+    
+    def test_upload_view_and_command(self):
+        """La vista de carga y el comando usan el mismo importador y registran una auditoría."""
+        self.client.login(username='importador', password='testpass123')
+        upload = SimpleUploadedFile('clientes.csv', 'Código,Nombre\nC010,Desde la Web\n'.encode('utf-8'))
+        response = self.client.post(reverse('customers:import'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'].created, 1)
+        self.assertTrue(AuditLog.objects.filter(company=self.company, model_name='Customer', action='create').exists())
+        
+        bad = SimpleUploadedFile('clientes.txt', b'x')
+        response = self.client.post(reverse('customers:import'), {'file': bad})
+        self.assertNotIn('result', response.context)
+        
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as handle:
+            handle.write('Código,Nombre\nC011,Desde el Comando\n')
+        self.addCleanup(Path(handle.name).unlink)
+        out = StringIO()
+        call_command('bulk_import', 'customers', handle.name, company_id=self.company.id, stdout=out)
+        self.assertIn('creados: 1', out.getvalue())
+        self.assertTrue(Customer.objects.filter(company=self.company, code='C011').exists())
+
+
+class LoadStressTestDataTestCase(TestCase):
+    """Tests de la carga masiva de stress test (core.utils.stress_data)."""
+    
+    def setUp(self):
+        self.company = Company.objects.create(name='Empresa Stress', email='stress@test.com', active=True)
+    
+    def _load(self, **options):
+        params = {
+            'company_id': [self.company.id], 'customers': 20, 'suppliers': 5, 'products': 30,
+            'operations': 120, 'items_per_op': 3, 'years': 1, 'batch_size': 25, 'seed': 7,
+        }
+        params.update(options)
+        call_command('load_stress_test_data', stdout=StringIO(), **params)
+    
+    def test_volumes_totals_and_derived_data(self):
+        """Crea los volúmenes pedidos con totales consistentes, numeración, resúmenes e índice de búsqueda."""
+        self._load()
+        operations = Operation.objects.for_company(self.company)
+        self.assertEqual(Customer.objects.for_company(self.company).count(), 20)
+        self.assertEqual(Product.objects.for_company(self.company).filter(type='service').count(), 9)
+        self.assertEqual(operations.count(), 120)
+        
+        for operation in operations.prefetch_related('items')[:20]:
+            items = list(operation.items.all())
+            self.assertTrue(1 <= len(items) <= 3)
+            self.assertEqual(operation.subtotal, sum(item.subtotal for item in items))
+            self.assertEqual(operation.total, operation.subtotal + operation.tax)
+        
+        today = timezone.now().date()
+        self.assertTrue(all(today - timedelta(days=365) <= day <= today for day in operations.values_list('date', flat=True)))
+        sales = operations.filter(type='sale').count()
+        self.assertEqual(OperationSequence.objects.get(company=self.company, type='sale').last_number, sales)
+        self.assertEqual(
+            sum(OperationDailySummary.objects.for_company(self.company).values_list('count', flat=True)),
+            operations.filter(status='confirmed').count(),
+        )
+        customer = Customer.objects.for_company(self.company).first()
+        self.assertIn(customer, Customer.objects.for_company(self.company).search(customer.code))
+        
+        # Los clientes frecuentes (primer 20%) concentran la mayoría de las ventas
+        frequent = list(Customer.objects.for_company(self.company).order_by('pk').values_list('pk', flat=True)[:4])
+        self.assertGreater(operations.filter(customer__in=frequent).count(), sales / 2)
+    
+    def test_second_run_continues_codes_and_numbers(self):
+        """Una segunda carga no choca con los códigos ni con la numeración existentes."""
+        self._load(operations=10)
+        self._load(operations=10, seed=8)
+        self.assertEqual(Customer.objects.for_company(self.company).count(), 40)
+        self.assertTrue(Customer.objects.filter(company=self.company, code='CLI-000040').exists())
+        numbers = list(Operation.objects.for_company(self.company).values_list('type', 'number'))
+        self.assertEqual(len(numbers), len(set(numbers)))
+        operation = create_operation(
+            company=self.company, type='sale', date=timezone.now().date(),
+            customer=Customer.objects.for_company(self.company).first(),
+        )
+        sales = Operation.objects.for_company(self.company).filter(type='sale').count()
+        self.assertEqual(operation.number, f'{sales:06d}')
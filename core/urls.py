@@ -16,5 +16,6 @@ urlpatterns = [
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('perfil/', views.ProfileView.as_view(), name='profile'),
     path('empresa/seleccionar/', views.CompanySelectView.as_view(), name='company_select'),
+    path('metricas/', views.RequestMetricsView.as_view(), name='request_metrics'),
 ]
 
@@ -2,7 +2,7 @@
 Utilidades del sistema.
 """
 
-from core.utils.audit import log_audit
+from core.utils.audit import build_audit_log, log_audit, log_audit_bulk
 
-__all__ = ['log_audit']
+__all__ = ['build_audit_log', 'log_audit', 'log_audit_bulk']
 
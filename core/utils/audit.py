@@ -2,10 +2,26 @@
 Utilidades de auditoría.
 NUNCA se registran contraseñas, datos de tarjetas ni otros campos sensibles.
 Toda llave sensible (password, token, secret, key, card, etc.) se reemplaza por [REDACTED].
+
+Escritura: con settings.AUDIT_LOG_ASYNC = False cada entrada se inserta en el momento.
+Con AUDIT_LOG_ASYNC = True las entradas (ya sanitizadas) se encolan en un buffer del
+proceso cuando confirma la transacción que las generó (si se revierte, se descartan,
+igual que un INSERT dentro de ella) y un thread en segundo plano las inserta con
+bulk_create cada AUDIT_LOG_FLUSH_INTERVAL segundos o al llegar a AUDIT_LOG_BATCH_SIZE.
+Al terminar el proceso normalmente (atexit) se vacía el buffer.
 """
 
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
 from core.models import AuditLog
 
+logger = logging.getLogger('core')
+
 
 # Claves que NUNCA se guardan: sus valores se reemplazan por [REDACTED] antes de persistir
 _SENSITIVE_KEYS = frozenset({
@@ -51,6 +67,34 @@ def _sanitize_changes(obj):
     return out
 
 
+def build_audit_log(
+    company,
+    user,
+    action,
+    model_name,
+    object_id=None,
+    changes=None,
+    ip_address=None
+):
+    """
+    Arma un AuditLog sin guardarlo (mismos argumentos y sanitización que log_audit).
+    Útil para registrar varias entradas juntas con log_audit_bulk.
+    """
+    if changes is None:
+        changes = {}
+    changes = _sanitize_changes(changes)
+    
+    return AuditLog(
+        company=company,
+        user=user,
+        action=action,
+        model_name=model_name,
+        object_id=str(object_id) if object_id else None,
+        changes=changes,
+        ip_address=ip_address
+    )
+
+
 def log_audit(
     company,
     user,
@@ -76,17 +120,180 @@ def log_audit(
     Returns:
         AuditLog: Instancia creada
     """
-    if changes is None:
-        changes = {}
-    changes = _sanitize_changes(changes)
-    
-    return AuditLog.objects.create(
-        company=company,
-        user=user,
-        action=action,
-        model_name=model_name,
-        object_id=str(object_id) if object_id else None,
-        changes=changes,
-        ip_address=ip_address
+    entry = build_audit_log(
+        company, user, action, model_name,
+        object_id=object_id, changes=changes, ip_address=ip_address
     )
+    audit_writer.submit([entry])
+    return entry
+
+
+def log_audit_bulk(entries):
+    """
+    Registra varias entradas de auditoría (armadas con build_audit_log) juntas:
+    un solo INSERT en modo síncrono o un solo encolado en modo asíncrono.
+    
+    Returns:
+        list[AuditLog]: Entradas registradas (sin pk hasta el flush en modo asíncrono)
+    """
+    entries = list(entries)
+    audit_writer.submit(entries)
+    return entries
+
+
+class AuditLogWriter:
+    """
+    Buffer de entradas de auditoría del proceso (ver docstring del módulo).
+    Si el bulk_create falla, las entradas vuelven al buffer para el próximo intento
+    (hasta AUDIT_LOG_BATCH_SIZE * 50; las más viejas se descartan con error en el log).
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._atexit_registered = False
+
+    @staticmethod
+    def _batch_size():
+        return getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 200)
+
+    def submit(self, entries):
+        """Inserta ya (modo síncrono) o encola al confirmar la transacción (modo asíncrono)."""
+        if not entries:
+            return
+        if not getattr(settings, 'AUDIT_LOG_ASYNC', False):
+            if len(entries) == 1:
+                entries[0].save()
+            else:
+                AuditLog.objects.bulk_create(entries, batch_size=self._batch_size())
+            return
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._enqueue(entries))
+        else:
+            self._enqueue(entries)
+
+    def _enqueue(self, entries):
+        with self._lock:
+            self._buffer.extend(entries)
+            pending = len(self._buffer)
+        if self._ensure_thread():
+            if pending >= self._batch_size():
+                self._wakeup.set()
+        elif pending >= self._batch_size():
+            # Sin thread (AUDIT_LOG_FLUSH_INTERVAL = 0): vaciar por tamaño en el llamador
+            self.flush()
+
+    def _ensure_thread(self):
+        """Arranca el thread de flush si corresponde. Retorna True si hay thread activo."""
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+        if not getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 2.0):
+            return False
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name='audit-log-writer', daemon=True
+                )
+                self._thread.start()
+        return True
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 2.0) or 2.0)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """
+        Inserta con bulk_create todo lo encolado. Retorna la cantidad insertada.
+
+        Si el lote falla con la base disponible, alguna entrada es inválida (ej.
+        changes no serializable o empresa ya borrada): se reintenta por bisección y
+        solo se descartan, con un error en el log, las entradas que fallan solas.
+        Si la base no responde, todo vuelve al buffer para el próximo flush.
+        """
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+        if not pending:
+            return 0
+        try:
+            self._insert(pending)
+        except Exception:
+            if self._database_available():
+                inserted, rejected = self._insert_bisecting(pending)
+                if rejected:
+                    logger.error(
+                        'Se descartaron %s entradas de auditoría que no se pueden insertar (ej. %s/%s de la empresa %s).',
+                        len(rejected), rejected[0].model_name, rejected[0].action, rejected[0].company_id,
+                    )
+                return inserted
+            logger.exception('Error insertando %s entradas de auditoría; se reintentará.', len(pending))
+            limit = self._batch_size() * 50
+            with self._lock:
+                self._buffer[:0] = pending
+                dropped = len(self._buffer) - limit
+                if dropped > 0:
+                    del self._buffer[:dropped]
+                    logger.error('Buffer de auditoría lleno: se descartaron %s entradas.', dropped)
+            return 0
+        return len(pending)
+
+    def _insert(self, entries):
+        # Todo o nada: un lote fallido no deja filas a medias (ni duplicados al reintentar)
+        with transaction.atomic():
+            AuditLog.objects.bulk_create(entries, batch_size=self._batch_size())
+
+    def _insert_bisecting(self, entries):
+        """Inserta partiendo el lote en mitades hasta aislar las entradas inválidas. Retorna (insertadas, rechazadas)."""
+        if len(entries) == 1:
+            try:
+                self._insert(entries)
+            except Exception:
+                return 0, entries
+            return 1, []
+        middle = len(entries) // 2
+        inserted, rejected = 0, []
+        for half in (entries[:middle], entries[middle:]):
+            try:
+                self._insert(half)
+                inserted += len(half)
+            except Exception:
+                half_inserted, half_rejected = self._insert_bisecting(half)
+                inserted += half_inserted
+                rejected += half_rejected
+        return inserted, rejected
+
+    @staticmethod
+    def _database_available():
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def pending(self):
+        """Cantidad de entradas encoladas sin insertar."""
+        with self._lock:
+            return len(self._buffer)
+
+    def shutdown(self):
+        """Detiene el thread y vacía el buffer (apagado normal del worker)."""
+        self._stopping.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.flush()
+
 
+# Writer del proceso (lo usan log_audit y log_audit_bulk)
+audit_writer = AuditLogWriter()
@@ -0,0 +1,361 @@
+"""
+Importación masiva de catálogos (productos, clientes, proveedores) desde CSV o XLSX.
+
+El archivo se lee como stream (csv línea a línea / openpyxl en modo read_only),
+cada fila se valida con los mismos campos de formulario que el alta manual
+(ProductForm, CustomerForm, SupplierForm: obligatorios, largos, email,
+decimales, opciones) y las filas válidas se escriben por lotes con un upsert por
+(company, code):
+
+    bulk_create(update_conflicts=True, unique_fields=['company', 'code'], update_fields=[...])
+
+Un código existente se actualiza (solo con las columnas presentes en el archivo)
+y uno nuevo se crea. Las filas con errores no se escriben y se informan con su
+número de línea; un código repetido dentro del archivo también es un error.
+
+Las columnas se reconocen por nombre de campo, etiqueta del formulario o
+encabezado de la exportación CSV, sin distinguir mayúsculas ni acentos: un CSV
+exportado se puede volver a importar.
+
+bulk_create no dispara señales: cada lote recalcula sus documentos de búsqueda
+(y los de las operaciones de los registros actualizados, que incluyen su nombre)
+y al terminar se invalidan los cachés que dependen del catálogo (after_import).
+Si el archivo falla a mitad de camino los lotes ya escritos quedan guardados:
+sus totales quedan en importer.result y los cachés se invalidan igual.
+
+Los importadores se declaran en cada app (ej. products.importers) y se
+registran en IMPORTERS.
+"""
+
+import codecs
+import csv
+import itertools
+from pathlib import Path
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from core.utils.audit import log_audit
+from core.utils.search import index_queryset, normalize_search_text, reindex_related
+
+# Importadores disponibles: nombre -> clase (ruta)
+IMPORTERS = {
+    'products': 'products.importers.ProductImporter',
+    'customers': 'customers.importers.CustomerImporter',
+    'suppliers': 'suppliers.importers.SupplierImporter',
+}
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+
+# Filas por upsert (un bulk_create y un recálculo de búsqueda por lote)
+IMPORT_BATCH_SIZE = 2000
+
+# Errores que se conservan con detalle (el resto solo se cuenta)
+IMPORT_MAX_ERRORS = 500
+
+TRUE_VALUES = {'1', 'true', 'si', 's', 'yes', 'y', 'x', 'activo', 'activa'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'inactivo', 'inactiva'}
+
+
+def get_importer_class(name):
+    """Clase del importador registrado (KeyError si no existe)."""
+    return import_string(IMPORTERS[name])
+
+
+def detect_import_format(filename):
+    """'csv' o 'xlsx' según la extensión del archivo."""
+    fmt = Path(filename or '').suffix.lower().lstrip('.')
+    if fmt not in IMPORT_FORMATS:
+        raise ValidationError('Formato no soportado: el archivo debe ser .csv o .xlsx.')
+    return fmt
+
+
+# --- Lectura ---
+
+def _cell_text(value):
+    """Valor de una celda XLSX como texto (1001.0 -> '1001')."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _iter_csv(fileobj):
+    lines = codecs.iterdecode(iter(fileobj), 'utf-8-sig')
+    first = next(lines, None)
+    if first is None:
+        return
+    # El separador más frecuente del encabezado (Excel en español exporta con ';')
+    delimiter = max((',', ';', '\t'), key=first.count)
+    reader = csv.reader(itertools.chain([first], lines), delimiter=delimiter)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _iter_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValidationError('La importación de Excel requiere openpyxl (pip install openpyxl).')
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception:
+        raise ValidationError('No se pudo leer el archivo Excel.')
+    try:
+        for line, row in enumerate(workbook.active.iter_rows(values_only=True), start=1):
+            yield line, [_cell_text(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def iter_import_rows(fileobj, fmt):
+    """
+    Filas del archivo como (número de línea, [valores en texto]), en stream.
+    La primera fila es el encabezado.
+
+    Raises:
+        ValidationError: si el archivo no se puede leer
+    """
+    rows = _iter_xlsx(fileobj) if fmt == 'xlsx' else _iter_csv(fileobj)
+    try:
+        yield from rows
+    except UnicodeDecodeError:
+        raise ValidationError('El archivo CSV debe estar codificado en UTF-8.')
+    except csv.Error as exc:
+        raise ValidationError(f'CSV inválido: {exc}')
+
+
+# --- Resultado ---
+
+class ImportResult:
+    """Totales y errores de una importación."""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.total = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+    @property
+    def errors_truncated(self):
+        return self.error_count > len(self.errors)
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'created': self.created,
+            'updated': self.updated,
+            'errors': self.error_count,
+            'dry_run': self.dry_run,
+        }
+
+
+# --- Importador ---
+
+class BulkImporter:
+    """
+    Importador de un modelo con código único por empresa.
+
+    Atributos de clase:
+        model: modelo destino (con company, code y created_by)
+        form_class: formulario del alta manual; sus campos validan cada fila
+        fields: campos importables (subconjunto de los del formulario)
+        aliases: campo -> encabezados adicionales aceptados (ej. los de la exportación)
+        required_columns: columnas que el archivo debe traer
+        label: nombre para mensajes y auditoría
+    """
+    model = None
+    form_class = None
+    fields = ()
+    aliases = {}
+    required_columns = ('code', 'name')
+    label = ''
+
+    def __init__(self, company, user=None, batch_size=IMPORT_BATCH_SIZE):
+        self.company = company
+        self.user = user
+        self.batch_size = batch_size
+        self.result = None
+        self.form_fields = {name: self.form_class.base_fields[name] for name in self.fields}
+
+    # --- Columnas ---
+
+    def column_names(self, field):
+        """Encabezados normalizados aceptados para el campo."""
+        form_field = self.form_fields[field]
+        names = {field, form_field.label or '', self.model._meta.get_field(field).verbose_name}
+        names.update(self.aliases.get(field, ()))
+        return {normalize_search_text(name) for name in names if name}
+
+    def column_help(self):
+        """[(etiqueta, obligatoria)] de las columnas importables, para la ayuda del formulario."""
+        return [
+            (str(self.form_fields[field].label or field), field in self.required_columns)
+            for field in self.fields
+        ]
+
+    def map_columns(self, header):
+        """
+        {índice de columna: campo} a partir del encabezado. Las columnas
+        desconocidas se ignoran.
+
+        Raises:
+            ValidationError: si falta una columna obligatoria
+        """
+        lookup = {}
+        for field in self.fields:
+            for name in self.column_names(field):
+                lookup.setdefault(name, field)
+
+        columns = {}
+        for index, name in enumerate(header):
+            field = lookup.get(normalize_search_text(name))
+            if field and field not in columns.values():
+                columns[index] = field
+
+        missing = [field for field in self.required_columns if field not in columns.values()]
+        if missing:
+            labels = ', '.join(str(self.form_fields[field].label or field) for field in missing)
+            raise ValidationError(f'Faltan columnas obligatorias: {labels}.')
+        return columns
+
+    # --- Validación ---
+
+    def prepare_value(self, field, raw):
+        """Texto de la celda -> valor que entiende el campo del formulario."""
+        form_field = self.form_fields[field]
+        value = raw.strip()
+        if isinstance(form_field, forms.BooleanField):
+            normalized = normalize_search_text(value)
+            if not normalized:
+                return True
+            if normalized in TRUE_VALUES:
+                return True
+            if normalized in FALSE_VALUES:
+                return False
+            raise ValidationError(f'valor no reconocido "{value}" (usar Sí/No o Activo/Inactivo).')
+        if isinstance(form_field, forms.ChoiceField) and value:
+            options = {}
+            for option, option_label in form_field.choices:
+                options[normalize_search_text(option)] = option
+                options[normalize_search_text(option_label)] = option
+            return options.get(normalize_search_text(value), value)
+        if isinstance(form_field, forms.DecimalField) and ',' in value:
+            # 1.234,50 o 1234,50 -> 1234.50
+            value = value.replace('.', '').replace(',', '.')
+        return value
+
+    def clean_row(self, data):
+        """
+        Valida una fila. Returns: (valores limpios, lista de errores).
+        """
+        cleaned, errors = {}, []
+        for field, raw in data.items():
+            form_field = self.form_fields[field]
+            try:
+                cleaned[field] = form_field.clean(self.prepare_value(field, raw))
+            except ValidationError as exc:
+                errors.append(f'{form_field.label or field}: {" ".join(exc.messages)}')
+        return cleaned, errors
+
+    def build_instance(self, values):
+        return self.model(company=self.company, created_by=self.user, **values)
+
+    # --- Escritura ---
+
+    def write_batch(self, rows, present_fields, result):
+        codes = [row['code'] for row in rows]
+        existing = dict(
+            self.model.objects.filter(company=self.company, code__in=codes).values_list('code', 'pk')
+        )
+        if not result.dry_run:
+            update_fields = [field for field in present_fields if field != 'code'] + ['updated_at']
+            with transaction.atomic():
+                self.model.objects.bulk_create(
+                    [self.build_instance(row) for row in rows],
+                    update_conflicts=True,
+                    unique_fields=['company', 'code'],
+                    update_fields=update_fields,
+                )
+                index_queryset(self.model.objects.filter(company=self.company, code__in=codes))
+                if existing:
+                    reindex_related(self.model, list(existing.values()))
+        result.updated += len(existing)
+        result.created += len(codes) - len(existing)
+
+    def after_import(self, result):
+        """Invalida los cachés del catálogo (las señales no ven bulk_create)."""
+        from core.services import invalidate_dashboard_cache
+        invalidate_dashboard_cache(self.company)
+
+    def audit(self, result, filename='', ip_address=None):
+        """Una entrada de auditoría por importación (no una por fila)."""
+        log_audit(
+            company=self.company,
+            user=self.user,
+            action='create',
+            model_name=self.model.__name__,
+            changes={'import': result.as_dict(), 'file': filename},
+            ip_address=ip_address,
+        )
+
+    def run(self, fileobj, fmt, dry_run=False):
+        """
+        Importa el archivo. Con dry_run valida y cuenta sin escribir.
+
+        Returns:
+            ImportResult (también en self.result)
+
+        Raises:
+            ValidationError: si el archivo no se puede leer o le faltan columnas.
+                Los lotes escritos antes del error quedan guardados y contados en self.result.
+        """
+        result = self.result = ImportResult(dry_run=dry_run)
+        rows = iter_import_rows(fileobj, fmt)
+        header = next(rows, None)
+        if header is None:
+            raise ValidationError('El archivo está vacío.')
+        columns = self.map_columns(header[1])
+        present_fields = list(columns.values())
+
+        seen = {}
+        batch = []
+        try:
+            for line, values in rows:
+                if not any(value.strip() for value in values):
+                    continue
+                result.total += 1
+                data = {field: values[index] if index < len(values) else '' for index, field in columns.items()}
+                cleaned, errors = self.clean_row(data)
+                code = cleaned.get('code')
+                if code and code in seen:
+                    errors.append(f'Código "{code}" repetido en el archivo (línea {seen[code]}).')
+                if errors:
+                    result.add_error(line, ' | '.join(errors))
+                    continue
+                seen[code] = line
+                batch.append(cleaned)
+                if len(batch) >= self.batch_size:
+                    self.write_batch(batch, present_fields, result)
+                    batch = []
+            if batch:
+                self.write_batch(batch, present_fields, result)
+        finally:
+            # También si el archivo falló a mitad de camino: los lotes anteriores ya están guardados
+            if not dry_run and result.imported:
+                self.after_import(result)
+        return result
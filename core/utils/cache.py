@@ -0,0 +1,78 @@
+"""
+Utilidades de caché por empresa (tenant).
+
+Cada empresa tiene un contador de versión por espacio de nombres (ej. 'dashboard').
+Las claves de datos incluyen esa versión, por lo que invalidar = incrementar el
+contador: las entradas viejas quedan huérfanas y expiran solas. Funciona con
+cualquier backend del framework de caché de Django, pero la invalidación solo
+llega a todos los workers si el backend es compartido (is_shared_cache): por eso
+producción exige CACHE_URL. El local-memory queda para tests y desarrollo.
+"""
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+
+def is_shared_cache():
+    """True si el caché por defecto es compartido entre procesos (no local-memory ni dummy)."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _version_key(company_id, namespace):
+    return f'tenant:{company_id}:{namespace}:version'
+
+
+def get_tenant_version(company_id, namespace):
+    """Versión actual del espacio de nombres para la empresa (1 si nunca se invalidó)."""
+    key = _version_key(company_id, namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_tenant_version(company_id, namespace):
+    """Incrementa la versión del espacio de nombres (invalida todas sus entradas)."""
+    key = _version_key(company_id, namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # La clave no existía (o expiró): arrancar en 2 para no reutilizar la versión 1
+        cache.add(key, 2, timeout=None)
+        return cache.get(key, 2)
+
+
+def invalidate_tenant_cache(company, namespace):
+    """
+    Invalida el caché del espacio de nombres para la empresa cuando la transacción
+    actual confirme (inmediatamente si no hay transacción abierta), para que ningún
+    request cachee datos aún no confirmados bajo la nueva versión.
+    """
+    company_id = getattr(company, 'pk', company)
+    transaction.on_commit(lambda: bump_tenant_version(company_id, namespace))
+
+
+def tenant_cache_key(company_id, namespace, *parts):
+    """Clave versionada: tenant:<id>:<namespace>:v<version>:<parts...>."""
+    version = get_tenant_version(company_id, namespace)
+    suffix = ':'.join(str(p) for p in parts)
+    return f'tenant:{company_id}:{namespace}:v{version}:{suffix}'
+
+
+def get_or_set_tenant_cache(company, namespace, parts, compute, timeout=None):
+    """
+    Devuelve el valor cacheado para (empresa, namespace, parts) o lo calcula con
+    compute() y lo guarda. timeout por defecto: settings.TENANT_CACHE_TIMEOUT.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'TENANT_CACHE_TIMEOUT', 300)
+    key = tenant_cache_key(getattr(company, 'pk', company), namespace, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
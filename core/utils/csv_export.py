@@ -1,34 +1,74 @@
 """
 Utilidades para exportación CSV.
+
+Las exportaciones se envían con StreamingHttpResponse: las filas se consumen de un
+iterable (idealmente `.values_list(...).iterator(chunk_size=CSV_CHUNK_SIZE)`) y se
+escriben en bloques, por lo que la memoria es constante y el primer byte llega
+al cliente sin esperar a que se arme todo el archivo.
 """
 
 import csv
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
+
+
+# Filas que el ORM trae por viaje a la base (iterator(chunk_size=...))
+CSV_CHUNK_SIZE = 2000
+
+# Filas CSV que se agrupan en cada bloque enviado al cliente
+CSV_ROWS_PER_BLOCK = 500
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(headers, rows, bom=True, encoding='utf-8'):
+    """
+    Genera el CSV como bloques de bytes.
 
+    Args:
+        headers: Lista de encabezados (None para omitir)
+        rows: Iterable de filas (listas/tuplas); se consume una sola vez
+        bom: Si True, antepone el BOM UTF-8 (compatibilidad con Excel)
+        encoding: Codificación de salida
+
+    Yields:
+        bytes: bloques de hasta CSV_ROWS_PER_BLOCK filas
+    """
+    writer = csv.writer(_Echo())
+    head = '\ufeff' if bom else ''
+    if headers is not None:
+        head += writer.writerow(headers)
+    if head:
+        yield head.encode(encoding)
+
+    block = []
+    for row in rows:
+        block.append(writer.writerow(row))
+        if len(block) >= CSV_ROWS_PER_BLOCK:
+            yield ''.join(block).encode(encoding)
+            block = []
+    if block:
+        yield ''.join(block).encode(encoding)
 
-def export_csv_response(filename, headers, rows):
+
+def export_csv_response(filename, headers, rows, bom=True, content_type='text/csv; charset=utf-8-sig'):
     """
-    Genera una respuesta HTTP con CSV.
-    
+    Genera una respuesta HTTP en streaming con CSV.
+
     Args:
         filename: Nombre del archivo (sin extensión)
         headers: Lista de encabezados
-        rows: Lista de listas con datos
-    
+        rows: Iterable de filas (puede ser un generador perezoso)
+        bom: Si True, antepone el BOM UTF-8 (compatibilidad con Excel)
+        content_type: Content-Type de la respuesta
+
     Returns:
-        HttpResponse con CSV
+        StreamingHttpResponse con CSV
     """
-    response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
+    response = StreamingHttpResponse(iter_csv(headers, rows, bom=bom), content_type=content_type)
     response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-    
-    # UTF-8 BOM para compatibilidad con Excel
-    response.write('\ufeff')
-    
-    writer = csv.writer(response)
-    writer.writerow(headers)
-    
-    for row in rows:
-        writer.writerow(row)
-    
     return response
-
@@ -0,0 +1,79 @@
+"""
+Métricas de requests en memoria (por proceso).
+
+RequestMetricsMiddleware registra aquí, por vista, la duración, la cantidad de
+consultas SQL y el tiempo en base de datos de cada request. Se guardan las
+últimas N muestras por vista (settings.REQUEST_METRICS_SAMPLES) y se calculan
+percentiles al pedir el resumen. Cada worker tiene su propio registro.
+"""
+
+import math
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+
+def _percentile(sorted_values, pct):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class RequestMetricsRegistry:
+    """Muestras recientes por vista, protegidas por un lock (seguro entre threads)."""
+
+    def __init__(self, max_samples=None):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = defaultdict(self._new_bucket)
+        self._totals = defaultdict(int)
+
+    def _new_bucket(self):
+        size = self.max_samples or getattr(settings, 'REQUEST_METRICS_SAMPLES', 1000)
+        return deque(maxlen=size)
+
+    def record(self, view_name, duration_ms, query_count, sql_ms):
+        """Agrega una muestra (duración total, consultas y tiempo SQL en ms) para la vista."""
+        with self._lock:
+            self._samples[view_name].append((duration_ms, query_count, sql_ms))
+            self._totals[view_name] += 1
+
+    def snapshot(self):
+        """
+        Resumen por vista: requests totales, muestras, p50/p95/p99 de duración,
+        promedio de consultas y de tiempo SQL. Ordenado por p95 descendente.
+        """
+        with self._lock:
+            data = {name: list(samples) for name, samples in self._samples.items()}
+            totals = dict(self._totals)
+
+        summary = []
+        for name, samples in data.items():
+            durations = sorted(s[0] for s in samples)
+            count = len(samples)
+            summary.append({
+                'view': name,
+                'requests': totals.get(name, count),
+                'samples': count,
+                'p50_ms': round(_percentile(durations, 50), 2),
+                'p95_ms': round(_percentile(durations, 95), 2),
+                'p99_ms': round(_percentile(durations, 99), 2),
+                'max_ms': round(durations[-1], 2) if durations else 0.0,
+                'avg_queries': round(sum(s[1] for s in samples) / count, 2) if count else 0.0,
+                'avg_sql_ms': round(sum(s[2] for s in samples) / count, 2) if count else 0.0,
+            })
+        summary.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return summary
+
+    def reset(self):
+        """Descarta todas las muestras."""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+# Registro del proceso (lo usan el middleware y la vista de métricas)
+request_metrics = RequestMetricsRegistry()
@@ -0,0 +1,191 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+
+En lugar de OFFSET + COUNT(*) por página, cada página se pide "a partir de" la
+última (o primera) fila de la anterior comparando por el orden del listado:
+
+    WHERE (date, number, id) < (:date, :number, :id) ORDER BY date DESC, number DESC, id DESC LIMIT n + 1
+
+expresado como OR de prefijos para que funcione en cualquier base. El costo es
+el de un index seek, constante sin importar en qué página se esté. La fila
+extra (n + 1) indica si hay una página siguiente.
+
+Restricciones: los campos del orden deben ser columnas del modelo no nulas y el
+último debe ser único (normalmente 'id') para desempatar.
+
+El total es opcional y aproximado: se cuenta como máximo count_limit filas
+(SELECT COUNT(*) FROM (... LIMIT count_limit + 1)); si se alcanza el tope la
+página informa "más de count_limit".
+"""
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def get_keyset_count_limit():
+    """Tope del conteo aproximado (settings.KEYSET_PAGINATION_COUNT_LIMIT; 0 = sin conteo)."""
+    return getattr(settings, 'KEYSET_PAGINATION_COUNT_LIMIT', 1000)
+
+
+def _parse_ordering(ordering):
+    """('-date', 'id') -> [('date', True), ('id', False)] (campo, descendente)."""
+    return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+
+class KeysetPage:
+    """
+    Página de un KeysetPaginator. Compatible con lo que usan los templates de
+    listados (iteración, has_next/has_previous, has_other_pages); en lugar de
+    números de página expone next_cursor / previous_cursor.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage ({len(self.object_list)} objetos)>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor sobre un QuerySet.
+
+    Args:
+        queryset: QuerySet ya filtrado (el orden lo aplica el paginador)
+        per_page: filas por página
+        ordering: campos del orden, ej. ('-date', '-number', '-id') o ('name', 'id')
+        count_limit: tope del conteo aproximado (None = settings; 0 = sin conteo)
+    """
+
+    def __init__(self, queryset, per_page, ordering, count_limit=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = _parse_ordering(self.ordering)
+        self.count_limit = get_keyset_count_limit() if count_limit is None else count_limit
+        self._count = None
+
+    # --- Cursores ---
+
+    def _row_values(self, obj):
+        values = []
+        for field, _ in self.fields:
+            value = getattr(obj, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def encode_cursor(self, direction, obj):
+        """Cursor opaco (base64 urlsafe de JSON) con la dirección y los valores de la fila."""
+        payload = json.dumps({'d': direction, 'v': self._row_values(obj)}, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Devuelve (dirección, valores) o None si el cursor es inválido
+        (se trata como primera página).
+        """
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            direction, raw_values = payload['d'], payload['v']
+            if direction not in ('n', 'p') or len(raw_values) != len(self.fields):
+                return None
+            model = self.queryset.model
+            values = [
+                model._meta.get_field(field).to_python(raw)
+                for (field, _), raw in zip(self.fields, raw_values)
+            ]
+        except (ValueError, KeyError, TypeError, binascii.Error, ValidationError, LookupError):
+            return None
+        return direction, values
+
+    # --- Consultas ---
+
+    def _seek(self, values, forward):
+        """Filtro "después de" (forward) o "antes de" la fila con esos valores."""
+        condition = Q()
+        equal_prefix = {}
+        for (field, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= Q(**equal_prefix, **{f'{field}__{lookup}': value})
+            equal_prefix[field] = value
+        return condition
+
+    def _reversed_ordering(self):
+        return [field if descending else f'-{field}' for field, descending in self.fields]
+
+    def page(self, cursor=None):
+        """Página indicada por el cursor (primera página si no hay o es inválido)."""
+        decoded = self.decode_cursor(cursor)
+        limit = self.per_page + 1
+
+        if decoded is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:limit])
+            has_next, has_previous = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        elif decoded[0] == 'n':
+            rows = list(self.queryset.filter(self._seek(decoded[1], True)).order_by(*self.ordering)[:limit])
+            has_next, has_previous = len(rows) > self.per_page, True
+            rows = rows[:self.per_page]
+        else:
+            rows = list(self.queryset.filter(self._seek(decoded[1], False)).order_by(*self._reversed_ordering())[:limit])
+            has_next, has_previous = True, len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+
+        if not rows and decoded is not None:
+            # El cursor apunta a filas que ya no existen: volver al inicio
+            return self.page(None)
+
+        return KeysetPage(
+            rows,
+            self,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=self.encode_cursor('n', rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor('p', rows[0]) if has_previous else None,
+        )
+
+    @property
+    def count(self):
+        """Total aproximado (hasta count_limit; None si el conteo está desactivado)."""
+        if not self.count_limit:
+            return None
+        if self._count is None:
+            self._count = self.queryset.order_by()[:self.count_limit + 1].count()
+        return min(self._count, self.count_limit)
+
+    @property
+    def count_is_capped(self):
+        """True si hay más filas que count_limit (el total mostrado es un mínimo)."""
+        return self.count is not None and self._count > self.count_limit
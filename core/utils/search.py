@@ -0,0 +1,361 @@
+"""
+Búsqueda de texto por empresa.
+
+Cada registro de un modelo con `search_fields` (clientes, proveedores,
+productos, operaciones) tiene un SearchDocument con el texto normalizado de esos
+campos (minúsculas, sin acentos), incluidos campos de relaciones como
+'customer__name'. Las señales de core lo mantienen al guardar/borrar y
+`manage.py rebuild_search_index` lo recalcula en lote (cargas masivas,
+bulk_create/update, que no disparan señales).
+
+La búsqueda (CompanyQuerySet.search) exige que cada palabra del término
+aparezca en el documento como subcadena — la misma semántica que los
+icontains anteriores, así "123" sigue encontrando "V-000123" — pero sobre una
+sola columna indexada en lugar de varios LIKE con JOIN:
+
+- SQLite: tabla virtual FTS5 con tokenizer trigram (core_searchdocument_fts),
+  sincronizada por triggers; palabras de menos de 3 caracteres usan LIKE.
+- PostgreSQL: índice GIN pg_trgm sobre content, que acelera LIKE '%...%'.
+- Otros motores: LIKE sobre content.
+
+Con ranked=True se anota search_rank: 3 por palabra al inicio del documento,
+2 al inicio de una palabra (prefijo), 1 en medio de una palabra.
+
+Nota: los triggers de SQLite viven sobre core_searchdocument; si una migración
+futura altera esa tabla (SQLite la recrea) hay que volver a crear el índice.
+"""
+
+import unicodedata
+
+from django.apps import apps as global_apps
+from django.db import connections
+from django.db.models import Case, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+# Palabras que se consideran del término de búsqueda (el resto se ignora)
+SEARCH_MAX_TOKENS = 8
+
+# Filas por lote al recalcular documentos
+SEARCH_BATCH_SIZE = 1000
+
+SQLITE_FTS_TABLE = 'core_searchdocument_fts'
+POSTGRES_TRGM_INDEX = 'core_searchdocument_content_trgm'
+
+# El tokenizer trigram (y pg_trgm) no indexan subcadenas más cortas
+TRIGRAM_MIN_LENGTH = 3
+
+# Motores SQLite (por NAME) donde existe la tabla FTS5
+_sqlite_fts_tables = {}
+
+
+# --- Normalización ---
+
+def normalize_search_text(value):
+    """Texto en minúsculas, sin acentos y con espacios simples ('Ñandú  S.A.' -> 'nandu s.a.')."""
+    if value is None:
+        return ''
+    text = unicodedata.normalize('NFKD', str(value))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.lower().split())
+
+
+def tokenize_search_term(term):
+    """Palabras normalizadas y sin repetir del término (como máximo SEARCH_MAX_TOKENS)."""
+    tokens = []
+    for token in normalize_search_text(term).split():
+        if token not in tokens:
+            tokens.append(token)
+    return tokens[:SEARCH_MAX_TOKENS]
+
+
+def build_search_content(values):
+    """Contenido del documento a partir de los valores de search_fields."""
+    return ' '.join(text for text in (normalize_search_text(value) for value in values) if text)
+
+
+# --- Registro de modelos ---
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def get_searchable_models():
+    """Modelos instalados que declaran search_fields."""
+    return [model for model in global_apps.get_models() if getattr(model, 'search_fields', None)]
+
+
+def search_fields_touched(model, update_fields):
+    """True si un save con update_fields modifica algún campo propio de search_fields."""
+    own_fields = {path.split('__', 1)[0] for path in model.search_fields}
+    return bool(own_fields.intersection(update_fields))
+
+
+def _relations_to(model, target):
+    """Nombres de FK de model que search_fields recorre hacia target (ej. 'customer')."""
+    names = {path.split('__', 1)[0] for path in model.search_fields if '__' in path}
+    return [name for name in sorted(names) if model._meta.get_field(name).related_model is target]
+
+
+# --- Mantenimiento de documentos ---
+
+def _get_document_model():
+    from core.models import SearchDocument
+    return SearchDocument
+
+
+def _upsert_documents(document_model, documents):
+    document_model.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['model', 'object_id'],
+        update_fields=['company', 'content', 'updated_at'],
+    )
+
+
+def instance_search_content(instance):
+    """Contenido del documento de una instancia (sigue relaciones de search_fields)."""
+    values = []
+    for path in instance.search_fields:
+        value = instance
+        for attr in path.split('__'):
+            value = getattr(value, attr, None)
+            if value is None:
+                break
+        values.append(value)
+    return build_search_content(values)
+
+
+def index_instance(instance):
+    """
+    Crea o actualiza el documento de la instancia.
+
+    Returns:
+        bool: True si el contenido cambió (o el documento no existía)
+    """
+    document_model = _get_document_model()
+    label = model_label(type(instance))
+    content = instance_search_content(instance)
+    current = (
+        document_model.objects.filter(model=label, object_id=instance.pk)
+        .values_list('content', flat=True)
+        .first()
+    )
+    if current == content:
+        return False
+    _upsert_documents(document_model, [
+        document_model(company_id=instance.company_id, model=label, object_id=instance.pk, content=content),
+    ])
+    return True
+
+
+def delete_instance_document(instance):
+    _get_document_model().objects.filter(model=model_label(type(instance)), object_id=instance.pk).delete()
+
+
+def index_queryset(queryset, fields=None, document_model=None, batch_size=SEARCH_BATCH_SIZE):
+    """
+    Recalcula en lote los documentos de las filas del queryset con una sola
+    consulta values_list (los campos de relaciones salen por JOIN).
+    Sirve también con modelos históricos (migraciones) pasando fields y document_model.
+
+    Returns:
+        int: documentos escritos
+    """
+    model = queryset.model
+    fields = tuple(fields or model.search_fields)
+    document_model = document_model or _get_document_model()
+    label = model_label(model)
+    now = timezone.now()
+
+    total = 0
+    batch = []
+    rows = queryset.order_by().values_list('pk', 'company_id', *fields).iterator(chunk_size=batch_size)
+    for pk, company_id, *values in rows:
+        batch.append(document_model(
+            company_id=company_id,
+            model=label,
+            object_id=pk,
+            content=build_search_content(values),
+            updated_at=now,
+        ))
+        if len(batch) >= batch_size:
+            _upsert_documents(document_model, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        _upsert_documents(document_model, batch)
+        total += len(batch)
+    return total
+
+
+def reindex_dependents(instance):
+    """
+    Recalcula los documentos que incluyen campos de la instancia
+    (ej. al renombrar un cliente, los de sus operaciones).
+    """
+    return reindex_related(type(instance), [instance.pk])
+
+
+def reindex_related(target, pks):
+    """
+    Recalcula los documentos que incluyen campos de las filas `pks` de target
+    (ej. tras una importación masiva de clientes, los de sus operaciones).
+    """
+    total = 0
+    for model in get_searchable_models():
+        for relation in _relations_to(model, target):
+            total += index_queryset(model._default_manager.filter(**{f'{relation}__in': pks}))
+    return total
+
+
+def rebuild_search_documents(model, company=None, batch_size=SEARCH_BATCH_SIZE):
+    """
+    Recalcula todos los documentos del modelo (opcionalmente de una empresa) y
+    borra los huérfanos.
+
+    Returns:
+        int: documentos escritos
+    """
+    document_model = _get_document_model()
+    queryset = model._default_manager.all()
+    orphans = document_model.objects.filter(model=model_label(model))
+    if company is not None:
+        queryset = queryset.filter(company=company)
+        orphans = orphans.filter(company=company)
+    orphans.exclude(object_id__in=queryset.values('pk')).delete()
+    return index_queryset(queryset, batch_size=batch_size)
+
+
+# --- Consulta ---
+
+def _sqlite_fts_available(connection):
+    name = connection.settings_dict['NAME']
+    if name not in _sqlite_fts_tables:
+        with connection.cursor() as cursor:
+            _sqlite_fts_tables[name] = SQLITE_FTS_TABLE in connection.introspection.table_names(cursor)
+    return _sqlite_fts_tables[name]
+
+
+def _fts_phrase(token):
+    return '"%s"' % token.replace('"', '""')
+
+
+def _match_documents(documents, tokens, connection):
+    """Filtra documents a los que contienen todas las palabras."""
+    if connection.vendor == 'sqlite' and _sqlite_fts_available(connection):
+        indexed = [token for token in tokens if len(token) >= TRIGRAM_MIN_LENGTH]
+        if indexed:
+            documents = documents.filter(id__in=RawSQL(
+                f'SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s',
+                (' AND '.join(_fts_phrase(token) for token in indexed),),
+            ))
+        tokens = [token for token in tokens if len(token) < TRIGRAM_MIN_LENGTH]
+    for token in tokens:
+        documents = documents.filter(content__contains=token)
+    return documents
+
+
+def _rank_expression(tokens):
+    score = None
+    for token in tokens:
+        token_score = Case(
+            When(content__startswith=token, then=Value(3)),
+            When(content__contains=f' {token}', then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+        score = token_score if score is None else score + token_score
+    return score
+
+
+def search_queryset(queryset, term, ranked=False):
+    """
+    Filtra el queryset por el término (ver docstring del módulo). Un término
+    vacío devuelve el queryset sin cambios.
+
+    Args:
+        ranked: anota search_rank y ordena por relevancia (desempata el orden actual)
+    """
+    tokens = tokenize_search_term(term)
+    if not tokens:
+        return queryset
+
+    model = queryset.model
+    document_model = _get_document_model()
+    documents = _match_documents(
+        document_model.objects.filter(model=model_label(model)),
+        tokens,
+        connections[queryset.db],
+    )
+    queryset = queryset.filter(pk__in=documents.values('object_id'))
+
+    if ranked:
+        rank = document_model.objects.filter(
+            model=model_label(model),
+            object_id=OuterRef('pk'),
+        ).annotate(rank=_rank_expression(tokens)).values('rank')[:1]
+        ordering = queryset.query.order_by or model._meta.ordering
+        queryset = queryset.annotate(
+            search_rank=Subquery(rank, output_field=IntegerField()),
+        ).order_by('-search_rank', *ordering)
+    return queryset
+
+
+# --- Índice del motor (migraciones) ---
+
+def sqlite_supports_trigram(connection):
+    """FTS5 con tokenizer trigram (SQLite >= 3.34 compilado con FTS5)."""
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp._search_trigram_probe USING fts5(x, tokenize='trigram')")
+        except Exception:
+            return False
+        cursor.execute('DROP TABLE temp._search_trigram_probe')
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    """RunPython: crea el índice de texto del motor sobre core_searchdocument."""
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        if not sqlite_supports_trigram(connection):
+            return
+        fts = SQLITE_FTS_TABLE
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5("
+            f"content, content='core_searchdocument', content_rowid='id', tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON core_searchdocument BEGIN "
+            f"INSERT INTO {fts}(rowid, content) VALUES (new.id, new.content); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON core_searchdocument BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.id, old.content); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE ON core_searchdocument BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.id, old.content); "
+            f"INSERT INTO {fts}(rowid, content) VALUES (new.id, new.content); END"
+        )
+        schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        _sqlite_fts_tables.pop(connection.settings_dict['NAME'], None)
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {POSTGRES_TRGM_INDEX} '
+            f'ON core_searchdocument USING gin (content gin_trgm_ops)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    """RunPython (reversa): elimina el índice de texto del motor."""
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for suffix in ('_ai', '_ad', '_au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}')
+        _sqlite_fts_tables.pop(connection.settings_dict['NAME'], None)
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {POSTGRES_TRGM_INDEX}')
@@ -1,54 +1,133 @@
 """
 Servicios de detección de anomalías y alertas de seguridad.
+
+Detección de eliminaciones masivas (MASS_DELETION) con contadores en caché:
+cada eliminación/cancelación incrementa el contador del minuto actual de
+(empresa, usuario) y la ventana deslizante se obtiene sumando los últimos N
+minutos con un solo get_many, sin leer AuditLog. Umbral y ventana se
+configuran por empresa en CompanySettings. Una ráfaga genera una sola alerta:
+tras alertar se marca (empresa, usuario) durante la ventana y no se repite.
+
+Los contadores solo sirven si el caché es compartido entre procesos: con
+local-memory cada worker contaría su parte de la ráfaga (y un reinicio los
+pondría en cero), así que en ese caso se cuentan las acciones en AuditLog.
 """
 
-from django.utils import timezone
+import time
 from datetime import timedelta
 
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
 from core.models import AuditLog
 from core.utils.audit import log_audit
+from core.utils.cache import is_shared_cache
+
+DEFAULT_MASS_DELETION_THRESHOLD = 3
+DEFAULT_MASS_DELETION_WINDOW_MINUTES = 10
+
+
+def get_mass_deletion_policy(company):
+    """(umbral, ventana en minutos) de la empresa; valores por defecto si no tiene configuración."""
+    from config_app.services import get_company_settings
+    settings = get_company_settings(company)
+    if settings is None:
+        return DEFAULT_MASS_DELETION_THRESHOLD, DEFAULT_MASS_DELETION_WINDOW_MINUTES
+    return settings.mass_deletion_threshold, settings.mass_deletion_window_minutes
+
+
+def _counter_prefix(company_id, user_id):
+    return f'anomaly:{company_id}:{user_id}'
+
+
+def _increment(key, timeout):
+    if cache.add(key, 1, timeout=timeout):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expiró entre add e incr
+        cache.set(key, 1, timeout=timeout)
+        return 1
+
+
+def _count_with_cache(prefix, window_minutes):
+    """Suma la acción actual al contador del minuto y devuelve el total de la ventana."""
+    minute = int(time.time() // 60)
+    _increment(f'{prefix}:{minute}', timeout=window_minutes * 60 + 60)
+    bucket_keys = [f'{prefix}:{m}' for m in range(minute - window_minutes + 1, minute + 1)]
+    return sum(cache.get_many(bucket_keys).values())
+
+
+def _audit_logs_in_window(company, user, window_minutes):
+    return AuditLog.objects.filter(
+        company=company,
+        user=user,
+        timestamp__gte=timezone.now() - timedelta(minutes=window_minutes),
+    )
+
+
+def _count_with_audit_log(company, user, window_minutes):
+    """Eliminaciones y cancelaciones de operaciones auditadas en la ventana (caché no compartido)."""
+    destructive = Q(action='delete') | Q(
+        action__in=('update', 'cancel'),
+        model_name='Operation',
+        changes__status='cancelled',
+    )
+    return _audit_logs_in_window(company, user, window_minutes).filter(destructive).count()
+
+
+def _already_alerted(company, user, prefix, window_minutes, shared):
+    """Marca la alerta de la ráfaga; False solo para la primera acción que supera el umbral."""
+    if shared:
+        return not cache.add(f'{prefix}:alerted', True, timeout=window_minutes * 60)
+    return _audit_logs_in_window(company, user, window_minutes).filter(
+        action='security_alert',
+        changes__alert_type='MASS_DELETION',
+    ).exists()
 
 
 def check_anomalous_behavior(user, company):
     """
-    Revisa los AuditLog de los últimos 10 minutos del usuario en la empresa.
-    Si hay más de 3 acciones de tipo DELETE o cancelaciones de operaciones,
-    registra SECURITY_ALERT: MASS_DELETION.
+    Registra una acción destructiva (eliminación o cancelación de operación) del
+    usuario en la empresa y evalúa la ventana deslizante. Llamar una vez por acción,
+    después de auditarla (sin caché compartido se cuentan las entradas de AuditLog).
+    Si en la ventana hay más acciones que el umbral (por defecto más de 3 en 10
+    minutos), registra SECURITY_ALERT: MASS_DELETION, una sola vez por ráfaga.
+    
+    Returns:
+        bool: True si se registró una alerta en esta llamada
     """
-    cutoff = timezone.now() - timedelta(minutes=10)
-    logs = AuditLog.objects.filter(
+    if user is None or company is None:
+        return False
+
+    threshold, window_minutes = get_mass_deletion_policy(company)
+    window_minutes = max(window_minutes, 1)
+    prefix = _counter_prefix(company.pk, user.pk)
+    shared = is_shared_cache()
+    if shared:
+        count = _count_with_cache(prefix, window_minutes)
+    else:
+        count = _count_with_audit_log(company, user, window_minutes)
+
+    if count <= threshold:
+        return False
+    # Una alerta por ráfaga: solo la primera acción que supera el umbral la registra
+    if _already_alerted(company, user, prefix, window_minutes, shared):
+        return False
+
+    log_audit(
         company=company,
         user=user,
-        timestamp__gte=cutoff,
-    ).order_by('-timestamp')
-
-    count = 0
-    for log in logs:
-        if log.action == 'delete':
-            count += 1
-        elif (
-            log.action in ('update', 'cancel')
-            and log.model_name == 'Operation'
-            and isinstance(log.changes, dict)
-            and log.changes.get('status') == 'cancelled'
-        ):
-            count += 1
-        if count > 3:
-            break
-
-    if count > 3:
-        log_audit(
-            company=company,
-            user=user,
-            action='security_alert',
-            model_name='SecurityAlert',
-            object_id=None,
-            changes={
-                'alert_type': 'MASS_DELETION',
-                'count': count,
-                'window_minutes': 10,
-            },
-            ip_address=None,
-        )
-        return True
-    return False
+        action='security_alert',
+        model_name='SecurityAlert',
+        object_id=None,
+        changes={
+            'alert_type': 'MASS_DELETION',
+            'count': count,
+            'window_minutes': window_minutes,
+        },
+        ip_address=None,
+    )
+    return True
@@ -0,0 +1,439 @@
+"""
+Generación de datos masivos para stress test (manage.py load_stress_test_data).
+
+Pensado para reproducir volúmenes de producción en local (ej. un millón de
+operaciones): todo se inserta con bulk_create por lotes y cada lote va en su
+propia transacción, así que cortar la carga deja los lotes anteriores completos
+y la numeración consistente. Lo que las señales no ven se recalcula por lote
+(documentos de búsqueda) o al final (resúmenes diarios y cachés).
+
+Distribuciones:
+    - Fechas: crecimiento a lo largo del período, menos actividad sábados y
+      domingos, pico en diciembre y baja en enero.
+    - Clientes: 20% frecuentes concentran la mayoría de las ventas, 60% normales
+      y 20% ocasionales. Los productos siguen la misma curva (alta, media y baja rotación).
+    - Estados: 80% confirmadas, 3% canceladas y el resto borradores, que son
+      mayoría en la última semana.
+
+Las operaciones generadas no mueven stock ni generan kardex (StockMovement): los
+productos conservan el stock inicial.
+
+Para cargar varias empresas en paralelo la carga de cada una corre en un proceso
+del pool (ver core.stress_worker).
+"""
+
+import itertools
+import random
+import re
+import time
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Company
+from core.services import invalidate_dashboard_cache
+from core.utils.search import index_queryset
+from customers.models import Customer
+from operations.models import Operation, OperationItem
+from operations.services import (
+    format_operation_number,
+    get_company_tax_rate,
+    rebuild_daily_summaries,
+    reserve_operation_numbers,
+)
+from products.models import Product
+from reports.engine import invalidate_reports_cache
+from suppliers.models import Supplier
+
+# Filas por bulk_create (y por transacción)
+STRESS_BATCH_SIZE = 2000
+
+TWOPLACES = Decimal('0.01')
+
+# Peso relativo de cada tramo (20% frecuentes, 60% normales, 20% ocasionales)
+TIER_WEIGHTS = ((0.2, 12.0), (0.8, 2.0), (1.0, 0.5))
+
+# Actividad por día de la semana (lunes = 0) y por mes
+WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.0, 1.1, 0.5, 0.15)
+MONTH_WEIGHTS = {1: 0.75, 2: 0.85, 3: 1.0, 4: 1.0, 5: 1.0, 6: 0.95, 7: 1.0, 8: 1.0, 9: 1.0, 10: 1.05, 11: 1.15, 12: 1.35}
+
+# Las operaciones de los últimos días siguen mayormente en borrador
+RECENT_DRAFT_DAYS = 7
+
+_TRAILING_DIGITS = re.compile(r'(\d+)$')
+
+NOMBRES = [
+    'Juan', 'María', 'Carlos', 'Ana', 'Luis', 'Laura', 'Pedro', 'Sofía',
+    'Diego', 'Valentina', 'Martín', 'Camila', 'Andrés', 'Lucía', 'Fernando',
+    'Isabella', 'Roberto', 'Emma', 'Javier', 'Olivia', 'Miguel', 'Mía',
+    'Ricardo', 'Sara', 'Gustavo', 'Elena', 'Daniel', 'Carmen', 'Alejandro', 'Rosa',
+]
+APELLIDOS = [
+    'García', 'Rodríguez', 'González', 'Fernández', 'López', 'Martínez',
+    'Sánchez', 'Pérez', 'Gómez', 'Martín', 'Jiménez', 'Ruiz', 'Hernández',
+    'Díaz', 'Moreno', 'Muñoz', 'Álvarez', 'Romero', 'Alonso', 'Gutiérrez',
+    'Navarro', 'Torres', 'Domínguez', 'Vázquez', 'Ramos', 'Gil', 'Ramírez',
+    'Serrano', 'Blanco', 'Suárez',
+]
+RAZONES_SOCIALES = [
+    'Comercial', 'Distribuidora', 'Servicios', 'Industrias', 'Construcciones',
+    'Inversiones', 'Importadora', 'Exportadora', 'Logística', 'Tecnología',
+]
+SOCIEDADES = ['S.A.', 'S.R.L.', 'S.A.S.', '']
+RUBROS = [
+    'Insumos Industriales', 'Materiales de Construcción', 'Equipamiento',
+    'Servicios Técnicos', 'Logística y Transporte', 'Tecnología',
+    'Materias Primas', 'Herramientas', 'Repuestos', 'Suministros',
+]
+LOCALIDADES = [
+    'Buenos Aires', 'Córdoba', 'Rosario', 'Mendoza', 'Tucumán',
+    'La Plata', 'Mar del Plata', 'Salta', 'Santa Fe', 'San Juan',
+]
+CATEGORIAS_PRODUCTOS = [
+    'Tornillo', 'Tuerca', 'Arandela', 'Perno', 'Clavo', 'Remache',
+    'Repuesto', 'Componente', 'Material', 'Insumo', 'Herramienta',
+    'Equipo', 'Máquina', 'Dispositivo', 'Accesorio', 'Pieza',
+    'Rodamiento', 'Válvula', 'Manguera', 'Cable', 'Filtro',
+    'Bomba', 'Motor', 'Transmisión', 'Sistema', 'Módulo',
+]
+TIPOS_PRODUCTOS = [
+    'galvanizado', 'inoxidable', 'acerado', 'plástico', 'aluminio',
+    'hierro', 'cobre', 'bronce', 'niquelado', 'cromado',
+    'estándar', 'premium', 'industrial', 'comercial', 'residencial',
+]
+MEDIDAS = ['3cm', '5cm', '10cm', '15cm', '20cm', '25cm', '30cm', '1/2"', '3/4"', '1"']
+UNIDADES = ['unidad', 'kg', 'm', 'm²', 'm³', 'litro']
+CATEGORIAS_SERVICIOS = [
+    'Mantenimiento', 'Reparación', 'Instalación', 'Consultoría',
+    'Soporte', 'Capacitación', 'Auditoría', 'Diseño', 'Desarrollo',
+    'Implementación', 'Configuración', 'Monitoreo', 'Optimización',
+    'Análisis', 'Testing', 'Migración', 'Integración', 'Seguridad',
+]
+TIPOS_SERVICIOS = [
+    'mensual', 'trimestral', 'anual', 'por hora', 'por proyecto',
+    'preventivo', 'correctivo', 'emergencia', 'programado', 'express',
+]
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _money(value):
+    return Decimal(str(value)).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+
+
+def tier_cum_weights(count):
+    """Pesos acumulados por posición (los primeros son los frecuentes), para random.choices."""
+    cum_weights = []
+    total = 0.0
+    for position in range(count):
+        share = (position + 1) / count
+        total += next(weight for limit, weight in TIER_WEIGHTS if share <= limit)
+        cum_weights.append(total)
+    return cum_weights
+
+
+class StressDataLoader:
+    """
+    Carga de datos de stress test para una empresa.
+
+    Args:
+        company: empresa destino
+        batch_size: filas por bulk_create / transacción
+        seed: semilla (misma semilla y volúmenes = mismos datos)
+        log: callable(str) para informar el avance (ej. self.stdout.write)
+    """
+
+    def __init__(self, company, batch_size=STRESS_BATCH_SIZE, seed=None, log=None):
+        self.company = company
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.user = None
+
+    # --- Escritura ---
+
+    def _insert(self, model, objects):
+        """bulk_create por lotes (una transacción por lote) + documentos de búsqueda."""
+        total = 0
+        for batch in _batched(objects, self.batch_size):
+            with transaction.atomic():
+                created = model.objects.bulk_create(batch)
+                index_queryset(model.objects.filter(pk__in=[obj.pk for obj in created]))
+            total += len(batch)
+        return total
+
+    def _next_code_number(self, model, prefix):
+        """Sigue la numeración de códigos de una carga anterior (códigos con ceros a la izquierda)."""
+        last = (
+            model.objects.filter(company=self.company, code__startswith=prefix)
+            .order_by('-code')
+            .values_list('code', flat=True)
+            .first()
+        )
+        match = _TRAILING_DIGITS.search(last or '')
+        return int(match.group(1)) + 1 if match else 1
+
+    # --- Datos de contacto ---
+
+    def _phone(self):
+        return f'+54 11 {self.random.randint(1000, 9999)}-{self.random.randint(1000, 9999)}'
+
+    def _address(self):
+        rnd = self.random
+        return f"{rnd.choice(['Av.', 'Calle', 'Bv.'])} {rnd.randint(100, 9999)} {rnd.choice(LOCALIDADES)}, Buenos Aires"
+
+    def _company_tax_id(self):
+        return f'30-{self.random.randint(10000000, 99999999)}-{self.random.randint(1, 9)}'
+
+    # --- Catálogos ---
+
+    def _build_customer(self, number):
+        rnd = self.random
+        if rnd.random() < 0.5:
+            name = f'{rnd.choice(RAZONES_SOCIALES)} {rnd.choice(APELLIDOS)} {rnd.choice(SOCIEDADES)}'.strip()
+            tax_id = self._company_tax_id()
+        else:
+            name = f'{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}'
+            tax_id = str(rnd.randint(20000000, 49999999))
+        return Customer(
+            company=self.company,
+            code=f'CLI-{number:06d}',
+            name=name,
+            tax_id=tax_id,
+            email=f'cliente{number}@example.com',
+            phone=self._phone(),
+            address=self._address(),
+            active=True,
+        )
+
+    def _build_supplier(self, number):
+        rnd = self.random
+        return Supplier(
+            company=self.company,
+            code=f'PROV-{number:06d}',
+            name=f'{rnd.choice(RAZONES_SOCIALES)} {rnd.choice(RUBROS)} {rnd.choice(APELLIDOS)} S.A.',
+            tax_id=self._company_tax_id(),
+            email=f'proveedor{number}@example.com',
+            phone=self._phone(),
+            address=self._address(),
+            active=True,
+        )
+
+    def _build_product(self, number):
+        rnd = self.random
+        # Alta rotación: 20% (baratos), media: 50%, baja: 30% (caros)
+        low, high = rnd.choices([(100, 5000), (5000, 50000), (50000, 500000)], weights=[20, 50, 30])[0]
+        categoria, tipo = rnd.choice(CATEGORIAS_PRODUCTOS), rnd.choice(TIPOS_PRODUCTOS)
+        return Product(
+            company=self.company,
+            code=f'PROD-{number:06d}',
+            name=f'{categoria} {tipo} {rnd.choice(MEDIDAS)}',
+            type='product',
+            description=f'Producto {categoria.lower()} de calidad {tipo}',
+            price=_money(rnd.uniform(low, high)),
+            unit_of_measure=rnd.choice(UNIDADES),
+            stock=_money(rnd.uniform(0, 1000)) if rnd.random() > 0.3 else None,
+            active=True,
+        )
+
+    def _build_service(self, number):
+        rnd = self.random
+        categoria, tipo = rnd.choice(CATEGORIAS_SERVICIOS), rnd.choice(TIPOS_SERVICIOS)
+        return Product(
+            company=self.company,
+            code=f'SERV-{number:06d}',
+            name=f'Servicio de {categoria} {tipo}',
+            type='service',
+            description=f'Servicio profesional de {categoria.lower()}',
+            price=_money(rnd.uniform(5000, 200000)),
+            unit_of_measure='hora' if tipo == 'por hora' else 'unidad',
+            active=True,
+        )
+
+    def create_customers(self, count):
+        start = self._next_code_number(Customer, 'CLI-')
+        return self._insert(Customer, (self._build_customer(start + i) for i in range(count)))
+
+    def create_suppliers(self, count):
+        start = self._next_code_number(Supplier, 'PROV-')
+        return self._insert(Supplier, (self._build_supplier(start + i) for i in range(count)))
+
+    def create_products(self, count):
+        """70% productos y 30% servicios."""
+        products_count = int(count * 0.7)
+        product_start = self._next_code_number(Product, 'PROD-')
+        service_start = self._next_code_number(Product, 'SERV-')
+        objects = itertools.chain(
+            (self._build_product(product_start + i) for i in range(products_count)),
+            (self._build_service(service_start + i) for i in range(count - products_count)),
+        )
+        return self._insert(Product, objects)
+
+    # --- Operaciones ---
+
+    def daily_counts(self, count, years):
+        """
+        Reparte `count` operaciones entre los días del período (hasta hoy) según
+        tendencia, día de la semana y mes. Returns: [(fecha, cantidad)] en orden.
+        """
+        days = max(int(round(years * 365)), 1)
+        end = timezone.localdate()
+        dates = [end - timedelta(days=days - 1 - offset) for offset in range(days)]
+        weights = [
+            (0.6 + 0.4 * offset / max(days - 1, 1)) * WEEKDAY_WEIGHTS[day.weekday()] * MONTH_WEIGHTS[day.month]
+            for offset, day in enumerate(dates)
+        ]
+        total = sum(weights)
+        counts = [int(count * weight / total) for weight in weights]
+        for index in self.random.choices(range(days), weights=weights, k=count - sum(counts)):
+            counts[index] += 1
+        return list(zip(dates, counts))
+
+    def _status(self, day, recent_since):
+        roll = self.random.random()
+        if day >= recent_since:
+            return 'draft' if roll < 0.5 else 'confirmed'
+        if roll < 0.8:
+            return 'confirmed'
+        return 'cancelled' if roll < 0.83 else 'draft'
+
+    def _iter_operations(self, count, items_per_op, years, sale_ratio):
+        """Genera (Operation sin número, [OperationItem sin operación]) en orden cronológico."""
+        customer_ids = list(Customer.objects.for_company(self.company).filter(active=True).order_by('pk').values_list('pk', flat=True))
+        supplier_ids = list(Supplier.objects.for_company(self.company).filter(active=True).order_by('pk').values_list('pk', flat=True))
+        products = list(
+            Product.objects.for_company(self.company).filter(active=True).order_by('pk').values_list('pk', 'type', 'price')
+        )
+        if not customer_ids or not supplier_ids or not products:
+            raise ValidationError('Se necesitan clientes, proveedores y productos activos para generar operaciones.')
+
+        rnd = self.random
+        # Popularidad de productos al azar; los clientes más antiguos son los frecuentes
+        rnd.shuffle(products)
+        customer_weights = tier_cum_weights(len(customer_ids))
+        supplier_weights = tier_cum_weights(len(supplier_ids))
+        product_weights = tier_cum_weights(len(products))
+        tax_rate = get_company_tax_rate(self.company)
+        recent_since = timezone.localdate() - timedelta(days=RECENT_DRAFT_DAYS)
+
+        for day, day_count in self.daily_counts(count, years):
+            for _ in range(day_count):
+                is_sale = rnd.random() < sale_ratio
+                picks = rnd.choices(products, cum_weights=product_weights, k=rnd.randint(1, items_per_op))
+                items = []
+                subtotal = Decimal('0.00')
+                for product_id, product_type, price in dict.fromkeys(picks):
+                    quantity = Decimal(rnd.randint(1, 8) if product_type == 'service' else rnd.randint(1, 50))
+                    # Venta con variación de precio, compra con margen
+                    factor = rnd.uniform(0.9, 1.15) if is_sale else rnd.uniform(0.6, 0.85)
+                    unit_price = _money(price * Decimal(str(round(factor, 4))))
+                    item_subtotal = (quantity * unit_price).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+                    subtotal += item_subtotal
+                    items.append(OperationItem(
+                        product_id=product_id,
+                        quantity=quantity,
+                        unit_price=unit_price,
+                        subtotal=item_subtotal,
+                    ))
+                tax = (subtotal * tax_rate / Decimal('100')).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+                operation = Operation(
+                    company=self.company,
+                    type='sale' if is_sale else 'purchase',
+                    date=day,
+                    customer_id=rnd.choices(customer_ids, cum_weights=customer_weights)[0] if is_sale else None,
+                    supplier_id=None if is_sale else rnd.choices(supplier_ids, cum_weights=supplier_weights)[0],
+                    subtotal=subtotal,
+                    tax=tax,
+                    total=subtotal + tax,
+                    status=self._status(day, recent_since),
+                    created_by=self.user,
+                )
+                yield operation, items
+
+    def _write_operations(self, batch):
+        """Numera (un bloqueo del contador por tipo) e inserta un lote de operaciones con sus items."""
+        with transaction.atomic():
+            for operation_type in ('sale', 'purchase'):
+                operations = [operation for operation, _ in batch if operation.type == operation_type]
+                if not operations:
+                    continue
+                first = reserve_operation_numbers(self.company, operation_type, len(operations))
+                for offset, operation in enumerate(operations):
+                    operation.number = format_operation_number(self.company, operation_type, first + offset)
+
+            Operation.objects.bulk_create([operation for operation, _ in batch])
+            items = []
+            for operation, operation_items in batch:
+                for item in operation_items:
+                    item.operation = operation
+                    items.append(item)
+            OperationItem.objects.bulk_create(items, batch_size=self.batch_size)
+            index_queryset(Operation.objects.filter(pk__in=[operation.pk for operation, _ in batch]))
+        return len(batch), len(items)
+
+    def create_operations(self, count, items_per_op=5, years=0.5, sale_ratio=0.7):
+        """
+        Genera `count` operaciones (70% ventas) de 1 a items_per_op items en los
+        últimos `years` años. Returns: (operaciones, items).
+        """
+        operations_total = items_total = 0
+        started = time.monotonic()
+        for batch in _batched(self._iter_operations(count, items_per_op, years, sale_ratio), self.batch_size):
+            operations, items = self._write_operations(batch)
+            operations_total += operations
+            items_total += items
+            elapsed = time.monotonic() - started
+            self.log(f'  {operations_total}/{count} operaciones ({operations_total / elapsed:.0f}/s)')
+        return operations_total, items_total
+
+    # --- Carga completa ---
+
+    def finish(self):
+        """Recalcula lo derivado de las operaciones e invalida los cachés de la empresa."""
+        rebuild_daily_summaries(self.company, batch_size=self.batch_size)
+        invalidate_dashboard_cache(self.company)
+        invalidate_reports_cache(self.company)
+
+    def run(self, customers=500, suppliers=100, products=5000, operations=100, items_per_op=5, years=0.5):
+        """
+        Carga completa. Returns: dict con lo creado y los segundos totales.
+        """
+        started = time.monotonic()
+        self.user = User.objects.filter(is_superuser=True).order_by('pk').first() or User.objects.order_by('pk').first()
+        result = {}
+
+        self.log(f'Cargando {customers} clientes...')
+        result['customers'] = self.create_customers(customers)
+        self.log(f'Cargando {suppliers} proveedores...')
+        result['suppliers'] = self.create_suppliers(suppliers)
+        self.log(f'Cargando {products} productos/servicios...')
+        result['products'] = self.create_products(products)
+        if operations:
+            self.log(f'Cargando {operations} operaciones ({years:g} años, hasta {items_per_op} items c/u)...')
+            result['operations'], result['items'] = self.create_operations(operations, items_per_op, years)
+        else:
+            result['operations'] = result['items'] = 0
+
+        self.log('Recalculando resúmenes diarios...')
+        self.finish()
+        result['seconds'] = round(time.monotonic() - started, 1)
+        return result
+
+
+def load_company(company_id, volumes, batch_size=STRESS_BATCH_SIZE, seed=None, log=None):
+    """Carga los volúmenes indicados (kwargs de StressDataLoader.run) en una empresa."""
+    company = Company.objects.get(pk=company_id)
+    loader = StressDataLoader(company, batch_size=batch_size, seed=seed, log=log)
+    return loader.run(**volumes)
+
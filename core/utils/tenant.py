@@ -0,0 +1,87 @@
+"""
+Resolución cacheada de la membresía activa de un usuario.
+
+CompanyMiddleware la consulta en cada request autenticada; cachearla deja el
+camino caliente sin consultas. Cada usuario tiene un contador de versión y la
+entrada de datos incluye esa versión (y el último login, así cada inicio de
+sesión arranca sin caché): al guardar o borrar una Membership o una Company
+(core.signals) se incrementa la versión de los usuarios afectados, en el momento
+y otra vez al confirmar la transacción (por si otra request cacheó el estado
+anterior mientras tanto). Con un caché compartido entre workers (obligatorio en
+producción, ver CACHE_URL) una revocación se aplica en la request siguiente; con
+el local-memory de tests/desarrollo la versión es por proceso, por lo que solo
+sirve con un único proceso. settings.MEMBERSHIP_CACHE_TIMEOUT acota además la
+vida de cada entrada.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.models import Membership
+
+
+def _version_key(user_id):
+    return f'membership:user:{user_id}:version'
+
+
+def _get_user_version(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _bump_user_version(user_id):
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # La clave no existía (o expiró): arrancar en 2 para no reutilizar la versión 1
+        cache.add(key, 2, timeout=None)
+
+
+def get_active_membership(user, company_id=None):
+    """
+    Membresía activa del usuario (con su empresa activa, via select_related).
+    Con company_id: la de esa empresa; sin company_id: la primera disponible.
+    Retorna None si no hay. El resultado (incluido None) se cachea por usuario.
+    """
+    slot = int(company_id) if company_id else 'default'
+    login_stamp = user.last_login.timestamp() if user.last_login else 0
+    key = f'membership:user:{user.pk}:{login_stamp}:v{_get_user_version(user.pk)}'
+    entries = cache.get(key) or {}
+    if slot in entries:
+        return entries[slot]
+
+    memberships = Membership.objects.select_related('company').filter(
+        user=user,
+        active=True,
+        company__active=True  # También verificar que la empresa esté activa
+    )
+    if company_id:
+        memberships = memberships.filter(company_id=company_id)
+    membership = memberships.first()
+
+    entries[slot] = membership
+    if membership is not None:
+        # La membresía por defecto queda también disponible por su empresa (la que se guarda en sesión)
+        entries[membership.company_id] = membership
+    cache.set(key, entries, getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 60))
+    return membership
+
+
+def invalidate_user_memberships(user_ids):
+    """Invalida la membresía cacheada de los usuarios (ya y al confirmar la transacción actual)."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    def _bump():
+        for user_id in user_ids:
+            _bump_user_version(user_id)
+
+    _bump()
+    transaction.on_commit(_bump)
@@ -2,19 +2,27 @@
 Vistas del módulo core.
 """
 
-from datetime import datetime, timedelta
-
 from django.shortcuts import render, redirect
 from django.views.generic import TemplateView, UpdateView, View
 from django.contrib import messages
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.views import LoginView as AuthLoginView
 from django.utils.decorators import method_decorator
-from django.db.models import Count, Sum
-from django.http import Http404, HttpResponse
-from django.template.loader import render_to_string
-from .mixins import CompanyRequiredMixin, CompanyContextMixin
+from django.http import Http404, HttpResponse, JsonResponse
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from .constants import ROLE_ADMIN, ROLE_MANAGER
+from .mixins import CompanyRequiredMixin, CompanyContextMixin, RoleRequiredMixin
 from .models import Membership, Company
+from .services import (
+    DEFAULT_PERIOD,
+    get_company_currency,
+    get_dashboard_kpis,
+    render_dashboard_pdf,
+)
+from .utils.bulk_import import detect_import_format
+from .utils.metrics import request_metrics
+from .utils.request import get_client_ip
 from django.contrib.auth.models import User
 
 try:
@@ -32,117 +40,6 @@ def login_view(request):
     return AuthLoginView.as_view(template_name='registration/login.html')(request)
 
 
-def _get_period_dates(period):
-    """Devuelve (start_date, end_date, period_label) para period in ('7d', 'this_month', 'last_month')."""
-    today = datetime.now().date()
-    if period == '7d':
-        start = today - timedelta(days=6)
-        return start, today, 'Últimos 7 días'
-    if period == 'this_month':
-        start = today.replace(day=1)
-        return start, today, 'Este Mes'
-    if period == 'last_month':
-        first_this = today.replace(day=1)
-        last_prev = first_this - timedelta(days=1)
-        start = last_prev.replace(day=1)
-        return start, last_prev, 'Mes Pasado'
-    start = today.replace(day=1)
-    return start, today, 'Este Mes'
-
-
-def _chart_sales_vs_purchases_range(company, start_date, end_date):
-    """Para cada día en [start_date, end_date], total ventas y compras confirmadas."""
-    from operations.models import Operation
-
-    days = []
-    d = start_date
-    while d <= end_date:
-        days.append(d)
-        d += timedelta(days=1)
-
-    qs = (
-        Operation.objects.for_company(company)
-        .filter(status='confirmed', date__gte=start_date, date__lte=end_date)
-        .values('date', 'type')
-        .annotate(total=Sum('total'))
-    )
-    by_date = {}
-    for row in qs:
-        key = row['date'].isoformat() if hasattr(row['date'], 'isoformat') else str(row['date'])
-        if key not in by_date:
-            by_date[key] = {'sales': 0.0, 'purchases': 0.0}
-        if row['type'] == 'sale':
-            by_date[key]['sales'] = float(row['total'] or 0)
-        else:
-            by_date[key]['purchases'] = float(row['total'] or 0)
-
-    return [
-        {
-            'date': d.isoformat(),
-            'date_label': d.strftime('%d/%m'),
-            'sales': by_date.get(d.isoformat(), {}).get('sales', 0),
-            'purchases': by_date.get(d.isoformat(), {}).get('purchases', 0),
-        }
-        for d in days
-    ]
-
-
-def _chart_top_customers_range(company, start_date, end_date):
-    """Top 5 clientes por ventas confirmadas en el rango de fechas."""
-    from operations.models import Operation
-    from customers.models import Customer
-
-    top = (
-        Customer.objects.for_company(company)
-        .filter(
-            operations__type='sale',
-            operations__status='confirmed',
-            operations__company=company,
-            operations__date__gte=start_date,
-            operations__date__lte=end_date,
-        )
-        .annotate(total_sales=Sum('operations__total'))
-        .order_by('-total_sales')[:5]
-    )
-    return [{'name': c.name, 'total': float(c.total_sales or 0)} for c in top]
-
-
-def get_dashboard_period_data(company, period):
-    """
-    Datos del dashboard para un período: ventas/compras del período y datos para gráficos.
-    period: '7d' | 'this_month' | 'last_month'
-    """
-    from operations.models import Operation
-
-    start_date, end_date, period_label = _get_period_dates(period)
-    sales_agg = (
-        Operation.objects.for_company(company)
-        .filter(type='sale', status='confirmed', date__gte=start_date, date__lte=end_date)
-        .aggregate(total=Sum('total'), count=Count('id'))
-    )
-    purchases_agg = (
-        Operation.objects.for_company(company)
-        .filter(type='purchase', status='confirmed', date__gte=start_date, date__lte=end_date)
-        .aggregate(total=Sum('total'), count=Count('id'))
-    )
-    period_sales = sales_agg['total'] or 0
-    period_purchases = purchases_agg['total'] or 0
-    period_operations = (sales_agg['count'] or 0) + (purchases_agg['count'] or 0)
-    chart_sales_vs_purchases = _chart_sales_vs_purchases_range(company, start_date, end_date)
-    chart_top_customers = _chart_top_customers_range(company, start_date, end_date)
-    return {
-        'start_date': start_date,
-        'end_date': end_date,
-        'period_label': period_label,
-        'period': period,
-        'period_sales': period_sales,
-        'period_purchases': period_purchases,
-        'period_operations': period_operations,
-        'chart_sales_vs_purchases': chart_sales_vs_purchases,
-        'chart_top_customers': chart_top_customers,
-    }
-
-
 class DashboardView(CompanyRequiredMixin, CompanyContextMixin, TemplateView):
     """
     Vista del dashboard principal con KPIs operativos y datos para Chart.js.
@@ -157,52 +54,8 @@ class DashboardView(CompanyRequiredMixin, CompanyContextMixin, TemplateView):
         company = self.get_company()
 
         if company:
-            from operations.models import Operation
-            from customers.models import Customer
-            from products.models import Product
-
-            today = datetime.now().date()
-            first_day_month = today.replace(day=1)
-
-            # Ventas del mes (solo confirmadas)
-            sales_month = Operation.objects.for_company(company).filter(
-                type='sale',
-                status='confirmed',
-                date__gte=first_day_month,
-                date__lte=today
-            ).aggregate(
-                total=Sum('total'),
-                count=Count('id')
-            )
-
-            # Compras del mes (solo confirmadas)
-            purchases_month = Operation.objects.for_company(company).filter(
-                type='purchase',
-                status='confirmed',
-                date__gte=first_day_month,
-                date__lte=today
-            ).aggregate(
-                total=Sum('total'),
-                count=Count('id')
-            )
-
-            # Operaciones pendientes (borradores)
-            pending_operations = Operation.objects.for_company(company).filter(
-                status='draft'
-            ).count()
-
-            # Clientes y productos activos
-            active_customers = Customer.objects.for_company(company).filter(active=True).count()
-            active_products = Product.objects.for_company(company).filter(active=True).count()
-
-            # --- Período para KPIs y gráficos (filtro dinámico) ---
-            period = self.request.GET.get('period', 'this_month')
-            if period not in ('7d', 'this_month', 'last_month'):
-                period = 'this_month'
-            period_data = get_dashboard_period_data(company, period)
-
-            # --- Tendencia ventas: últimos 30 días vs 30 días previos ---
-            ventas_tendencia = self._ventas_tendencia_30_dias(company, today)
+            period = self.request.GET.get('period', DEFAULT_PERIOD)
+            context.update(get_dashboard_kpis(company, period))
 
             # --- Alertas de seguridad (solo para rol ADMIN) ---
             security_alerts = []
@@ -216,69 +69,13 @@ class DashboardView(CompanyRequiredMixin, CompanyContextMixin, TemplateView):
                 )
 
             context.update({
-                'sales_month_total': sales_month['total'] or 0,
-                'sales_month_count': sales_month['count'] or 0,
-                'purchases_month_total': purchases_month['total'] or 0,
-                'purchases_month_count': purchases_month['count'] or 0,
-                'pending_operations': pending_operations,
-                'active_customers': active_customers,
-                'active_products': active_products,
-                'period': period_data['period'],
-                'period_label': period_data['period_label'],
-                'period_sales': period_data['period_sales'],
-                'period_purchases': period_data['period_purchases'],
-                'period_operations': period_data['period_operations'],
-                'has_data': period_data['period_operations'] > 0 or active_customers > 0 or active_products > 0,
-                'ventas_tendencia': ventas_tendencia,
-                'chart_sales_vs_purchases': period_data['chart_sales_vs_purchases'],
-                'chart_top_customers': period_data['chart_top_customers'],
                 'show_charts': True,
                 'security_alerts': security_alerts,
+                'currency': get_company_currency(company),
             })
 
         return context
 
-    def _ventas_tendencia_30_dias(self, company, today):
-        """
-        Variación porcentual de ventas confirmadas: últimos 30 días vs 30 días previos.
-        Retorna un float (porcentaje) o None si no hay período anterior para comparar.
-        """
-        from operations.models import Operation
-
-        end_last_30 = today
-        start_last_30 = today - timedelta(days=29)
-        start_prev_30 = today - timedelta(days=59)
-        end_prev_30 = today - timedelta(days=30)
-
-        sales_last_30 = (
-            Operation.objects.for_company(company)
-            .filter(
-                type='sale',
-                status='confirmed',
-                date__gte=start_last_30,
-                date__lte=end_last_30,
-            )
-            .aggregate(total=Sum('total'))['total']
-            or 0
-        )
-        sales_prev_30 = (
-            Operation.objects.for_company(company)
-            .filter(
-                type='sale',
-                status='confirmed',
-                date__gte=start_prev_30,
-                date__lte=end_prev_30,
-            )
-            .aggregate(total=Sum('total'))['total']
-            or 0
-        )
-
-        if sales_prev_30 == 0:
-            if sales_last_30 > 0:
-                return 100.0  # Todo el crecimiento es "nuevo"
-            return 0.0
-        diff = float(sales_last_30) - float(sales_prev_30)
-        return round((diff / float(sales_prev_30)) * 100, 1)
 
 @method_decorator(login_required, name='dispatch')
 class DashboardDataView(CompanyRequiredMixin, CompanyContextMixin, View):
@@ -292,15 +89,8 @@ class DashboardDataView(CompanyRequiredMixin, CompanyContextMixin, View):
             from django.http import HttpResponse
             return HttpResponse(status=403)
         from django.shortcuts import render
-        from customers.models import Customer
-        from products.models import Product
 
-        period = request.GET.get('period', 'this_month')
-        if period not in ('7d', 'this_month', 'last_month'):
-            period = 'this_month'
-        data = get_dashboard_period_data(company, period)
-        active_customers = Customer.objects.for_company(company).filter(active=True).count()
-        active_products = Product.objects.for_company(company).filter(active=True).count()
+        data = get_dashboard_kpis(company, request.GET.get('period', DEFAULT_PERIOD))
 
         context = {
             'period': data['period'],
@@ -310,8 +100,9 @@ class DashboardDataView(CompanyRequiredMixin, CompanyContextMixin, View):
             'period_operations': data['period_operations'],
             'chart_sales_vs_purchases': data['chart_sales_vs_purchases'],
             'chart_top_customers': data['chart_top_customers'],
-            'active_customers': active_customers,
-            'active_products': active_products,
+            'active_customers': data['active_customers'],
+            'active_products': data['active_products'],
+            'currency': get_company_currency(company),
             'show_charts': True,
         }
         return render(request, 'core/dashboard_data_partial.html', context)
@@ -322,67 +113,100 @@ class ExportDashboardPDFView(CompanyRequiredMixin, CompanyContextMixin, View):
     """
     Exporta el reporte del dashboard a PDF para el período indicado.
     GET ?period=7d|this_month|last_month
-    Reutiliza get_dashboard_period_data y añade las últimas 20 operaciones del período.
+    Reutiliza los KPIs cacheados del dashboard y añade las últimas 20 operaciones del período.
     """
     def get(self, request, *args, **kwargs):
-        from io import BytesIO
-        from operations.models import Operation
-        from customers.models import Customer
-        from products.models import Product
-
         company = self.get_company()
         if not company:
             return HttpResponse('No hay empresa seleccionada.', status=403)
 
-        period = request.GET.get('period', 'this_month')
-        if period not in ('7d', 'this_month', 'last_month'):
-            period = 'this_month'
-        data = get_dashboard_period_data(company, period)
-        start_date = data['start_date']
-        end_date = data['end_date']
-
-        operations = (
-            Operation.objects.for_company(company)
-            .filter(date__gte=start_date, date__lte=end_date, status='confirmed')
-            .select_related('customer', 'supplier')
-            .order_by('-date', '-id')[:20]
-        )
-        active_customers = Customer.objects.for_company(company).filter(active=True).count()
-        active_products = Product.objects.for_company(company).filter(active=True).count()
-
-        context = {
-            'company_name': company.name,
-            'period_label': data['period_label'],
-            'period_sales': data['period_sales'],
-            'period_purchases': data['period_purchases'],
-            'period_operations': data['period_operations'],
-            'active_customers': active_customers,
-            'active_products': active_products,
-            'operations': operations,
-            'report_date': datetime.now(),
-        }
-        html = render_to_string('core/reports/dashboard_pdf.html', context)
-
-        result = BytesIO()
         try:
-            from xhtml2pdf import pisa
-            src = BytesIO(html.encode('utf-8'))
-            pisa_status = pisa.CreatePDF(src, dest=result, encoding='utf-8')
-            if pisa_status.err:
-                return HttpResponse('Error al generar el PDF.', status=500)
+            content, filename = render_dashboard_pdf(company, request.GET.get('period', DEFAULT_PERIOD))
         except ImportError:
             return HttpResponse(
                 'La librería xhtml2pdf no está instalada. Ejecutá: pip install xhtml2pdf',
                 status=500,
             )
+        except RuntimeError:
+            return HttpResponse('Error al generar el PDF.', status=500)
 
-        result.seek(0)
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        filename = f'reporte-dashboard-{period}-{end_date}.pdf'
+        response = HttpResponse(content, content_type='application/pdf')
         response['Content-Disposition'] = f'inline; filename="{filename}"'
         return response
 
 
+class BulkImportView(CompanyRequiredMixin, CompanyContextMixin, RoleRequiredMixin, View):
+    """
+    Importación masiva desde CSV/XLSX (core.utils.bulk_import).
+    GET: formulario con las columnas aceptadas.
+    POST (file, dry_run opcional): valida e importa, y muestra totales y errores por fila.
+    Cada app la extiende indicando importer_class, title y list_url.
+    """
+    template_name = 'core/bulk_import.html'
+    required_roles = [ROLE_ADMIN, ROLE_MANAGER]
+    importer_class = None
+    title = ''
+    list_url = ''
+
+    def get_importer(self):
+        if self.importer_class is None:
+            raise ImproperlyConfigured(f'{type(self).__name__} requiere importer_class.')
+        return self.importer_class(self.get_company(), user=self.request.user)
+
+    def get_context_data(self, **kwargs):
+        importer = kwargs.pop('importer', None) or self.get_importer()
+        context = {
+            'title': self.title,
+            'list_url': self.list_url,
+            'columns': importer.column_help(),
+            'max_upload_mb': settings.IMPORT_MAX_UPLOAD_SIZE // (1024 * 1024),
+        }
+        context.update(kwargs)
+        return context
+
+    def get(self, request, *args, **kwargs):
+        return render(request, self.template_name, self.get_context_data())
+
+    def post(self, request, *args, **kwargs):
+        importer = self.get_importer()
+        upload = request.FILES.get('file')
+        dry_run = bool(request.POST.get('dry_run'))
+
+        if upload is None:
+            messages.error(request, 'Seleccioná un archivo CSV o Excel (.xlsx).')
+            return render(request, self.template_name, self.get_context_data(importer=importer))
+        if upload.size > settings.IMPORT_MAX_UPLOAD_SIZE:
+            messages.error(request, 'El archivo supera el tamaño máximo permitido.')
+            return render(request, self.template_name, self.get_context_data(importer=importer))
+
+        try:
+            result = importer.run(upload, detect_import_format(upload.name), dry_run=dry_run)
+        except ValidationError as exc:
+            messages.error(request, ' '.join(exc.messages))
+            # El archivo falló a mitad de camino: los lotes anteriores ya quedaron guardados
+            partial = importer.result
+            if partial is None or not partial.total:
+                return render(request, self.template_name, self.get_context_data(importer=importer))
+            if not partial.dry_run and partial.imported:
+                importer.audit(partial, filename=upload.name, ip_address=get_client_ip(request))
+                messages.warning(
+                    request,
+                    f'Antes del error se importaron {partial.created} {importer.label} nuevos y '
+                    f'{partial.updated} actualizados; el resto del archivo no se procesó.'
+                )
+            return render(request, self.template_name, self.get_context_data(importer=importer, result=partial))
+
+        if dry_run:
+            messages.info(request, f'Validación completa: {result.imported} filas válidas, {result.error_count} con errores. No se guardó nada.')
+        elif result.imported:
+            importer.audit(result, filename=upload.name, ip_address=get_client_ip(request))
+            messages.success(request, f'Importación completa: {result.created} {importer.label} creados, {result.updated} actualizados.')
+        if result.error_count:
+            messages.warning(request, f'{result.error_count} filas con errores no se importaron.')
+
+        return render(request, self.template_name, self.get_context_data(importer=importer, result=result))
+
+
 @method_decorator(login_required, name='dispatch')
 class ProfileView(CompanyContextMixin, UpdateView):
     """Vista de perfil del usuario."""
@@ -433,6 +257,21 @@ class CompanySelectView(CompanyContextMixin, TemplateView):
         return redirect('core:company_select')
 
 
+@method_decorator(login_required, name='dispatch')
+@method_decorator(user_passes_test(lambda u: u.is_superuser), name='dispatch')
+class RequestMetricsView(View):
+    """
+    Percentiles de latencia, consultas y tiempo SQL por vista (solo superusuarios).
+    Datos en memoria del proceso que atiende la request (ver core.middleware_metrics).
+    GET ?reset=1 descarta las muestras después de devolverlas.
+    """
+    def get(self, request, *args, **kwargs):
+        data = request_metrics.snapshot()
+        if request.GET.get('reset') == '1':
+            request_metrics.reset()
+        return JsonResponse({'views': data})
+
+
 def handler404(request, exception):
     """Maneja errores 404 con branding Suite Business."""
     return render(request, 'core/404.html', status=404)
@@ -0,0 +1,25 @@
+"""
+Importador masivo de clientes (core.utils.bulk_import).
+"""
+
+from core.utils.bulk_import import BulkImporter
+
+from .forms import CustomerForm
+from .models import Customer
+
+
+class CustomerImporter(BulkImporter):
+    """Clientes por código; acepta las columnas de la exportación CSV."""
+    model = Customer
+    form_class = CustomerForm
+    fields = ('code', 'name', 'tax_id', 'email', 'phone', 'address', 'notes', 'active')
+    aliases = {
+        'tax_id': ('CUIT', 'RUT', 'NIT'),
+        'active': ('Estado',),
+    }
+    label = 'clientes'
+
+    def after_import(self, result):
+        super().after_import(result)
+        from reports.engine import invalidate_reports_cache
+        invalidate_reports_cache(self.company)
@@ -266,6 +266,6 @@ class CustomerMultiTenantTestCase(TestCase):
         self.assertIn('attachment', response['Content-Disposition'])
         
         # Verificar que el CSV contiene solo datos de company1
-        content = response.content.decode('utf-8-sig')
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
         self.assertIn(self.customer1.name, content)
         self.assertNotIn(self.customer2.name, content)
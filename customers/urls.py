@@ -12,5 +12,6 @@ urlpatterns = [
     path('<int:pk>/editar/', views.CustomerUpdateView.as_view(), name='update'),
     path('<int:pk>/eliminar/', views.CustomerDeleteView.as_view(), name='delete'),
     path('exportar/', views.CustomerExportCSVView.as_view(), name='export_csv'),
+    path('importar/', views.CustomerImportView.as_view(), name='import'),
 ]
 
@@ -3,7 +3,6 @@
 from django.views.generic import ListView, CreateView, DetailView, UpdateView, DeleteView, View
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.db import models
 from core.mixins import (
     CompanyRequiredMixin, 
     CompanyContextMixin, 
@@ -11,14 +10,18 @@ from core.mixins import (
     CompanyObjectMixin,
     RoleRequiredMixin,
     HTMXResponseMixin,
+    KeysetPaginationMixin,
 )
 from core.constants import ROLE_ADMIN, ROLE_MANAGER, ROLE_OPERATOR
 from core.utils import log_audit
 from core.utils.request import get_client_ip
 from core.utils.security_services import check_anomalous_behavior
-from core.utils.csv_export import export_csv_response
+from core.utils.csv_export import export_csv_response, CSV_CHUNK_SIZE
+from core.views import BulkImportView
+from core.services import invalidate_dashboard_cache
 from .models import Customer
 from .forms import CustomerForm
+from .importers import CustomerImporter
 
 
 class CustomerListView(
@@ -26,6 +29,7 @@ class CustomerListView(
     CompanyContextMixin, 
     CompanyFilterMixin,
     HTMXResponseMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     """
@@ -38,6 +42,7 @@ class CustomerListView(
     model = Customer
     context_object_name = 'customers'
     paginate_by = 25
+    keyset_ordering = ('name', 'id')
     
     def get_queryset(self):
         """Filtra clientes por empresa actual. El filtrado por empresa es automático por CompanyFilterMixin."""
@@ -51,12 +56,7 @@ class CustomerListView(
         # Aplicar búsqueda si existe
         search = self.request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                models.Q(name__icontains=search) |
-                models.Q(code__icontains=search) |
-                models.Q(email__icontains=search) |
-                models.Q(tax_id__icontains=search)
-            )
+            queryset = queryset.search(search)
         
         # Aplicar filtro de activos si existe
         active_filter = self.request.GET.get('active', '')
@@ -65,7 +65,7 @@ class CustomerListView(
         elif active_filter == '0':
             queryset = queryset.filter(active=False)
         
-        return queryset.order_by('name')
+        return queryset.order_by('name', 'id')
     
     def get_context_data(self, **kwargs):
         """Añade datos adicionales al contexto."""
@@ -111,6 +111,7 @@ class CustomerCreateView(
             changes={'name': form.cleaned_data.get('name'), 'code': form.cleaned_data.get('code')},
             ip_address=get_client_ip(self.request)
         )
+        invalidate_dashboard_cache(self.get_company())
         
         messages.success(self.request, f'Cliente "{form.cleaned_data["name"]}" creado correctamente.')
         return response
@@ -187,6 +188,7 @@ class CustomerUpdateView(
             changes=changes,
             ip_address=get_client_ip(self.request)
         )
+        invalidate_dashboard_cache(self.get_company())
         
         messages.success(self.request, f'Cliente "{form.cleaned_data["name"]}" actualizado correctamente.')
         return response
@@ -213,6 +215,10 @@ class CustomerDeleteView(
     context_object_name = 'customer'
     required_roles = [ROLE_ADMIN, ROLE_MANAGER]
     
+    def form_valid(self, form):
+        """Desde Django 4 el POST elimina vía form_valid(); se delega en delete() (auditoría e invalidación)."""
+        return self.delete(self.request, *self.args, **self.kwargs)
+    
     def delete(self, request, *args, **kwargs):
         """Mensaje de éxito después de eliminar."""
         customer = self.get_object()
@@ -231,6 +237,7 @@ class CustomerDeleteView(
         )
         
         response = super().delete(request, *args, **kwargs)
+        invalidate_dashboard_cache(self.get_company())
         check_anomalous_behavior(request.user, self.get_company())
         messages.success(request, f'Cliente "{customer_name}" eliminado correctamente.')
         return response
@@ -255,12 +262,7 @@ class CustomerExportCSVView(
         # Aplicar búsqueda
         search = request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                models.Q(name__icontains=search) |
-                models.Q(code__icontains=search) |
-                models.Q(email__icontains=search) |
-                models.Q(tax_id__icontains=search)
-            )
+            queryset = queryset.search(search)
         
         # Aplicar filtro de activos
         active_filter = request.GET.get('active', '')
@@ -269,22 +271,33 @@ class CustomerExportCSVView(
         elif active_filter == '0':
             queryset = queryset.filter(active=False)
         
-        customers = queryset.order_by('name')
-        
-        # Preparar datos para CSV
+        # Preparar datos para CSV (streaming: sin materializar el queryset)
         headers = ['Código', 'Nombre', 'CUIT/RUT/NIT', 'Email', 'Teléfono', 'Dirección', 'Estado']
-        rows = []
-        
-        for customer in customers:
-            rows.append([
-                customer.code,
-                customer.name,
-                customer.tax_id or '',
-                customer.email or '',
-                customer.phone or '',
-                customer.address or '',
-                'Activo' if customer.active else 'Inactivo',
-            ])
+        customers = queryset.order_by('name').values_list(
+            'code', 'name', 'tax_id', 'email', 'phone', 'address', 'active'
+        ).iterator(chunk_size=CSV_CHUNK_SIZE)
+        rows = (
+            [
+                code,
+                name,
+                tax_id or '',
+                email or '',
+                phone or '',
+                address or '',
+                'Activo' if active else 'Inactivo',
+            ]
+            for code, name, tax_id, email, phone, address, active in customers
+        )
         
         filename = f'clientes_{company.name.replace(" ", "_")}'
         return export_csv_response(filename, headers, rows)
+
+
+class CustomerImportView(BulkImportView):
+    """
+    Importación masiva de clientes desde CSV/XLSX (upsert por código).
+    Protegido por tenant y roles (admin, manager).
+    """
+    importer_class = CustomerImporter
+    title = 'Clientes'
+    list_url = reverse_lazy('customers:list')
@@ -1,7 +1,7 @@
 """Admin del módulo operations."""
 
 from django.contrib import admin
-from .models import Operation, OperationItem
+from .models import Operation, OperationItem, OperationDailySummary, OperationSequence, StockMovement
 
 
 class OperationItemInline(admin.TabularInline):
@@ -49,3 +49,54 @@ class OperationItemAdmin(admin.ModelAdmin):
         if hasattr(request, 'current_company') and request.current_company:
             return qs.filter(operation__company=request.current_company)
         return qs.none()
+
+
+@admin.register(OperationDailySummary)
+class OperationDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'type', 'count', 'subtotal', 'tax', 'total', 'company']
+    list_filter = ['type', 'company']
+    readonly_fields = ['company', 'date', 'type', 'count', 'subtotal', 'tax', 'total']
+    date_hierarchy = 'date'
+    
+    def get_queryset(self, request):
+        """Filtra por empresa para usuarios no-superuser."""
+        qs = super().get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        if hasattr(request, 'current_company') and request.current_company:
+            return qs.filter(company=request.current_company)
+        return qs.none()
+
+
+@admin.register(OperationSequence)
+class OperationSequenceAdmin(admin.ModelAdmin):
+    list_display = ['company', 'type', 'last_number']
+    list_filter = ['type', 'company']
+    readonly_fields = ['company', 'type', 'last_number']
+    
+    def get_queryset(self, request):
+        """Filtra por empresa para usuarios no-superuser."""
+        qs = super().get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        if hasattr(request, 'current_company') and request.current_company:
+            return qs.filter(company=request.current_company)
+        return qs.none()
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['timestamp', 'product', 'kind', 'delta', 'balance', 'operation', 'company']
+    list_filter = ['kind', 'company']
+    readonly_fields = ['company', 'product', 'operation', 'kind', 'delta', 'balance', 'timestamp']
+    raw_id_fields = ['product', 'operation']
+    date_hierarchy = 'timestamp'
+    
+    def get_queryset(self, request):
+        """Filtra por empresa para usuarios no-superuser."""
+        qs = super().get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        if hasattr(request, 'current_company') and request.current_company:
+            return qs.filter(company=request.current_company)
+        return qs.none()
@@ -10,6 +10,7 @@ from .models import Operation, OperationItem
 from customers.models import Customer
 from suppliers.models import Supplier
 from products.models import Product
+from products.widgets import ProductAutocompleteWidget
 
 
 class OperationForm(forms.ModelForm):
@@ -105,13 +106,17 @@ class OperationForm(forms.ModelForm):
 
 
 class OperationItemForm(forms.ModelForm):
-    """Formulario para items de operación."""
+    """
+    Formulario para items de operación.
+    El producto se elige por autocompletado (ProductAutocompleteWidget): el
+    queryset solo se usa para validar el id enviado, nunca se lista entero.
+    """
     
     class Meta:
         model = OperationItem
         fields = ['product', 'quantity', 'unit_price']
         widgets = {
-            'product': forms.Select(attrs={'class': 'form-select'}),
+            'product': ProductAutocompleteWidget(attrs={'class': 'form-control'}),
             'quantity': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0.01'}),
             'unit_price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0'}),
         }
@@ -0,0 +1,49 @@
+"""
+Management command para reconstruir los resúmenes diarios de operaciones.
+
+Uso:
+    python manage.py rebuild_operation_summaries
+    python manage.py rebuild_operation_summaries --company-id=1
+
+Borra y recalcula OperationDailySummary a partir de las operaciones confirmadas.
+Útil tras cargas masivas, migraciones de datos o para verificar consistencia.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import Company
+from operations.services import rebuild_daily_summaries
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes diarios de operaciones confirmadas (tabla del dashboard)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='ID de la empresa a reconstruir (por defecto: todas)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tamaño de lote para bulk_create (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        company_id = options.get('company_id')
+        batch_size = options['batch_size']
+
+        companies = Company.objects.all().order_by('id')
+        if company_id:
+            companies = companies.filter(id=company_id)
+            if not companies.exists():
+                self.stdout.write(self.style.ERROR(f'Empresa con ID {company_id} no existe.'))
+                return
+
+        for company in companies:
+            rows = rebuild_daily_summaries(company, batch_size=batch_size)
+            self.stdout.write(f'  {company.name}: {rows} filas de resumen')
+
+        self.stdout.write(self.style.SUCCESS('✓ Resúmenes diarios reconstruidos'))
@@ -0,0 +1,58 @@
+"""
+Management command para reconciliar el stock de productos con el kardex.
+
+Uso:
+    python manage.py reconcile_stock
+    python manage.py reconcile_stock --company-id=1 --dry-run
+
+Para cada producto con movimientos (StockMovement), iguala Product.stock al último
+saldo registrado. Útil para detectar y corregir desvíos por cambios manuales.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import Company
+from operations.services import reconcile_stock_from_ledger
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el stock de los productos a partir del kardex (movimientos de stock)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='ID de la empresa a reconciliar (por defecto: todas)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tamaño de lote para bulk_update (default: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informa los productos con diferencia, sin modificarlos'
+        )
+
+    def handle(self, *args, **options):
+        company_id = options.get('company_id')
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        companies = Company.objects.all().order_by('id')
+        if company_id:
+            companies = companies.filter(id=company_id)
+            if not companies.exists():
+                self.stdout.write(self.style.ERROR(f'Empresa con ID {company_id} no existe.'))
+                return
+
+        for company in companies:
+            fixed = reconcile_stock_from_ledger(company, batch_size=batch_size, dry_run=dry_run)
+            self.stdout.write(f'  {company.name}: {fixed} productos con diferencia')
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS('✓ Verificación completada (sin cambios)'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ Stock reconciliado con el kardex'))
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:43
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_daily_summaries(apps, schema_editor):
+    """
+    Carga inicial de los resúmenes a partir de las operaciones confirmadas
+    (misma agregación que operations.services.rebuild_daily_summaries, con modelos históricos).
+    """
+    Operation = apps.get_model('operations', 'Operation')
+    OperationDailySummary = apps.get_model('operations', 'OperationDailySummary')
+    rows = (
+        Operation.objects.filter(status='confirmed')
+        .values('company_id', 'date', 'type')
+        .annotate(
+            ops_count=Count('id'),
+            ops_subtotal=Sum('subtotal'),
+            ops_tax=Sum('tax'),
+            ops_total=Sum('total'),
+        )
+        .order_by('company_id', 'date', 'type')
+    )
+    summaries = (
+        OperationDailySummary(
+            company_id=row['company_id'],
+            date=row['date'],
+            type=row['type'],
+            count=row['ops_count'],
+            subtotal=row['ops_subtotal'] or Decimal('0.00'),
+            tax=row['ops_tax'] or Decimal('0.00'),
+            total=row['ops_total'] or Decimal('0.00'),
+        )
+        for row in rows.iterator()
+    )
+    OperationDailySummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_auditlog_action'),
+        ('operations', '0004_increase_operation_amounts_precision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperationDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('type', models.CharField(choices=[('sale', 'Venta'), ('purchase', 'Compra')], max_length=20, verbose_name='Tipo')),
+                ('count', models.IntegerField(default=0, verbose_name='Cantidad de operaciones')),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0.0, max_digits=15, verbose_name='Subtotal')),
+                ('tax', models.DecimalField(decimal_places=2, default=0.0, max_digits=15, verbose_name='Impuesto')),
+                ('total', models.DecimalField(decimal_places=2, default=0.0, max_digits=15, verbose_name='Total')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='operation_daily_summaries', to='core.company', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de operaciones',
+                'verbose_name_plural': 'Resúmenes diarios de operaciones',
+                'ordering': ['-date', 'type'],
+                'indexes': [models.Index(fields=['company', 'type', 'date'], name='operations__company_20a4fd_idx')],
+                'unique_together': {('company', 'date', 'type')},
+            },
+        ),
+        migrations.RunPython(build_daily_summaries, migrations.RunPython.noop),
+    ]
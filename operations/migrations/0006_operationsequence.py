@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_auditlog_action'),
+        ('operations', '0005_operationdailysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperationSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('sale', 'Venta'), ('purchase', 'Compra')], max_length=20, verbose_name='Tipo')),
+                ('last_number', models.PositiveBigIntegerField(default=0, verbose_name='Último número')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='operation_sequences', to='core.company', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Secuencia de numeración',
+                'verbose_name_plural': 'Secuencias de numeración',
+                'unique_together': {('company', 'type')},
+            },
+        ),
+    ]
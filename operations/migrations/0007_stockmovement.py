@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_auditlog_action'),
+        ('operations', '0006_operationsequence'),
+        ('products', '0003_product_stock_minimo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('confirm', 'Confirmación'), ('cancel', 'Cancelación')], max_length=20, verbose_name='Tipo de movimiento')),
+                ('delta', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Variación')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Saldo resultante')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha y hora')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='core.company', verbose_name='Empresa')),
+                ('operation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='operations.operation', verbose_name='Operación')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='products.product', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de stock',
+                'verbose_name_plural': 'Movimientos de stock',
+                'ordering': ['-timestamp', '-id'],
+                'indexes': [models.Index(fields=['company', 'product', 'timestamp'], name='operations__company_f276ec_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_auditlog_lookup_indexes'),
+        ('customers', '0002_customer_customers_c_company_10527e_idx'),
+        ('operations', '0007_stockmovement'),
+        ('suppliers', '0002_supplier_suppliers_s_company_6228e2_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='operation',
+            index=models.Index(fields=['company', '-date', '-number', '-id'], name='operation_list_keyset_idx'),
+        ),
+    ]
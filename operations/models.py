@@ -5,9 +5,10 @@ Modelos del módulo de operaciones (ventas y compras unificadas).
 from decimal import Decimal, ROUND_HALF_UP
 
 from django.db import models
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db.models import Sum, F
-from core.models import CompanyModelMixin
+from core.models import Company, CompanyModelMixin
 from core.managers import CompanyManager
 from customers.models import Customer
 from suppliers.models import Supplier
@@ -64,6 +65,9 @@ class Operation(CompanyModelMixin):
         blank=True
     )
     
+    # Campos del documento de búsqueda (core.utils.search)
+    search_fields = ('number', 'customer__name', 'supplier__name')
+    
     objects = CompanyManager()
     
     class Meta:
@@ -76,6 +80,7 @@ class Operation(CompanyModelMixin):
             models.Index(fields=['company', 'status']),
             models.Index(fields=['company', 'type', 'number']),
             models.Index(fields=['company', 'date']),  # Índice compuesto para búsquedas por fecha
+            models.Index(fields=['company', '-date', '-number', '-id'], name='operation_list_keyset_idx'),  # Paginación por cursor del listado
             models.Index(fields=['customer']),
             models.Index(fields=['supplier']),
         ]
@@ -92,8 +97,15 @@ class Operation(CompanyModelMixin):
             raise ValidationError({'customer': 'Una compra no puede tener un cliente asociado.'})
     
     def save(self, *args, **kwargs):
-        """Valida antes de guardar. Los totales se calculan en services."""
-        self.full_clean()
+        """
+        Valida antes de guardar. Los totales se calculan en services.
+        Con update_fields solo se validan esos campos (sin consultas de FK ni unicidad ajenas).
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.full_clean()
+        else:
+            self.full_clean(exclude=[f.name for f in self._meta.fields if f.name not in update_fields])
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -138,3 +150,119 @@ class OperationItem(models.Model):
     
     def __str__(self):
         return f'{self.product.name} - {self.quantity} x {self.unit_price}'
+
+
+class OperationDailySummary(models.Model):
+    """
+    Resumen diario pre-agregado de operaciones confirmadas (por empresa, día y tipo).
+    Se mantiene incrementalmente desde operations.services (confirmar/cancelar)
+    y se puede reconstruir con `manage.py rebuild_operation_summaries`.
+    El dashboard lee estas filas en lugar de sumar sobre Operation.
+    """
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        verbose_name='Empresa',
+        related_name='operation_daily_summaries'
+    )
+    date = models.DateField('Fecha')
+    type = models.CharField('Tipo', max_length=20, choices=Operation.TYPE_CHOICES)
+    count = models.IntegerField('Cantidad de operaciones', default=0)
+    subtotal = models.DecimalField('Subtotal', max_digits=15, decimal_places=2, default=0.00)
+    tax = models.DecimalField('Impuesto', max_digits=15, decimal_places=2, default=0.00)
+    total = models.DecimalField('Total', max_digits=15, decimal_places=2, default=0.00)
+
+    objects = CompanyManager()
+
+    class Meta:
+        verbose_name = 'Resumen diario de operaciones'
+        verbose_name_plural = 'Resúmenes diarios de operaciones'
+        unique_together = [['company', 'date', 'type']]
+        ordering = ['-date', 'type']
+        indexes = [
+            models.Index(fields=['company', 'type', 'date']),
+        ]
+
+    def __str__(self):
+        return f'{self.company_id} {self.date} {self.get_type_display()}: {self.count} / {self.total}'
+
+
+class OperationSequence(models.Model):
+    """
+    Contador de numeración por empresa y tipo de operación.
+    operations.services.next_operation_number lo bloquea (select_for_update) y lo
+    incrementa dentro de la misma transacción que crea la operación, por lo que la
+    numeración no tiene huecos ni colisiones aunque haya altas concurrentes.
+    """
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        verbose_name='Empresa',
+        related_name='operation_sequences'
+    )
+    type = models.CharField('Tipo', max_length=20, choices=Operation.TYPE_CHOICES)
+    last_number = models.PositiveBigIntegerField('Último número', default=0)
+
+    objects = CompanyManager()
+
+    class Meta:
+        verbose_name = 'Secuencia de numeración'
+        verbose_name_plural = 'Secuencias de numeración'
+        unique_together = [['company', 'type']]
+
+    def __str__(self):
+        return f'{self.company_id} {self.get_type_display()}: {self.last_number}'
+
+
+class StockMovement(models.Model):
+    """
+    Movimiento de inventario (kardex): cada cambio de Product.stock hecho por
+    operations.services deja una fila con la variación y el saldo resultante.
+    Permite consultar el stock a una fecha (get_stock_at) y reconciliar
+    Product.stock con `manage.py reconcile_stock`.
+    """
+
+    KIND_CHOICES = [
+        ('confirm', 'Confirmación'),
+        ('cancel', 'Cancelación'),
+    ]
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        verbose_name='Empresa',
+        related_name='stock_movements'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name='Producto',
+        related_name='stock_movements'
+    )
+    operation = models.ForeignKey(
+        Operation,
+        on_delete=models.SET_NULL,
+        verbose_name='Operación',
+        related_name='stock_movements',
+        blank=True,
+        null=True
+    )
+    kind = models.CharField('Tipo de movimiento', max_length=20, choices=KIND_CHOICES)
+    delta = models.DecimalField('Variación', max_digits=12, decimal_places=2)
+    balance = models.DecimalField('Saldo resultante', max_digits=12, decimal_places=2)
+    timestamp = models.DateTimeField('Fecha y hora', default=timezone.now)
+
+    objects = CompanyManager()
+
+    class Meta:
+        verbose_name = 'Movimiento de stock'
+        verbose_name_plural = 'Movimientos de stock'
+        ordering = ['-timestamp', '-id']
+        indexes = [
+            models.Index(fields=['company', 'product', 'timestamp']),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.timestamp:%Y-%m-%d %H:%M} {self.delta:+} = {self.balance}'
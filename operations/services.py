@@ -3,11 +3,18 @@ Servicios del módulo operations.
 Toda la lógica de negocio debe estar aquí, no en las views.
 """
 
+import re
+from datetime import date, datetime, time
 from decimal import Decimal, ROUND_HALF_UP
 from django.db import transaction
-from django.db.models import Sum, F
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
 from django.core.exceptions import ValidationError
-from operations.models import Operation, OperationItem
+from config_app.services import get_company_settings
+from core.services import invalidate_dashboard_cache
+from operations.models import (
+    Operation, OperationItem, OperationDailySummary, OperationSequence, StockMovement,
+)
 from customers.models import Customer
 from suppliers.models import Supplier
 from products.models import Product
@@ -18,20 +25,138 @@ TWOPLACES = Decimal("0.01")
 
 def get_company_tax_rate(company):
     """
-    Obtiene la tasa de impuesto por defecto de la empresa desde CompanySettings.
+    Obtiene la tasa de impuesto por defecto de la empresa desde CompanySettings
+    (memoizada, ver config_app.services.get_company_settings).
     Si no existe configuración, retorna Decimal('0.00').
     Evita usar float para precisión contable.
     """
-    try:
-        from config_app.models import CompanySettings
-        settings = CompanySettings.objects.filter(company=company).first()
-        if settings is not None and settings.tax_rate_default is not None:
-            return Decimal(str(settings.tax_rate_default))
-    except Exception:
-        pass
+    settings = get_company_settings(company)
+    if settings is not None and settings.tax_rate_default is not None:
+        return Decimal(str(settings.tax_rate_default))
     return Decimal('0.00')
 
 
+_TRAILING_DIGITS = re.compile(r'(\d+)$')
+
+
+def _max_existing_operation_number(company, type):
+    """
+    Mayor número ya usado por la empresa para el tipo (parte numérica final).
+    Solo se usa al crear el contador por primera vez, para continuar la numeración existente.
+    """
+    highest = 0
+    numbers = (
+        Operation.objects.filter(company=company, type=type)
+        .values_list('number', flat=True)
+        .iterator()
+    )
+    for number in numbers:
+        match = _TRAILING_DIGITS.search(number or '')
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return highest
+
+
+def format_operation_number(company, type, value):
+    """
+    Formatea un número de secuencia según CompanySettings (prefijo por tipo y dígitos).
+    Sin configuración: 6 dígitos sin prefijo (000001).
+    """
+    prefix, padding = '', 6
+    settings = get_company_settings(company)
+    if settings is not None:
+        prefix = settings.sale_number_prefix if type == 'sale' else settings.purchase_number_prefix
+        padding = settings.operation_number_padding or padding
+    return f'{prefix or ""}{str(value).zfill(padding)}'
+
+
+@transaction.atomic
+def next_operation_number(company, type):
+    """
+    Reserva y retorna el siguiente número de operación para (empresa, tipo).
+    
+    El contador (OperationSequence) se bloquea con select_for_update hasta el fin de
+    la transacción, así que dos altas concurrentes nunca obtienen el mismo número y,
+    si la transacción que lo reservó se revierte, el número se libera (sin huecos).
+    Llamar dentro de la transacción que crea la operación.
+    """
+    return format_operation_number(company, type, reserve_operation_numbers(company, type, 1))
+
+
+@transaction.atomic
+def reserve_operation_numbers(company, type, count):
+    """
+    Reserva `count` números consecutivos para (empresa, tipo) con un solo bloqueo
+    del contador y retorna el primero (sin formatear; ver format_operation_number).
+    Lo usan next_operation_number y las altas masivas (load_stress_test_data).
+    """
+    OperationSequence.objects.get_or_create(
+        company=company,
+        type=type,
+        defaults={'last_number': lambda: _max_existing_operation_number(company, type)},
+    )
+    sequence = OperationSequence.objects.select_for_update().get(company=company, type=type)
+    first = sequence.last_number + 1
+    sequence.last_number += count
+    sequence.save(update_fields=['last_number'])
+    return first
+
+
+def apply_operation_to_daily_summary(operation, sign=1):
+    """
+    Suma (sign=1) o resta (sign=-1) una operación confirmada en su resumen diario.
+    Usa F() para que dos confirmaciones concurrentes del mismo día no se pisen.
+    Debe llamarse dentro de la misma transacción que cambia el estado de la operación.
+    """
+    summary, _ = OperationDailySummary.objects.get_or_create(
+        company=operation.company,
+        date=operation.date,
+        type=operation.type,
+    )
+    sign = Decimal(sign)
+    OperationDailySummary.objects.filter(pk=summary.pk).update(
+        count=F('count') + int(sign),
+        subtotal=F('subtotal') + (operation.subtotal or Decimal('0.00')) * sign,
+        tax=F('tax') + (operation.tax or Decimal('0.00')) * sign,
+        total=F('total') + (operation.total or Decimal('0.00')) * sign,
+    )
+
+
+@transaction.atomic
+def rebuild_daily_summaries(company, batch_size=1000):
+    """
+    Reconstruye desde cero los resúmenes diarios de una empresa a partir de
+    sus operaciones confirmadas. Retorna la cantidad de filas generadas.
+    """
+    OperationDailySummary.objects.for_company(company).delete()
+    rows = (
+        Operation.objects.for_company(company)
+        .filter(status='confirmed')
+        .values('date', 'type')
+        .annotate(
+            ops_count=Count('id'),
+            ops_subtotal=Sum('subtotal'),
+            ops_tax=Sum('tax'),
+            ops_total=Sum('total'),
+        )
+        .order_by('date', 'type')
+    )
+    summaries = [
+        OperationDailySummary(
+            company=company,
+            date=row['date'],
+            type=row['type'],
+            count=row['ops_count'],
+            subtotal=row['ops_subtotal'] or Decimal('0.00'),
+            tax=row['ops_tax'] or Decimal('0.00'),
+            total=row['ops_total'] or Decimal('0.00'),
+        )
+        for row in rows.iterator()
+    ]
+    OperationDailySummary.objects.bulk_create(summaries, batch_size=batch_size)
+    return len(summaries)
+
+
 @transaction.atomic
 def create_operation(company, type, date, customer=None, supplier=None, notes=None, created_by=None):
     """
@@ -69,20 +194,8 @@ def create_operation(company, type, date, customer=None, supplier=None, notes=No
     if supplier and supplier.company != company:
         raise ValidationError('El proveedor debe pertenecer a la empresa actual.')
     
-    # Generar número de operación
-    last_operation = Operation.objects.filter(
-        company=company,
-        type=type
-    ).order_by('-number').first()
-    
-    if last_operation and last_operation.number:
-        try:
-            last_number = int(last_operation.number)
-            new_number = str(last_number + 1).zfill(6)
-        except ValueError:
-            new_number = '000001'
-    else:
-        new_number = '000001'
+    # Generar número de operación (contador bloqueado dentro de esta transacción)
+    new_number = next_operation_number(company, type)
     
     # Crear operación
     operation = Operation(
@@ -98,32 +211,19 @@ def create_operation(company, type, date, customer=None, supplier=None, notes=No
     )
     operation.full_clean()
     operation.save()
-    
+
+    # El borrador cuenta en las operaciones pendientes del dashboard
+    invalidate_dashboard_cache(company)
     return operation
 
 
-def add_item_to_operation(operation, product, quantity, unit_price):
+def _build_operation_item(operation, product, quantity, unit_price):
     """
-    Añade un item a una operación.
-    
-    Args:
-        operation: Instancia de Operation
-        product: Instancia de Product
-        quantity: Cantidad
-        unit_price: Precio unitario
-    
-    Returns:
-        OperationItem: Item creado
-    
-    Raises:
-        ValidationError: Si las validaciones fallan
+    Valida una línea y arma el OperationItem (sin guardar) con su subtotal cuantizado.
+    Compara por company_id para no consultar la empresa de cada producto.
     """
-    # Validar que la operación sea borrador
-    if operation.status != 'draft':
-        raise ValidationError('Solo se pueden añadir items a operaciones en estado borrador.')
-    
     # Validar que el producto pertenezca a la misma empresa
-    if product.company != operation.company:
+    if product.company_id != operation.company_id:
         raise ValidationError('El producto debe pertenecer a la empresa actual.')
     
     # Validar cantidad y precio
@@ -139,14 +239,37 @@ def add_item_to_operation(operation, product, quantity, unit_price):
         unit_price = Decimal(str(unit_price))
     subtotal = (quantity * unit_price).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
 
-    # Crear item con subtotal calculado
-    item = OperationItem(
+    return OperationItem(
         operation=operation,
         product=product,
         quantity=quantity,
         unit_price=unit_price,
         subtotal=subtotal
     )
+
+
+def add_item_to_operation(operation, product, quantity, unit_price):
+    """
+    Añade un item a una operación.
+    Para varias líneas usar add_items_to_operation (un solo INSERT y un solo recálculo).
+    
+    Args:
+        operation: Instancia de Operation
+        product: Instancia de Product
+        quantity: Cantidad
+        unit_price: Precio unitario
+    
+    Returns:
+        OperationItem: Item creado
+    
+    Raises:
+        ValidationError: Si las validaciones fallan
+    """
+    # Validar que la operación sea borrador
+    if operation.status != 'draft':
+        raise ValidationError('Solo se pueden añadir items a operaciones en estado borrador.')
+    
+    item = _build_operation_item(operation, product, quantity, unit_price)
     item.save()
     
     # Recalcular totales de la operación (OBLIGATORIO después de agregar item)
@@ -155,6 +278,39 @@ def add_item_to_operation(operation, product, quantity, unit_price):
     return item
 
 
+@transaction.atomic
+def add_items_to_operation(operation, items, batch_size=500):
+    """
+    Añade varios items a una operación con un solo bulk_create y un solo
+    recálculo de totales. Valida todas las líneas antes de escribir: si una
+    falla no se guarda ninguna.
+    
+    Args:
+        operation: Instancia de Operation
+        items: Iterable de dicts con 'product', 'quantity' y 'unit_price'
+        batch_size: Filas por INSERT
+    
+    Returns:
+        list[OperationItem]: Items creados
+    
+    Raises:
+        ValidationError: Si alguna línea no es válida
+    """
+    if operation.status != 'draft':
+        raise ValidationError('Solo se pueden añadir items a operaciones en estado borrador.')
+    
+    new_items = [
+        _build_operation_item(operation, item['product'], item['quantity'], item['unit_price'])
+        for item in items
+    ]
+    if not new_items:
+        return []
+    
+    created = OperationItem.objects.bulk_create(new_items, batch_size=batch_size)
+    recalculate_operation_totals(operation)
+    return created
+
+
 def remove_item_from_operation(operation, item_id):
     """
     Elimina un item de una operación.
@@ -222,49 +378,76 @@ def recalculate_operation_totals(operation):
     return operation
 
 
-@transaction.atomic
-def confirm_operation(operation, user=None):
+def apply_operation_stock(operation, user=None, reverse=False):
     """
-    Confirma una operación y actualiza el stock de productos (motor de inventario).
-    - Venta: resta cantidad al stock (ValidationError si queda negativo).
-    - Compra: suma cantidad al stock.
-    - Si stock <= stock_minimo tras la operación, se registra alerta "Stock Bajo" en auditoría.
+    Aplica sobre el stock el efecto de una operación (venta resta, compra suma) en forma
+    set-based; con reverse=True lo revierte (cancelación de una operación confirmada).
+    Debe llamarse dentro de la transacción que cambia el estado de la operación.
+    
+    - Una consulta agrega las cantidades por producto (un producto puede repetirse en varias líneas).
+    - Una consulta bloquea todos los productos afectados (select_for_update ordenado por id, así
+      confirmaciones concurrentes toman los locks en el mismo orden y no se interbloquean).
+    - Un bulk_update guarda los stocks, un bulk_create registra los movimientos (StockMovement)
+      y otro las alertas de "Stock Bajo".
+    Los servicios (type='service') no manejan stock.
+    
+    Returns:
+        list[Product]: Productos actualizados
+    
+    Raises:
+        ValidationError: Si algún stock queda negativo (no se modifica nada)
     """
-    if operation.status != 'draft':
-        raise ValidationError('Solo se pueden confirmar operaciones en estado borrador.')
-    if not operation.items.exists():
-        raise ValidationError('La operación debe tener al menos un item para ser confirmada.')
-    if operation.type == 'sale' and not operation.customer:
-        raise ValidationError('Una venta debe tener un cliente asociado.')
-    if operation.type == 'purchase' and not operation.supplier:
-        raise ValidationError('Una compra debe tener un proveedor asociado.')
-
-    from core.utils import log_audit
+    from core.utils import build_audit_log, log_audit_bulk
+
+    quantities = dict(
+        operation.items.filter(product__type='product')
+        .order_by()
+        .values('product_id')
+        .annotate(qty=Sum('quantity'))
+        .values_list('product_id', 'qty')
+    )
+    if not quantities:
+        return []
 
-    for item in operation.items.select_related('product').all():
-        product = item.product
-        if product.type != 'product':
-            continue
+    products = list(
+        Product.objects.select_for_update().filter(pk__in=quantities).order_by('pk')
+    )
+    # Venta resta y compra suma; la reversión invierte el signo
+    sign = Decimal('-1') if operation.type == 'sale' else Decimal('1')
+    if reverse:
+        sign = -sign
+    now = timezone.now()
+    movements = []
+    alerts = []
+    for product in products:
         current_stock = (product.stock or Decimal('0')).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
-        qty = (item.quantity or Decimal('0')).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+        qty = (quantities[product.pk] or Decimal('0')).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
         stock_min = (product.stock_minimo or Decimal('0')).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
 
-        if operation.type == 'sale':
-            new_stock = current_stock - qty
-            if new_stock < 0:
+        new_stock = current_stock + qty * sign
+        if new_stock < 0:
+            if reverse:
                 raise ValidationError(
-                    f'Stock insuficiente para "{product.name}" (código {product.code}). '
-                    f'Stock actual: {current_stock}, solicitado: {qty}. No se puede confirmar la venta.'
+                    f'Stock insuficiente para revertir "{product.name}" (código {product.code}). '
+                    f'Stock actual: {current_stock}, a descontar: {qty}. No se puede cancelar la compra.'
                 )
-            product.stock = new_stock.quantize(TWOPLACES, rounding=ROUND_HALF_UP)
-        else:
-            new_stock = current_stock + qty
-            product.stock = new_stock.quantize(TWOPLACES, rounding=ROUND_HALF_UP)
-
-        product.save(update_fields=['stock'])
+            raise ValidationError(
+                f'Stock insuficiente para "{product.name}" (código {product.code}). '
+                f'Stock actual: {current_stock}, solicitado: {qty}. No se puede confirmar la venta.'
+            )
+        product.stock = new_stock.quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+        movements.append(StockMovement(
+            company_id=operation.company_id,
+            product=product,
+            operation=operation,
+            kind='cancel' if reverse else 'confirm',
+            delta=product.stock - current_stock,
+            balance=product.stock,
+            timestamp=now,
+        ))
 
         if product.stock <= stock_min and stock_min > 0:
-            log_audit(
+            alerts.append(build_audit_log(
                 company=operation.company,
                 user=user,
                 action='update',
@@ -278,10 +461,122 @@ def confirm_operation(operation, user=None):
                     'stock_minimo': str(stock_min),
                 },
                 ip_address=None,
-            )
+            ))
+
+    Product.objects.bulk_update(products, ['stock'])
+    StockMovement.objects.bulk_create(movements)
+    log_audit_bulk(alerts)
+    return products
+
+
+def get_stock_at(product, at):
+    """
+    Stock de un producto en un momento dado, según el kardex (StockMovement).
+    
+    Usa el saldo del último movimiento hasta `at`; si no hay ninguno, el saldo previo
+    al primer movimiento posterior; si el producto no tiene movimientos, su stock actual.
+    
+    Args:
+        product: Instancia de Product
+        at: datetime, o date (se toma el final de ese día en la zona horaria actual)
+    
+    Returns:
+        Decimal: Stock a esa fecha
+    """
+    if isinstance(at, date) and not isinstance(at, datetime):
+        at = timezone.make_aware(datetime.combine(at, time.max))
+    movements = StockMovement.objects.filter(company_id=product.company_id, product=product)
+    balance = (
+        movements.filter(timestamp__lte=at)
+        .order_by('-timestamp', '-id')
+        .values_list('balance', flat=True)
+        .first()
+    )
+    if balance is not None:
+        return balance
+    following = (
+        movements.filter(timestamp__gt=at)
+        .order_by('timestamp', 'id')
+        .values_list('balance', 'delta')
+        .first()
+    )
+    if following is not None:
+        return following[0] - following[1]
+    return product.stock or Decimal('0.00')
+
+
+def reconcile_stock_from_ledger(company, batch_size=1000, dry_run=False):
+    """
+    Iguala Product.stock al último saldo del kardex para los productos de la empresa
+    cuyo stock difiere. Procesa en lotes (iterator + bulk_update). Los productos sin
+    movimientos no se tocan.
+    
+    Returns:
+        int: Cantidad de productos con diferencia (corregidos salvo dry_run)
+    """
+    latest_balance = (
+        StockMovement.objects.filter(product=OuterRef('pk'))
+        .order_by('-timestamp', '-id')
+        .values('balance')[:1]
+    )
+    drifted = (
+        Product.objects.for_company(company)
+        .annotate(ledger_stock=Subquery(latest_balance))
+        .filter(ledger_stock__isnull=False)
+        .filter(Q(stock__isnull=True) | ~Q(stock=F('ledger_stock')))
+        .only('id', 'stock')
+        .order_by('pk')
+    )
+    fixed = 0
+    batch = []
+    for product in drifted.iterator(chunk_size=batch_size):
+        product.stock = product.ledger_stock
+        batch.append(product)
+        if len(batch) >= batch_size:
+            if not dry_run:
+                Product.objects.bulk_update(batch, ['stock'])
+            fixed += len(batch)
+            batch = []
+    if batch:
+        if not dry_run:
+            Product.objects.bulk_update(batch, ['stock'])
+        fixed += len(batch)
+    return fixed
+
+
+@transaction.atomic
+def confirm_operation(operation, user=None):
+    """
+    Confirma una operación y actualiza el stock de productos (motor de inventario).
+    - Venta: resta cantidad al stock (ValidationError si queda negativo).
+    - Compra: suma cantidad al stock.
+    - Si stock <= stock_minimo tras la operación, se registra alerta "Stock Bajo" en auditoría.
+    La operación y los productos se bloquean (select_for_update) hasta el fin de la transacción.
+    """
+    # Releer el estado con la fila bloqueada: dos confirmaciones en paralelo no aplican stock dos veces
+    locked_status = (
+        Operation.objects.select_for_update()
+        .filter(pk=operation.pk)
+        .values_list('status', flat=True)
+        .first()
+    )
+    if locked_status is not None:
+        operation.status = locked_status
+    if operation.status != 'draft':
+        raise ValidationError('Solo se pueden confirmar operaciones en estado borrador.')
+    if not operation.items.exists():
+        raise ValidationError('La operación debe tener al menos un item para ser confirmada.')
+    if operation.type == 'sale' and not operation.customer:
+        raise ValidationError('Una venta debe tener un cliente asociado.')
+    if operation.type == 'purchase' and not operation.supplier:
+        raise ValidationError('Una compra debe tener un proveedor asociado.')
+
+    apply_operation_stock(operation, user=user)
 
     operation.status = 'confirmed'
     operation.save(update_fields=['status'])
+    apply_operation_to_daily_summary(operation, sign=1)
+    invalidate_dashboard_cache(operation.company)
     return operation
 
 
@@ -289,6 +584,9 @@ def confirm_operation(operation, user=None):
 def cancel_operation(operation, user=None):
     """
     Cancela una operación.
+    Si estaba confirmada, revierte su efecto sobre el stock (mismo motor set-based y
+    bloqueado que confirm_operation, con movimientos 'cancel' en el kardex) y la
+    descuenta del resumen diario.
     
     Args:
         operation: Instancia de Operation
@@ -300,13 +598,34 @@ def cancel_operation(operation, user=None):
     Raises:
         ValidationError: Si la operación no puede ser cancelada
     """
+    # Releer el estado con la fila bloqueada: una cancelación en paralelo no revierte dos veces
+    locked_status = (
+        Operation.objects.select_for_update()
+        .filter(pk=operation.pk)
+        .values_list('status', flat=True)
+        .first()
+    )
+    if locked_status is not None:
+        operation.status = locked_status
+
     # Validar que la operación no esté ya cancelada
     if operation.status == 'cancelled':
         raise ValidationError('La operación ya está cancelada.')
     
+    was_confirmed = operation.status == 'confirmed'
+
+    # Devolver el stock movido al confirmar
+    if was_confirmed:
+        apply_operation_stock(operation, user=user, reverse=True)
+
     # Cancelar operación
     operation.status = 'cancelled'
     operation.save(update_fields=['status'])
+
+    # Una operación confirmada deja de contar en el resumen diario
+    if was_confirmed:
+        apply_operation_to_daily_summary(operation, sign=-1)
+    invalidate_dashboard_cache(operation.company)
     
     return operation
 
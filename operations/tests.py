@@ -3,15 +3,39 @@ Tests del módulo operations.
 Verifica multi-tenant, totales y acciones de operaciones.
 """
 
-from django.test import TestCase, Client
+import threading
+from datetime import date, datetime
+from unittest import mock
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, Client, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.urls import reverse
-from core.models import Company, Membership
+from django.utils import timezone
+from core.models import AuditLog, Company, Membership
+from core.services import get_dashboard_kpis
 from customers.models import Customer
 from suppliers.models import Supplier
 from products.models import Product
-from operations.models import Operation, OperationItem
-from operations.services import create_operation, add_item_to_operation, recalculate_operation_totals
+from config_app.models import CompanySettings
+from operations.models import (
+    Operation, OperationItem, OperationDailySummary, OperationSequence, StockMovement,
+)
+from operations.services import (
+    create_operation,
+    next_operation_number,
+    add_item_to_operation,
+    add_items_to_operation,
+    recalculate_operation_totals,
+    confirm_operation,
+    cancel_operation,
+    get_stock_at,
+)
 
 
 class OperationMultiTenantTestCase(TestCase):
@@ -278,7 +302,7 @@ class OperationMultiTenantTestCase(TestCase):
         self.assertIn('attachment', response['Content-Disposition'])
         
         # Verificar que el CSV contiene solo datos de company1
-        content = response.content.decode('utf-8-sig')
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
         self.assertIn(self.operation1.number, content)
         self.assertNotIn(operation2.number, content)
     
@@ -294,6 +318,614 @@ class OperationMultiTenantTestCase(TestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, 200)
-        content = response.content.decode('utf-8-sig')
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
         self.assertIn(self.operation1.number, content)  # Venta
         # operation2 es compra, no debe aparecer si filtramos solo ventas
+
+
+class OperationDailySummaryTestCase(TestCase):
+    """Tests del resumen diario pre-agregado que alimenta el dashboard."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa 1', active=True)
+        self.customer = Customer.objects.create(company=self.company, code='C001', name='Cliente 1')
+        self.product = Product.objects.create(
+            company=self.company,
+            code='P001',
+            name='Producto 1',
+            price=Decimal('100.00'),
+            stock=Decimal('50.00'),
+        )
+    
+    def _create_sale(self, quantity=1):
+        operation = create_operation(
+            company=self.company,
+            type='sale',
+            date='2024-01-01',
+            customer=self.customer,
+            created_by=self.user
+        )
+        add_item_to_operation(operation, self.product, Decimal(quantity), Decimal('100.00'))
+        return operation
+    
+    def test_confirm_and_cancel_update_summary(self):
+        """Confirmar suma al resumen del día; cancelar una confirmada lo resta."""
+        op1 = self._create_sale(quantity=2)
+        op2 = self._create_sale(quantity=3)
+        confirm_operation(op1, user=self.user)
+        confirm_operation(op2, user=self.user)
+        
+        summary = OperationDailySummary.objects.get(company=self.company, date='2024-01-01', type='sale')
+        self.assertEqual(summary.count, 2)
+        self.assertEqual(summary.total, Decimal('500.00'))
+        
+        cancel_operation(op1, user=self.user)
+        summary.refresh_from_db()
+        self.assertEqual(summary.count, 1)
+        self.assertEqual(summary.total, Decimal('300.00'))
+    
+    def test_confirm_invalidates_dashboard_cache(self):
+        """Confirmar una operación invalida los KPIs cacheados de la empresa."""
+        cache.clear()
+        op = self._create_sale(quantity=2)
+        op.date = date.today()
+        op.save()
+        self.assertEqual(get_dashboard_kpis(self.company, '7d')['period_sales'], 0)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            confirm_operation(op, user=self.user)
+        
+        self.assertEqual(get_dashboard_kpis(self.company, '7d')['period_sales'], Decimal('200.00'))
+    
+    def test_cancel_draft_does_not_touch_summary(self):
+        """Cancelar un borrador no modifica el resumen."""
+        op = self._create_sale()
+        cancel_operation(op, user=self.user)
+        self.assertFalse(OperationDailySummary.objects.filter(company=self.company).exists())
+    
+    def test_rebuild_command_matches_incremental_summary(self):
+        """El comando de reconstrucción produce los mismos totales que el mantenimiento incremental."""
+        confirm_operation(self._create_sale(quantity=2), user=self.user)
+        confirm_operation(self._create_sale(quantity=1), user=self.user)
+        expected = list(
+            OperationDailySummary.objects.for_company(self.company).values_list('date', 'type', 'count', 'total')
+        )
+        
+        OperationDailySummary.objects.for_company(self.company).update(count=0, total=0)
+        call_command('rebuild_operation_summaries', company_id=self.company.id, stdout=StringIO())
+        
+        rebuilt = list(
+            OperationDailySummary.objects.for_company(self.company).values_list('date', 'type', 'count', 'total')
+        )
+        self.assertEqual(rebuilt, expected)
+
+
+class OperationBulkItemsTestCase(TestCase):
+    """Tests de add_items_to_operation (alta masiva de líneas)."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa 1', active=True)
+        self.other_company = Company.objects.create(name='Empresa 2', active=True)
+        CompanySettings.objects.create(company=self.company, tax_rate_default=Decimal('21.00'))
+        self.customer = Customer.objects.create(company=self.company, code='C001', name='Cliente 1')
+        self.products = [
+            Product.objects.create(company=self.company, code=f'P{i:03d}', name=f'Producto {i}', price=Decimal('10.00'))
+            for i in range(50)
+        ]
+        self.operation = create_operation(
+            company=self.company,
+            type='sale',
+            date='2024-01-01',
+            customer=self.customer,
+            created_by=self.user
+        )
+    
+    def test_bulk_insert_and_single_recalculation(self):
+        """Todas las líneas se insertan y los totales se recalculan con un número fijo de consultas."""
+        items = [
+            {'product': product, 'quantity': Decimal('2'), 'unit_price': Decimal('10.005')}
+            for product in self.products
+        ]
+        # SAVEPOINT + bulk_create + agregado + UPDATE de totales + RELEASE
+        # (CompanySettings ya está memoizada en la empresa desde create_operation)
+        with self.assertNumQueries(5):
+            created = add_items_to_operation(self.operation, items)
+        
+        self.assertEqual(len(created), 50)
+        self.assertEqual(self.operation.items.count(), 50)
+        self.assertEqual(created[0].subtotal, Decimal('20.01'))
+        self.operation.refresh_from_db()
+        self.assertEqual(self.operation.subtotal, Decimal('1000.50'))
+        self.assertEqual(self.operation.tax, Decimal('210.11'))
+        self.assertEqual(self.operation.total, Decimal('1210.61'))
+    
+    def test_invalid_row_saves_nothing(self):
+        """Si una línea no es válida no se guarda ninguna."""
+        foreign = Product.objects.create(company=self.other_company, code='X001', name='Ajeno')
+        items = [
+            {'product': self.products[0], 'quantity': 1, 'unit_price': 10},
+            {'product': foreign, 'quantity': 1, 'unit_price': 10},
+        ]
+        with self.assertRaises(ValidationError):
+            add_items_to_operation(self.operation, items)
+        self.assertFalse(self.operation.items.exists())
+
+
+class OperationStockEngineTestCase(TestCase):
+    """Tests del motor de stock set-based de confirm_operation."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa 1', active=True)
+        self.customer = Customer.objects.create(company=self.company, code='C001', name='Cliente 1')
+        self.supplier = Supplier.objects.create(company=self.company, code='S001', name='Proveedor 1')
+        self.product = Product.objects.create(
+            company=self.company, code='P001', name='Producto 1',
+            price=Decimal('10.00'), stock=Decimal('10.00'), stock_minimo=Decimal('3.00'),
+        )
+        self.other = Product.objects.create(
+            company=self.company, code='P002', name='Producto 2',
+            price=Decimal('10.00'), stock=Decimal('100.00'),
+        )
+        self.service = Product.objects.create(
+            company=self.company, code='S-01', name='Servicio', type='service', price=Decimal('50.00'),
+        )
+    
+    def _create_sale(self, lines):
+        operation = create_operation(
+            company=self.company, type='sale', date='2024-01-01',
+            customer=self.customer, created_by=self.user
+        )
+        add_items_to_operation(operation, [
+            {'product': product, 'quantity': Decimal(qty), 'unit_price': Decimal('10.00')}
+            for product, qty in lines
+        ])
+        return operation
+    
+    def test_repeated_product_lines_are_aggregated(self):
+        """Un producto repetido en varias líneas descuenta la suma; los servicios no tocan stock."""
+        op = self._create_sale([(self.product, '4'), (self.product, '3'), (self.other, '5'), (self.service, '1')])
+        confirm_operation(op, user=self.user)
+        
+        self.product.refresh_from_db()
+        self.other.refresh_from_db()
+        self.service.refresh_from_db()
+        self.assertEqual(self.product.stock, Decimal('3.00'))
+        self.assertEqual(self.other.stock, Decimal('95.00'))
+        self.assertIsNone(self.service.stock)
+        
+        alerts = AuditLog.objects.filter(company=self.company, changes__alert='Stock Bajo')
+        self.assertEqual(alerts.count(), 1)
+        self.assertEqual(alerts.get().object_id, str(self.product.pk))
+    
+    def test_purchase_adds_stock(self):
+        """Una compra suma al stock."""
+        op = create_operation(
+            company=self.company, type='purchase', date='2024-01-01',
+            supplier=self.supplier, created_by=self.user
+        )
+        add_items_to_operation(op, [{'product': self.product, 'quantity': 5, 'unit_price': 8}])
+        confirm_operation(op, user=self.user)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, Decimal('15.00'))
+    
+    def test_insufficient_stock_changes_nothing(self):
+        """Si una línea no alcanza, ningún stock cambia y la operación sigue en borrador."""
+        op = self._create_sale([(self.other, '5'), (self.product, '6'), (self.product, '6')])
+        with self.assertRaises(ValidationError):
+            confirm_operation(op, user=self.user)
+        
+        self.product.refresh_from_db()
+        self.other.refresh_from_db()
+        op.refresh_from_db()
+        self.assertEqual(self.product.stock, Decimal('10.00'))
+        self.assertEqual(self.other.stock, Decimal('100.00'))
+        self.assertEqual(op.status, 'draft')
+    
+    def test_query_count_does_not_grow_with_lines(self):
+        """Confirmar cuesta lo mismo con 2 o con 40 líneas."""
+        products = [
+            Product.objects.create(
+                company=self.company, code=f'Q{i:03d}', name=f'Q {i}',
+                stock=Decimal('100.00'), stock_minimo=Decimal('99.00'),
+            )
+            for i in range(40)
+        ]
+        small = self._create_sale([(p, '1') for p in products[:2]])
+        large = self._create_sale([(p, '1') for p in products[2:]])
+        # La primera confirmación del día crea la fila de OperationDailySummary
+        confirm_operation(self._create_sale([(self.other, '1')]), user=self.user)
+        
+        with CaptureQueriesContext(connection) as small_ctx:
+            confirm_operation(small, user=self.user)
+        with CaptureQueriesContext(connection) as large_ctx:
+            confirm_operation(large, user=self.user)
+        self.assertEqual(len(small_ctx.captured_queries), len(large_ctx.captured_queries))
+        self.assertEqual(
+            AuditLog.objects.filter(company=self.company, changes__alert='Stock Bajo').count(), 40
+        )
+    
+    def test_confirm_twice_is_rejected(self):
+        """Una instancia desactualizada no vuelve a confirmar una operación ya confirmada."""
+        op = self._create_sale([(self.product, '1')])
+        stale = Operation.objects.get(pk=op.pk)
+        confirm_operation(op, user=self.user)
+        with self.assertRaises(ValidationError):
+            confirm_operation(stale, user=self.user)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, Decimal('9.00'))
+    
+    def test_confirm_writes_stock_movements(self):
+        """Cada producto afectado deja un movimiento con la variación y el saldo."""
+        op = self._create_sale([(self.product, '4'), (self.product, '3'), (self.other, '5')])
+        confirm_operation(op, user=self.user)
+        
+        movement = StockMovement.objects.get(product=self.product)
+        self.assertEqual(movement.operation, op)
+        self.assertEqual(movement.kind, 'confirm')
+        self.assertEqual(movement.delta, Decimal('-7.00'))
+        self.assertEqual(movement.balance, Decimal('3.00'))
+        self.assertEqual(StockMovement.objects.filter(operation=op).count(), 2)
+    
+    def test_cancel_confirmed_sale_restores_stock(self):
+        """Cancelar una venta confirmada devuelve el stock y deja movimientos 'cancel'."""
+        op = self._create_sale([(self.product, '4'), (self.product, '3'), (self.other, '5')])
+        confirm_operation(op, user=self.user)
+        cancel_operation(op, user=self.user)
+        
+        self.product.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.product.stock, Decimal('10.00'))
+        self.assertEqual(self.other.stock, Decimal('100.00'))
+        reversal = StockMovement.objects.get(product=self.product, kind='cancel')
+        self.assertEqual(reversal.delta, Decimal('7.00'))
+        self.assertEqual(reversal.balance, Decimal('10.00'))
+    
+    def test_cancel_draft_does_not_touch_stock(self):
+        """Cancelar un borrador no mueve stock."""
+        op = self._create_sale([(self.product, '4')])
+        cancel_operation(op, user=self.user)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, Decimal('10.00'))
+        self.assertFalse(StockMovement.objects.filter(operation=op).exists())
+    
+    def test_cancel_purchase_with_consumed_stock_is_rejected(self):
+        """No se puede cancelar una compra cuyo stock ya se vendió (quedaría negativo)."""
+        purchase = create_operation(
+            company=self.company, type='purchase', date='2024-01-01',
+            supplier=self.supplier, created_by=self.user
+        )
+        add_items_to_operation(purchase, [{'product': self.product, 'quantity': 5, 'unit_price': 8}])
+        confirm_operation(purchase, user=self.user)
+        confirm_operation(self._create_sale([(self.product, '12')]), user=self.user)
+        
+        with self.assertRaises(ValidationError):
+            cancel_operation(purchase, user=self.user)
+        purchase.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(purchase.status, 'confirmed')
+        self.assertEqual(self.product.stock, Decimal('3.00'))
+
+
+class StockLedgerTestCase(TestCase):
+    """Tests del kardex: stock a una fecha y reconciliación."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa 1', active=True)
+        self.customer = Customer.objects.create(company=self.company, code='C001', name='Cliente 1')
+        self.product = Product.objects.create(
+            company=self.company, code='P001', name='Producto 1', stock=Decimal('10.00'),
+        )
+    
+    def _confirm_sale(self, qty, when):
+        op = create_operation(
+            company=self.company, type='sale', date=when.date(),
+            customer=self.customer, created_by=self.user
+        )
+        add_item_to_operation(op, self.product, Decimal(qty), Decimal('1.00'))
+        with mock.patch('operations.services.timezone.now', return_value=when):
+            confirm_operation(op, user=self.user)
+    
+    def test_stock_at_date(self):
+        """El stock a una fecha usa el saldo más cercano anterior (o el previo al primer movimiento)."""
+        tz = timezone.get_current_timezone()
+        self._confirm_sale('2', datetime(2024, 1, 10, 12, 0, tzinfo=tz))
+        self._confirm_sale('3', datetime(2024, 1, 20, 12, 0, tzinfo=tz))
+        
+        self.assertEqual(get_stock_at(self.product, date(2024, 1, 1)), Decimal('10.00'))
+        self.assertEqual(get_stock_at(self.product, date(2024, 1, 10)), Decimal('8.00'))
+        self.assertEqual(get_stock_at(self.product, date(2024, 1, 15)), Decimal('8.00'))
+        self.assertEqual(get_stock_at(self.product, datetime(2024, 1, 20, 11, 0, tzinfo=tz)), Decimal('8.00'))
+        self.assertEqual(get_stock_at(self.product, date(2024, 2, 1)), Decimal('5.00'))
+    
+    def test_reconcile_command_fixes_drift(self):
+        """reconcile_stock iguala Product.stock al último saldo del kardex."""
+        self._confirm_sale('4', timezone.now())
+        untouched = Product.objects.create(company=self.company, code='P002', name='Sin movimientos', stock=Decimal('7.00'))
+        Product.objects.filter(pk=self.product.pk).update(stock=Decimal('99.00'))
+        
+        out = StringIO()
+        call_command('reconcile_stock', '--dry-run', stdout=out)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, Decimal('99.00'))
+        self.assertIn('1 productos con diferencia', out.getvalue())
+        
+        call_command('reconcile_stock', '--batch-size=1', stdout=StringIO())
+        self.product.refresh_from_db()
+        untouched.refresh_from_db()
+        self.assertEqual(self.product.stock, Decimal('6.00'))
+        self.assertEqual(untouched.stock, Decimal('7.00'))
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class OperationStockConcurrencyTestCase(TransactionTestCase):
+    """
+    Confirmaciones concurrentes sobre el mismo producto no deben vender más stock del que hay.
+    Requiere bloqueo por fila (PostgreSQL); SQLite en memoria bloquea la tabla entera.
+    """
+    
+    THREADS = 6
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa 1', active=True)
+        self.customer = Customer.objects.create(company=self.company, code='C001', name='Cliente 1')
+        self.product = Product.objects.create(
+            company=self.company, code='P001', name='Producto 1',
+            price=Decimal('10.00'), stock=Decimal('10.00'),
+        )
+        self.operations = []
+        for _ in range(self.THREADS):
+            op = create_operation(
+                company=self.company, type='sale', date='2024-01-01',
+                customer=self.customer, created_by=self.user
+            )
+            add_items_to_operation(op, [{'product': self.product, 'quantity': 3, 'unit_price': 10}])
+            self.operations.append(op)
+    
+    def test_concurrent_confirmations_never_oversell(self):
+        """Con stock 10 y ventas de 3, solo 3 confirmaciones pasan y el stock queda en 1."""
+        results = []
+        barrier = threading.Barrier(self.THREADS)
+        
+        def worker(operation):
+            try:
+                barrier.wait()
+                confirm_operation(operation, user=self.user)
+                results.append('ok')
+            except ValidationError:
+                results.append('rejected')
+            except Exception as exc:
+                results.append(exc)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=worker, args=(op,)) for op in self.operations]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(sorted(results, key=str), ['ok'] * 3 + ['rejected'] * 3)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, Decimal('1.00'))
+        self.assertEqual(
+            Operation.objects.filter(company=self.company, status='confirmed').count(), 3
+        )
+
+
+class OperationNumberingTestCase(TestCase):
+    """Tests del contador de numeración por empresa y tipo."""
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa 1', active=True)
+        self.customer = Customer.objects.create(company=self.company, code='C001', name='Cliente 1')
+    
+    def _create_sale(self):
+        return create_operation(
+            company=self.company,
+            type='sale',
+            date='2024-01-01',
+            customer=self.customer,
+            created_by=self.user
+        )
+    
+    def test_sequential_numbers_per_type(self):
+        """Ventas y compras numeran por separado, con 6 dígitos por defecto."""
+        self.assertEqual(self._create_sale().number, '000001')
+        self.assertEqual(self._create_sale().number, '000002')
+        self.assertEqual(next_operation_number(self.company, 'purchase'), '000001')
+    
+    def test_counter_continues_existing_numbers(self):
+        """El contador se inicializa con el mayor número existente (aunque tenga prefijo)."""
+        Operation.objects.create(
+            company=self.company, type='sale', number='V-0041', date='2024-01-01',
+            customer=self.customer, created_by=self.user
+        )
+        Operation.objects.create(
+            company=self.company, type='sale', number='000009', date='2024-01-01',
+            customer=self.customer, created_by=self.user
+        )
+        self.assertEqual(self._create_sale().number, '000042')
+    
+    def test_prefix_and_padding_from_settings(self):
+        """Prefijo por tipo y dígitos se toman de CompanySettings."""
+        CompanySettings.objects.create(
+            company=self.company,
+            sale_number_prefix='V-',
+            purchase_number_prefix='C-',
+            operation_number_padding=4,
+        )
+        self.assertEqual(self._create_sale().number, 'V-0001')
+        self.assertEqual(next_operation_number(self.company, 'purchase'), 'C-0001')
+    
+    def test_rolled_back_number_is_reused(self):
+        """Si la transacción que reservó el número se revierte, el número no se pierde."""
+        self._create_sale()
+        try:
+            with transaction.atomic():
+                self._create_sale()
+                raise RuntimeError('rollback')
+        except RuntimeError:
+            pass
+        self.assertEqual(self._create_sale().number, '000002')
+        sequence = OperationSequence.objects.get(company=self.company, type='sale')
+        self.assertEqual(sequence.last_number, 2)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class OperationNumberingConcurrencyTestCase(TransactionTestCase):
+    """
+    Altas concurrentes desde varios hilos no deben colisionar ni dejar huecos.
+    Requiere bloqueo por fila (PostgreSQL); SQLite en memoria bloquea la tabla entera.
+    """
+    
+    THREADS = 8
+    PER_THREAD = 5
+    
+    def setUp(self):
+        """Configurar datos de prueba."""
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        self.company = Company.objects.create(name='Empresa 1', active=True)
+        self.customer = Customer.objects.create(company=self.company, code='C001', name='Cliente 1')
+    
+    def test_concurrent_creates_get_unique_gapless_numbers(self):
+        """N hilos creando ventas a la vez obtienen los números 1..N sin repetir."""
+        errors = []
+        barrier = threading.Barrier(self.THREADS)
+        
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.PER_THREAD):
+                    create_operation(
+                        company=self.company,
+                        type='sale',
+                        date='2024-01-01',
+                        customer=self.customer,
+                        created_by=self.user
+                    )
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        numbers = sorted(
+            Operation.objects.filter(company=self.company, type='sale').values_list('number', flat=True)
+        )
+        total = self.THREADS * self.PER_THREAD
+        self.assertEqual(numbers, [str(n).zfill(6) for n in range(1, total + 1)])
+
+
+class OperationCreateFormTestCase(TestCase):
+    """Tests del alta de operaciones con el autocompletado de productos."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='creator', password='testpass123')
+        self.company = Company.objects.create(name='Empresa Alta', active=True)
+        self.other_company = Company.objects.create(name='Empresa Ajena', active=True)
+        Membership.objects.create(user=self.user, company=self.company, role='admin', active=True)
+        CompanySettings.objects.create(company=self.company, tax_rate_default=Decimal('21.00'))
+        self.customer = Customer.objects.create(company=self.company, code='C001', name='Cliente 1')
+        self.product = Product.objects.create(company=self.company, code='P001', name='Producto 1', price=Decimal('10.00'))
+        self.client.login(username='creator', password='testpass123')
+        session = self.client.session
+        session['current_company_id'] = self.company.id
+        session.save()
+        self.url = reverse('operations:create')
+    
+    def _post_data(self, product_id):
+        return {
+            'type': 'sale',
+            'date': '2024-01-01',
+            'customer': self.customer.pk,
+            'items-TOTAL_FORMS': '1',
+            'items-INITIAL_FORMS': '0',
+            'items-MIN_NUM_FORMS': '1',
+            'items-MAX_NUM_FORMS': '1000',
+            'items-0-product': product_id,
+            'items-0-quantity': '2',
+            'items-0-unit_price': '10.00',
+        }
+    
+    def test_create_page_does_not_list_catalogue(self):
+        """La página de alta no renderiza el catálogo: mismas consultas con 1 o 100 productos."""
+        self.client.get(self.url)  # calienta cachés de membresía/sesión
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('products:autocomplete'))
+        self.assertNotContains(response, 'Producto 1')
+        
+        Product.objects.bulk_create([
+            Product(company=self.company, code=f'X{i:03d}', name=f'Extra {i}') for i in range(100)
+        ])
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+    
+    def test_post_chosen_product_id(self):
+        """Se envía solo el id elegido; un producto de otra empresa no valida."""
+        foreign = Product.objects.create(company=self.other_company, code='P001', name='Ajeno')
+        response = self.client.post(self.url, self._post_data(foreign.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Operation.objects.for_company(self.company).exists())
+        
+        response = self.client.post(self.url, self._post_data(self.product.pk))
+        operation = Operation.objects.for_company(self.company).get()
+        self.assertRedirects(response, reverse('operations:detail', kwargs={'pk': operation.pk}))
+        self.assertEqual(operation.items.get().product, self.product)
+
+
+class OperationDetailQueriesTestCase(TestCase):
+    """La página de detalle usa un número fijo de consultas."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='viewer', password='testpass123')
+        self.company = Company.objects.create(name='Empresa Detalle', active=True)
+        Membership.objects.create(user=self.user, company=self.company, role='admin', active=True)
+        self.customer = Customer.objects.create(company=self.company, code='C001', name='Cliente 1')
+        self.products = [
+            Product.objects.create(company=self.company, code=f'P{i:03d}', name=f'Producto {i}', price=Decimal('10.00'))
+            for i in range(20)
+        ]
+        self.client.login(username='viewer', password='testpass123')
+        session = self.client.session
+        session['current_company_id'] = self.company.id
+        session.save()
+    
+    def _detail_queries(self, item_count):
+        operation = create_operation(
+            company=self.company, type='sale', date='2024-01-01', customer=self.customer, created_by=self.user
+        )
+        add_items_to_operation(operation, [
+            {'product': product, 'quantity': 1, 'unit_price': 10} for product in self.products[:item_count]
+        ])
+        url = reverse('operations:detail', kwargs={'pk': operation.pk})
+        self.client.get(url)  # calienta cachés de membresía/sesión
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.products[item_count - 1].name)
+        return len(captured.captured_queries)
+    
+    def test_query_count_does_not_grow_with_items(self):
+        """Con 1 o 20 items la vista hace las mismas consultas (operación + items con producto)."""
+        self.assertEqual(self._detail_queries(1), self._detail_queries(20))
@@ -4,7 +4,8 @@ from django.views.generic import ListView, CreateView, DetailView, View
 from django.urls import reverse_lazy, reverse
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib import messages
-from django.db import models, transaction
+from django.db import transaction
+from django.db.models import Prefetch
 from django.core.exceptions import ValidationError
 from core.mixins import (
     CompanyRequiredMixin, 
@@ -13,9 +14,10 @@ from core.mixins import (
     CompanyObjectMixin,
     RoleRequiredMixin,
     HTMXResponseMixin,
+    KeysetPaginationMixin,
 )
 from core.constants import ROLE_ADMIN, ROLE_MANAGER, ROLE_OPERATOR
-from core.utils.csv_export import export_csv_response
+from core.utils.csv_export import export_csv_response, CSV_CHUNK_SIZE
 from core.utils import log_audit
 from core.utils.request import get_client_ip
 from core.utils.security_services import check_anomalous_behavior
@@ -24,7 +26,7 @@ from operations.services import (
     recalculate_operation_totals,
     confirm_operation,
     cancel_operation,
-    add_item_to_operation,
+    add_items_to_operation,
     remove_item_from_operation,
     update_operation_item,
     validate_operation_can_be_modified,
@@ -38,6 +40,7 @@ class OperationListView(
     CompanyContextMixin, 
     CompanyFilterMixin,
     HTMXResponseMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     """
@@ -50,6 +53,7 @@ class OperationListView(
     model = Operation
     context_object_name = 'operations'
     paginate_by = 25
+    keyset_ordering = ('-date', '-number', '-id')
     
     def get_queryset(self):
         """Filtra operaciones por empresa actual."""
@@ -72,13 +76,9 @@ class OperationListView(
         # Aplicar búsqueda si existe
         search = self.request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                models.Q(number__icontains=search) |
-                models.Q(customer__name__icontains=search) |
-                models.Q(supplier__name__icontains=search)
-            )
+            queryset = queryset.search(search)
         
-        return queryset.order_by('-date', '-number')
+        return queryset.order_by('-date', '-number', '-id')
     
     def get_context_data(self, **kwargs):
         """Añade datos adicionales al contexto."""
@@ -116,33 +116,21 @@ class OperationCreateView(
         context = super().get_context_data(**kwargs)
         company = self.get_company()
         
+        # form_kwargs: cada form filtra los productos por la empresa actual
         if self.request.POST:
             context['item_formset'] = OperationItemFormSet(
                 self.request.POST,
                 instance=self.object if self.object else None,
-                prefix='items'
+                prefix='items',
+                form_kwargs={'company': company},
             )
         else:
             context['item_formset'] = OperationItemFormSet(
                 instance=self.object if self.object else None,
-                prefix='items'
+                prefix='items',
+                form_kwargs={'company': company},
             )
         
-        # Pasar company a cada form del formset usando form_kwargs
-        # Crear una función helper para inicializar forms con company
-        def formset_form_kwargs(form, index):
-            return {'company': company}
-        
-        # Asignar company a cada form del formset
-        for form in context['item_formset']:
-            if form:
-                form.company = company
-                # Re-inicializar el queryset de productos
-                if company:
-                    form.fields['product'].queryset = Product.objects.for_company(company).filter(active=True)
-                else:
-                    form.fields['product'].queryset = Product.objects.none()
-        
         return context
     
     def form_valid(self, form):
@@ -169,17 +157,13 @@ class OperationCreateView(
                 item_formset.instance = operation
                 items = item_formset.save(commit=False)
 
-                for item in items:
-                    if item.product.company != company:
-                        raise ValidationError(
-                            f'El producto {item.product.name} no pertenece a esta empresa.'
-                        )
-                    add_item_to_operation(
-                        operation=operation,
-                        product=item.product,
-                        quantity=item.quantity,
-                        unit_price=item.unit_price
-                    )
+                add_items_to_operation(
+                    operation,
+                    [
+                        {'product': item.product, 'quantity': item.quantity, 'unit_price': item.unit_price}
+                        for item in items
+                    ],
+                )
 
                 for item in item_formset.deleted_objects:
                     remove_item_from_operation(operation, item.id)
@@ -226,11 +210,16 @@ class OperationDetailView(
     model = Operation
     context_object_name = 'operation'
     
+    def get_queryset(self):
+        """Carga cliente, proveedor, creador e items con su producto en consultas fijas."""
+        return super().get_queryset().select_related('customer', 'supplier', 'created_by').prefetch_related(
+            Prefetch('items', queryset=OperationItem.objects.select_related('product'))
+        )
+    
     def get_context_data(self, **kwargs):
-        """Añade los items de la operación al contexto."""
+        """Añade los items de la operación al contexto (ya precargados)."""
         context = super().get_context_data(**kwargs)
-        operation = self.get_object()
-        context['items'] = operation.items.all()
+        context['items'] = self.object.items.all()
         return context
 
 
@@ -362,35 +351,29 @@ class OperationExportCSVView(
         
         search = request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                models.Q(number__icontains=search) |
-                models.Q(customer__name__icontains=search) |
-                models.Q(supplier__name__icontains=search)
-            )
-        
-        operations = queryset.select_related('customer', 'supplier').order_by('-date', '-number')
+            queryset = queryset.search(search)
         
-        # Preparar datos para CSV
+        # Preparar datos para CSV (streaming: sin materializar el queryset)
         headers = ['Fecha', 'Tipo', 'Número', 'Cliente/Proveedor', 'Subtotal', 'Impuesto', 'Total', 'Estado']
-        rows = []
-        
-        for operation in operations:
-            client_supplier = '-'
-            if operation.customer:
-                client_supplier = operation.customer.name
-            elif operation.supplier:
-                client_supplier = operation.supplier.name
-            
-            rows.append([
-                operation.date.strftime('%d/%m/%Y'),
-                operation.get_type_display(),
-                operation.number,
-                client_supplier,
-                f'{operation.subtotal:.2f}',
-                f'{operation.tax:.2f}',
-                f'{operation.total:.2f}',
-                operation.get_status_display(),
-            ])
+        type_display = dict(Operation.TYPE_CHOICES)
+        status_display = dict(Operation.STATUS_CHOICES)
+        operations = queryset.order_by('-date', '-number').values_list(
+            'date', 'type', 'number', 'customer__name', 'supplier__name',
+            'subtotal', 'tax', 'total', 'status',
+        ).iterator(chunk_size=CSV_CHUNK_SIZE)
+        rows = (
+            [
+                date.strftime('%d/%m/%Y'),
+                type_display.get(type_, type_),
+                number,
+                customer_name or supplier_name or '-',
+                f'{subtotal:.2f}',
+                f'{tax:.2f}',
+                f'{total:.2f}',
+                status_display.get(status, status),
+            ]
+            for date, type_, number, customer_name, supplier_name, subtotal, tax, total, status in operations
+        )
         
         filename = f'operaciones_{company.name.replace(" ", "_")}'
         return export_csv_response(filename, headers, rows)
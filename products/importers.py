@@ -0,0 +1,20 @@
+"""
+Importador masivo de productos/servicios (core.utils.bulk_import).
+"""
+
+from core.utils.bulk_import import BulkImporter
+
+from .forms import ProductForm
+from .models import Product
+
+
+class ProductImporter(BulkImporter):
+    """Productos/servicios por código; acepta las columnas de la exportación CSV."""
+    model = Product
+    form_class = ProductForm
+    fields = ('code', 'name', 'type', 'description', 'price', 'unit_of_measure', 'active')
+    aliases = {
+        'unit_of_measure': ('Unidad de Medida', 'Unidad'),
+        'active': ('Estado',),
+    }
+    label = 'productos'
@@ -31,6 +31,9 @@ class Product(CompanyModelMixin):
     )
     active = models.BooleanField('Activo', default=True)
     
+    # Campos del documento de búsqueda (core.utils.search)
+    search_fields = ('code', 'name', 'description')
+    
     objects = CompanyManager()
     
     class Meta:
@@ -108,7 +108,7 @@ class ProductMultiTenantTestCase(TestCase):
         # Verificar que solo se muestran productos de company1
         self.assertEqual(response.status_code, 200)
         products = response.context['products']
-        self.assertEqual(products.count(), 2)
+        self.assertEqual(len(products), 2)
         self.assertIn(self.product1_company1, products)
         self.assertIn(self.product2_company1, products)
         self.assertNotIn(self.product1_company2, products)
@@ -142,3 +142,24 @@ class ProductMultiTenantTestCase(TestCase):
         products_company2 = Product.objects.for_company(self.company2)
         self.assertEqual(products_company2.count(), 1)
         self.assertIn(self.product1_company2, products_company2)
+    
+    def test_autocomplete_returns_active_company_products(self):
+        """El autocompletado busca por código/nombre solo productos activos de la empresa actual."""
+        Product.objects.create(company=self.company1, code='PR002', name='Producto inactivo', active=False)
+        self.client.login(username='user1', password='testpass123')
+        session = self.client.session
+        session['current_company_id'] = self.company1.id
+        session.save()
+        url = reverse('products:autocomplete')
+        
+        response = self.client.get(url, {'q': 'produc'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['id'] for r in results], [self.product1_company1.pk])
+        self.assertEqual(set(results[0]), {'id', 'code', 'name', 'price', 'stock', 'unit_of_measure'})
+        self.assertEqual(self.client.get(url).json()['results'], [])
+        
+        response = self.client.get(url, {'q': 'sr0'}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='id_items-0-product_results')
+        self.assertContains(response, 'id="id_items-0-product_results"')
+        self.assertContains(response, f'data-id="{self.product2_company1.pk}"')
+        self.assertNotContains(response, f'data-id="{self.product1_company2.pk}"')
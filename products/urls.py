@@ -12,4 +12,6 @@ urlpatterns = [
     path('<int:pk>/editar/', views.ProductUpdateView.as_view(), name='update'),
     path('<int:pk>/eliminar/', views.ProductDeleteView.as_view(), name='delete'),
     path('exportar/', views.ProductExportCSVView.as_view(), name='export_csv'),
+    path('importar/', views.ProductImportView.as_view(), name='import'),
+    path('autocompletar/', views.ProductAutocompleteView.as_view(), name='autocomplete'),
 ]
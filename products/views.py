@@ -1,9 +1,10 @@
 """Vistas del módulo products con protección multi-tenant completa."""
 
 from django.views.generic import ListView, CreateView, DetailView, UpdateView, DeleteView, View
+from django.http import JsonResponse
+from django.shortcuts import render
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.db import models
 from core.mixins import (
     CompanyRequiredMixin, 
     CompanyContextMixin, 
@@ -11,14 +12,18 @@ from core.mixins import (
     CompanyObjectMixin,
     RoleRequiredMixin,
     HTMXResponseMixin,
+    KeysetPaginationMixin,
 )
 from core.constants import ROLE_ADMIN, ROLE_MANAGER, ROLE_OPERATOR
 from core.utils import log_audit
 from core.utils.request import get_client_ip
 from core.utils.security_services import check_anomalous_behavior
-from core.utils.csv_export import export_csv_response
+from core.utils.csv_export import export_csv_response, CSV_CHUNK_SIZE
+from core.views import BulkImportView
+from core.services import invalidate_dashboard_cache
 from .models import Product
 from .forms import ProductForm
+from .importers import ProductImporter
 
 
 class ProductListView(
@@ -26,6 +31,7 @@ class ProductListView(
     CompanyContextMixin, 
     CompanyFilterMixin,
     HTMXResponseMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     """
@@ -38,6 +44,7 @@ class ProductListView(
     model = Product
     context_object_name = 'products'
     paginate_by = 25
+    keyset_ordering = ('name', 'id')
     
     def get_queryset(self):
         """Filtra productos por empresa actual. El filtrado por empresa es automático por CompanyFilterMixin."""
@@ -50,11 +57,7 @@ class ProductListView(
         # Aplicar búsqueda si existe
         search = self.request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                models.Q(name__icontains=search) |
-                models.Q(code__icontains=search) |
-                models.Q(description__icontains=search)
-            )
+            queryset = queryset.search(search)
         
         # Aplicar filtro de tipo si existe
         type_filter = self.request.GET.get('type', '')
@@ -68,7 +71,7 @@ class ProductListView(
         elif active_filter == '0':
             queryset = queryset.filter(active=False)
         
-        return queryset.order_by('name')
+        return queryset.order_by('name', 'id')
     
     def get_context_data(self, **kwargs):
         """Añade datos adicionales al contexto."""
@@ -115,6 +118,7 @@ class ProductCreateView(
             changes={'name': form.cleaned_data.get('name'), 'code': form.cleaned_data.get('code'), 'type': form.cleaned_data.get('type')},
             ip_address=get_client_ip(self.request)
         )
+        invalidate_dashboard_cache(self.get_company())
         
         messages.success(self.request, f'Producto/Servicio "{form.cleaned_data["name"]}" creado correctamente.')
         return response
@@ -192,6 +196,7 @@ class ProductUpdateView(
             changes=changes,
             ip_address=get_client_ip(self.request)
         )
+        invalidate_dashboard_cache(self.get_company())
         
         messages.success(self.request, f'Producto/Servicio "{form.cleaned_data["name"]}" actualizado correctamente.')
         return response
@@ -218,6 +223,10 @@ class ProductDeleteView(
     context_object_name = 'product'
     required_roles = [ROLE_ADMIN, ROLE_MANAGER]
     
+    def form_valid(self, form):
+        """Desde Django 4 el POST elimina vía form_valid(); se delega en delete() (auditoría e invalidación)."""
+        return self.delete(self.request, *self.args, **self.kwargs)
+    
     def delete(self, request, *args, **kwargs):
         """Mensaje de éxito después de eliminar."""
         product = self.get_object()
@@ -236,6 +245,7 @@ class ProductDeleteView(
         )
         
         response = super().delete(request, *args, **kwargs)
+        invalidate_dashboard_cache(self.get_company())
         check_anomalous_behavior(request.user, self.get_company())
         messages.success(request, f'Producto/Servicio "{product_name}" eliminado correctamente.')
         return response
@@ -260,11 +270,7 @@ class ProductExportCSVView(
         # Aplicar búsqueda
         search = request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                models.Q(name__icontains=search) |
-                models.Q(code__icontains=search) |
-                models.Q(description__icontains=search)
-            )
+            queryset = queryset.search(search)
         
         # Aplicar filtro de tipo
         type_filter = request.GET.get('type', '')
@@ -278,22 +284,73 @@ class ProductExportCSVView(
         elif active_filter == '0':
             queryset = queryset.filter(active=False)
         
-        products = queryset.order_by('name')
-        
-        # Preparar datos para CSV
+        # Preparar datos para CSV (streaming: sin materializar el queryset)
         headers = ['Código', 'Nombre', 'Tipo', 'Precio', 'Unidad de Medida', 'Descripción', 'Estado']
-        rows = []
-        
-        for product in products:
-            rows.append([
-                product.code,
-                product.name,
-                product.get_type_display(),
-                f'{product.price:.2f}',
-                product.unit_of_measure,
-                product.description or '',
-                'Activo' if product.active else 'Inactivo',
-            ])
+        type_display = dict(Product.TYPE_CHOICES)
+        products = queryset.order_by('name').values_list(
+            'code', 'name', 'type', 'price', 'unit_of_measure', 'description', 'active'
+        ).iterator(chunk_size=CSV_CHUNK_SIZE)
+        rows = (
+            [
+                code,
+                name,
+                type_display.get(type_, type_),
+                f'{price:.2f}',
+                unit_of_measure,
+                description or '',
+                'Activo' if active else 'Inactivo',
+            ]
+            for code, name, type_, price, unit_of_measure, description, active in products
+        )
         
         filename = f'productos_servicios_{company.name.replace(" ", "_")}'
         return export_csv_response(filename, headers, rows)
+
+
+class ProductAutocompleteView(
+    CompanyRequiredMixin,
+    CompanyContextMixin,
+    View
+):
+    """
+    Autocompletado de productos activos para los formularios de operaciones.
+    Usa el índice de búsqueda (CompanyQuerySet.search, con ranking por prefijo
+    de código/nombre) y devuelve como máximo `limit` resultados, así el costo
+    no depende del tamaño del catálogo.
+    
+    GET ?q=<término>: JSON {'results': [{id, code, name, price, stock, unit_of_measure}]};
+    con HTMX devuelve el parcial products/_autocomplete_results.html, que
+    reemplaza al elemento indicado en HX-Target.
+    """
+    limit = 10
+    partial_template_name = 'products/_autocomplete_results.html'
+    
+    def get(self, request, *args, **kwargs):
+        """Busca productos activos de la empresa actual."""
+        term = request.GET.get('q', '').strip()
+        results = []
+        if term:
+            results = list(
+                Product.objects.for_company(self.get_company())
+                .filter(active=True)
+                .search(term, ranked=True)
+                .values('id', 'code', 'name', 'price', 'stock', 'unit_of_measure')[:self.limit]
+            )
+        
+        if request.headers.get('HX-Request') == 'true':
+            return render(request, self.partial_template_name, {
+                'results': results,
+                'term': term,
+                'target_id': request.headers.get('HX-Target', ''),
+            })
+        return JsonResponse({'results': results})
+
+
+class ProductImportView(BulkImportView):
+    """
+    Importación masiva de productos/servicios desde CSV/XLSX (upsert por código).
+    Protegido por tenant y roles (admin, manager).
+    """
+    importer_class = ProductImporter
+    title = 'Productos/Servicios'
+    list_url = reverse_lazy('products:list')
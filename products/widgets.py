@@ -0,0 +1,37 @@
+"""
+Widgets del módulo products.
+"""
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class ProductAutocompleteWidget(forms.Widget):
+    """
+    Selector de producto por autocompletado (reemplaza al <select> con todo el
+    catálogo). Renderiza un campo de búsqueda que consulta products:autocomplete
+    por HTMX y un input oculto con el id elegido, que es lo único que se envía.
+
+    Para mostrar el producto ya seleccionado usa el queryset del
+    ModelChoiceField (self.choices.queryset), así la etiqueta respeta el mismo
+    filtro por empresa y cuesta una consulta solo si hay valor.
+    """
+    template_name = 'products/widgets/product_autocomplete.html'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['label'] = self.selected_label(value)
+        context['widget']['autocomplete_url'] = reverse('products:autocomplete')
+        return context
+
+    def selected_label(self, value):
+        """'código - nombre' del producto seleccionado ('' si no hay o no es válido)."""
+        queryset = getattr(getattr(self, 'choices', None), 'queryset', None)
+        if value in (None, '') or queryset is None:
+            return ''
+        try:
+            product = queryset.filter(pk=value).only('code', 'name').first()
+        except (ValueError, TypeError, ValidationError):
+            return ''
+        return str(product) if product else ''
@@ -1,3 +1,27 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ReportJob
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'report', 'format', 'status', 'company', 'requested_by', 'created_at', 'finished_at', 'expires_at']
+    list_filter = ['status', 'format', 'report', 'company']
+    readonly_fields = [
+        'company', 'requested_by', 'report', 'format', 'params', 'file', 'error',
+        'created_at', 'started_at', 'finished_at', 'expires_at',
+    ]
+    date_hierarchy = 'created_at'
+
+    def get_queryset(self, request):
+        """Filtra por empresa para usuarios no-superuser."""
+        qs = super().get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        if hasattr(request, 'current_company') and request.current_company:
+            return qs.filter(company=request.current_company)
+        return qs.none()
+
+    def has_add_permission(self, request):
+        # Los trabajos se encolan desde la UI de reportes
+        return False
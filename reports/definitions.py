@@ -0,0 +1,112 @@
+"""
+Reportes disponibles, declarados sobre reports.engine.Report.
+Para agregar un reporte: declarar la subclase, registrarla con @register_report
+y exponerla con una subclase de reports.views.ReportView.
+"""
+
+from django.db.models import Count, Sum
+
+from .engine import Column, Report, register_report
+
+
+class OperationsByPeriodReport(Report):
+    """Operaciones de un tipo en un rango de fechas, una fila por operación."""
+    default_status = 'all'
+    fields = {
+        'pk': 'pk',
+        'number': 'number',
+        'date': 'date',
+        'subtotal': 'subtotal',
+        'tax': 'tax',
+        'total': 'total',
+        'status': 'status',
+    }
+    totals = {
+        'subtotal': Sum('subtotal'),
+        'tax': Sum('tax'),
+        'total': Sum('total'),
+    }
+    ordering = ('-date', '-number')
+
+
+@register_report
+class SalesByPeriodReport(OperationsByPeriodReport):
+    slug = 'sales_by_period'
+    title = 'Ventas por Período'
+    template_name = 'reports/sales_by_period.html'
+    filename_prefix = 'ventas'
+    operation_type = 'sale'
+    fields = {**OperationsByPeriodReport.fields, 'party': 'customer__name'}
+    columns = (
+        Column('number', 'Número'),
+        Column('date', 'Fecha', 'date'),
+        Column('party', 'Cliente'),
+        Column('subtotal', 'Subtotal', 'money'),
+        Column('tax', 'Impuesto', 'money'),
+        Column('total', 'Total', 'money'),
+        Column('status', 'Estado', 'status'),
+    )
+
+
+@register_report
+class PurchasesByPeriodReport(OperationsByPeriodReport):
+    slug = 'purchases_by_period'
+    title = 'Compras por Período'
+    template_name = 'reports/purchases_by_period.html'
+    filename_prefix = 'compras'
+    operation_type = 'purchase'
+    fields = {**OperationsByPeriodReport.fields, 'party': 'supplier__name'}
+    columns = (
+        Column('number', 'Número'),
+        Column('date', 'Fecha', 'date'),
+        Column('party', 'Proveedor'),
+        Column('subtotal', 'Subtotal', 'money'),
+        Column('tax', 'Impuesto', 'money'),
+        Column('total', 'Total', 'money'),
+        Column('status', 'Estado', 'status'),
+    )
+
+
+class SummaryByPartyReport(Report):
+    """Operaciones de un tipo agrupadas por contraparte (cliente o proveedor)."""
+    measures = {
+        'total_operations': Count('id'),
+        'total': Sum('total'),
+    }
+    totals = {
+        'total': Sum('total'),
+    }
+    ordering = ('-total', 'name', 'pk')
+    totals_label = 'TOTAL GENERAL'
+
+
+@register_report
+class SummaryByCustomerReport(SummaryByPartyReport):
+    slug = 'summary_by_customer'
+    title = 'Resumen por Cliente'
+    template_name = 'reports/summary_by_customer.html'
+    filename_prefix = 'resumen_clientes'
+    operation_type = 'sale'
+    group_by = {'pk': 'customer_id', 'name': 'customer__name', 'code': 'customer__code'}
+    columns = (
+        Column('name', 'Cliente'),
+        Column('code', 'Código'),
+        Column('total_operations', 'Cantidad de Ventas', 'int'),
+        Column('total', 'Total Ventas', 'money'),
+    )
+
+
+@register_report
+class SummaryBySupplierReport(SummaryByPartyReport):
+    slug = 'summary_by_supplier'
+    title = 'Resumen por Proveedor'
+    template_name = 'reports/summary_by_supplier.html'
+    filename_prefix = 'resumen_proveedores'
+    operation_type = 'purchase'
+    group_by = {'pk': 'supplier_id', 'name': 'supplier__name', 'code': 'supplier__code'}
+    columns = (
+        Column('name', 'Proveedor'),
+        Column('code', 'Código'),
+        Column('total_operations', 'Cantidad de Compras', 'int'),
+        Column('total', 'Total Compras', 'money'),
+    )
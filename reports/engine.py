@@ -0,0 +1,389 @@
+"""
+Motor declarativo de reportes.
+
+Un reporte se declara como subclase de Report (ver reports.definitions):
+- base_queryset / operation_type: operaciones de la empresa que entran al reporte.
+- filtros comunes: rango de fechas (start_date/end_date) y estado (?status=).
+- fields (filas sin agrupar) o group_by + measures (filas agrupadas en SQL).
+- totals: agregados del total general.
+- columns: columnas de salida (clave, encabezado y tipo de formato).
+
+Todos los reportes pasan por el mismo pipeline (render_report):
+- html / json: página de filas + totales, cacheados por
+  (empresa, reporte, parámetros, versión de datos). La versión se incrementa
+  desde reports.signals cuando cambian operaciones, clientes o proveedores.
+- csv / xlsx: exportación completa; las filas se leen en streaming con
+  iterator() y los totales salen del caché.
+
+Consultas por reporte (sin caché): una agregación para totales + cantidad de
+filas (hace de fila "ROLLUP"; SQLite no soporta GROUP BY ROLLUP) y una para la
+página pedida. El paginador reutiliza esa cantidad en lugar de hacer su propio COUNT.
+"""
+
+from datetime import datetime, timedelta
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.utils.functional import cached_property
+
+from core.utils.cache import get_or_set_tenant_cache, invalidate_tenant_cache
+from core.utils.csv_export import CSV_CHUNK_SIZE, export_csv_response
+from operations.models import Operation
+
+
+REPORTS_CACHE_NAMESPACE = 'reports'
+
+DEFAULT_REPORT_DAYS = 30
+
+REPORT_PAGE_SIZE = 25
+
+REPORT_FORMATS = ('html', 'csv', 'json', 'xlsx')
+
+# Estados seleccionables en los reportes ('all' = sin filtro de estado)
+REPORT_STATUS_CHOICES = (
+    ('confirmed', 'Confirmadas'),
+    ('draft', 'Borradores'),
+    ('cancelled', 'Canceladas'),
+    ('all', 'Todas'),
+)
+DEFAULT_REPORT_STATUS = 'confirmed'
+
+STATUS_DISPLAY = dict(Operation.STATUS_CHOICES)
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def parse_report_dates(params, default_days=DEFAULT_REPORT_DAYS):
+    """
+    Lee start_date/end_date (YYYY-MM-DD) de params (ej. request.GET).
+    Por defecto: los últimos default_days días hasta hoy.
+
+    Raises:
+        ValueError: si alguna fecha no tiene el formato esperado
+    """
+    today = datetime.now().date()
+    start_date = params.get('start_date') or (today - timedelta(days=default_days)).strftime('%Y-%m-%d')
+    end_date = params.get('end_date') or today.strftime('%Y-%m-%d')
+    return (
+        datetime.strptime(start_date, '%Y-%m-%d').date(),
+        datetime.strptime(end_date, '%Y-%m-%d').date(),
+    )
+
+
+def normalize_report_status(status, default=DEFAULT_REPORT_STATUS):
+    """Devuelve el estado si es válido; si no, el estado por defecto."""
+    valid = {value for value, _ in REPORT_STATUS_CHOICES}
+    return status if status in valid else default
+
+
+def invalidate_reports_cache(company):
+    """Invalida los reportes cacheados de la empresa (al confirmar la transacción en curso)."""
+    invalidate_tenant_cache(company, REPORTS_CACHE_NAMESPACE)
+
+
+class Column:
+    """
+    Columna de salida de un reporte.
+    kind: 'text' | 'int' | 'money' | 'date' | 'status'
+    """
+
+    def __init__(self, key, label, kind='text'):
+        self.key = key
+        self.label = label
+        self.kind = kind
+
+    def format(self, value):
+        """Valor como texto para CSV."""
+        if self.kind == 'money':
+            return f'{value or 0:.2f}'
+        if self.kind == 'date':
+            return value.strftime('%d/%m/%Y') if value else ''
+        if self.kind == 'status':
+            return STATUS_DISPLAY.get(value, value)
+        if self.kind == 'text' and not value:
+            return '-'
+        return value
+
+    def native(self, value):
+        """Valor para planillas (números y fechas nativos)."""
+        if self.kind == 'money':
+            return value or 0
+        if self.kind == 'status':
+            return STATUS_DISPLAY.get(value, value)
+        return value
+
+
+class _KnownCountPaginator(Paginator):
+    """Paginator que recibe la cantidad total ya calculada (evita el COUNT extra)."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        return self._known_count
+
+
+REPORT_REGISTRY = {}
+
+
+def register_report(report_class):
+    """Decorador: registra el reporte por slug (ver get_report_class)."""
+    REPORT_REGISTRY[report_class.slug] = report_class
+    return report_class
+
+
+def get_report_class(slug):
+    """Clase del reporte registrado con ese slug (KeyError si no existe)."""
+    return REPORT_REGISTRY[slug]
+
+
+class Report:
+    """
+    Reporte declarativo sobre operaciones de una empresa.
+
+    Las subclases declaran los atributos de clase; una instancia representa una
+    ejecución con parámetros concretos (empresa, fechas y estado).
+    """
+    slug = None
+    title = ''
+    template_name = None
+    filename_prefix = 'reporte'
+    operation_type = None
+    default_status = DEFAULT_REPORT_STATUS
+
+    # Filas sin agrupar: clave -> lookup
+    fields = {}
+    # Filas agrupadas: clave -> lookup (GROUP BY); 'pk' identifica el grupo
+    group_by = {}
+    # Agregados por fila agrupada: clave -> expresión
+    measures = {}
+    # Agregados del total general: clave -> expresión
+    totals = {}
+    ordering = ()
+    columns = ()
+    totals_label = 'TOTALES'
+    page_size = REPORT_PAGE_SIZE
+
+    def __init__(self, company, start_date, end_date, status=None):
+        self.company = company
+        self.start_date = start_date
+        self.end_date = end_date
+        self.status = normalize_report_status(status, self.default_status)
+
+    @classmethod
+    def from_params(cls, company, params):
+        """
+        Crea la ejecución desde parámetros GET (o un dict equivalente).
+
+        Raises:
+            ValueError: si las fechas son inválidas
+        """
+        start_date, end_date = parse_report_dates(params)
+        return cls(company, start_date, end_date, status=params.get('status'))
+
+    @property
+    def params(self):
+        """Parámetros normalizados (serializables) de esta ejecución."""
+        return {
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+            'status': self.status,
+        }
+
+    @property
+    def filename(self):
+        return f'{self.filename_prefix}_{self.start_date}_{self.end_date}'
+
+    # --- Consultas ---
+
+    def base_queryset(self):
+        """Operaciones de la empresa (y del tipo declarado, si hay)."""
+        queryset = Operation.objects.for_company(self.company)
+        if self.operation_type:
+            queryset = queryset.filter(type=self.operation_type)
+        return queryset
+
+    def get_queryset(self):
+        """Base + filtros comunes (fechas, estado y grupo no nulo)."""
+        queryset = self.base_queryset().filter(
+            date__gte=self.start_date,
+            date__lte=self.end_date,
+        )
+        if self.status != 'all':
+            queryset = queryset.filter(status=self.status)
+        if self.group_by:
+            queryset = queryset.filter(**{f"{self.group_by['pk']}__isnull": False})
+        return queryset
+
+    @staticmethod
+    def _values(queryset, mapping):
+        """values() con alias: las claves iguales al lookup se piden tal cual."""
+        plain = [key for key, lookup in mapping.items() if key == lookup]
+        aliased = {key: F(lookup) for key, lookup in mapping.items() if key != lookup}
+        return queryset.values(*plain, **aliased)
+
+    def rows_queryset(self):
+        """QuerySet de filas (dicts) ya ordenado."""
+        queryset = self.get_queryset()
+        if self.group_by:
+            queryset = self._values(queryset.order_by(), self.group_by).annotate(**self.measures)
+        else:
+            queryset = self._values(queryset, self.fields)
+        return queryset.order_by(*self.ordering)
+
+    def compute_summary(self):
+        """Totales declarados + cantidad de filas, en una sola consulta."""
+        if self.group_by:
+            count = Count(self.group_by['pk'], distinct=True)
+        else:
+            count = Count('id')
+        result = self.get_queryset().order_by().aggregate(_count=count, **self.totals)
+        row_count = result.pop('_count') or 0
+        return {'totals': {key: value or 0 for key, value in result.items()}, 'count': row_count}
+
+    def _cached(self, parts, compute):
+        return get_or_set_tenant_cache(
+            self.company,
+            REPORTS_CACHE_NAMESPACE,
+            (self.slug, self.start_date, self.end_date, self.status) + tuple(parts),
+            compute,
+        )
+
+    @cached_property
+    def summary(self):
+        """{'totals': {...}, 'count': n}, cacheado por versión de datos."""
+        return self._cached(('summary',), self.compute_summary)
+
+    def get_page(self, page_number, per_page=None):
+        """
+        Página de filas como django.core.paginator.Page (object_list = lista de dicts).
+        Números inválidos caen en la primera/última página, como Paginator.get_page.
+        """
+        per_page = per_page or self.page_size
+        paginator = _KnownCountPaginator(self.rows_queryset(), per_page, self.summary['count'])
+        try:
+            number = paginator.validate_number(page_number)
+        except PageNotAnInteger:
+            number = 1
+        except EmptyPage:
+            number = paginator.num_pages
+
+        def compute():
+            bottom = (number - 1) * per_page
+            return list(self.rows_queryset()[bottom:bottom + per_page])
+
+        rows = self._cached(('page', per_page, number), compute)
+        return Page(rows, number, paginator)
+
+    def iter_rows(self):
+        """Todas las filas en streaming (exportaciones)."""
+        return self.rows_queryset().iterator(chunk_size=CSV_CHUNK_SIZE)
+
+    # --- Salidas ---
+
+    def headers(self):
+        return [column.label for column in self.columns]
+
+    def iter_csv_rows(self):
+        """Filas formateadas + fila de totales."""
+        for row in self.iter_rows():
+            yield [column.format(row.get(column.key)) for column in self.columns]
+        yield []
+        yield self.totals_row(lambda column, value: column.format(value))
+
+    def totals_row(self, formatter):
+        """Fila de totales alineada con las columnas (la primera lleva la etiqueta)."""
+        totals = self.summary['totals']
+        row = []
+        for index, column in enumerate(self.columns):
+            if index == 0:
+                row.append(self.totals_label)
+            elif column.key in totals:
+                row.append(formatter(column, totals[column.key]))
+            else:
+                row.append('')
+        return row
+
+    def write_xlsx(self, stream):
+        """
+        Escribe el reporte completo como XLSX en stream (requiere openpyxl).
+        Usa el modo write-only de openpyxl: memoria acotada sin importar la cantidad de filas.
+        """
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=self.title[:31] or 'Reporte')
+        sheet.append(self.headers())
+        for row in self.iter_rows():
+            sheet.append([column.native(row.get(column.key)) for column in self.columns])
+        sheet.append([])
+        sheet.append(self.totals_row(lambda column, value: column.native(value)))
+        workbook.save(stream)
+
+    def json_payload(self, page):
+        return {
+            'report': self.slug,
+            'title': self.title,
+            'params': self.params,
+            'columns': [{'key': c.key, 'label': c.label, 'kind': c.kind} for c in self.columns],
+            'rows': list(page.object_list),
+            'totals': self.summary['totals'],
+            'count': page.paginator.count,
+            'page': page.number,
+            'num_pages': page.paginator.num_pages,
+        }
+
+    def html_context(self, page):
+        return {
+            'report': self,
+            'rows': page.object_list,
+            'page_obj': page,
+            'paginator': page.paginator,
+            'is_paginated': page.has_other_pages(),
+            'totals': self.summary['totals'],
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'status_filter': self.status,
+            'status_choices': REPORT_STATUS_CHOICES,
+            # Parámetros que los links de paginación deben conservar
+            'extra_query': urlencode({
+                'start_date': self.start_date.isoformat(),
+                'end_date': self.end_date.isoformat(),
+            }),
+        }
+
+
+def render_report(request, report, fmt='html'):
+    """Renderiza la ejecución del reporte en el formato pedido (html, csv, json o xlsx)."""
+    if fmt == 'csv':
+        return export_csv_response(
+            report.filename,
+            report.headers(),
+            report.iter_csv_rows(),
+            bom=False,
+            content_type='text/csv; charset=utf-8',
+        )
+    if fmt == 'xlsx':
+        output = BytesIO()
+        try:
+            report.write_xlsx(output)
+        except ImportError:
+            return HttpResponse(
+                'La librería openpyxl no está instalada. Ejecutá: pip install openpyxl',
+                status=500,
+            )
+        response = HttpResponse(output.getvalue(), content_type=XLSX_CONTENT_TYPE)
+        response['Content-Disposition'] = f'attachment; filename="{report.filename}.xlsx"'
+        return response
+
+    page = report.get_page(request.GET.get('page'))
+    if fmt == 'json':
+        return JsonResponse(report.json_payload(page), encoder=DjangoJSONEncoder)
+    return render(request, report.template_name, report.html_context(page))
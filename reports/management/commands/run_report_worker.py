@@ -0,0 +1,118 @@
+"""
+Management command: worker de la cola de reportes en segundo plano (ReportJob).
+
+Uso:
+    python manage.py run_report_worker
+    python manage.py run_report_worker --processes=4 --poll-interval=1
+    python manage.py run_report_worker --once
+    python manage.py run_report_worker --processes=0 --once   # sin pool (mismo proceso)
+
+Reclama trabajos pendientes y los ejecuta en un pool de procesos (los reportes
+pesados y xhtml2pdf no bloquean a gunicorn ni entre sí). En cada ciclo además
+borra los archivos vencidos y da por fallidos los trabajos colgados.
+Pensado para correr como servicio (systemd/supervisor) junto a gunicorn.
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from reports import worker
+from reports.services import claim_report_jobs, purge_report_jobs, run_report_job
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de reportes en segundo plano con un pool de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=getattr(settings, 'REPORT_WORKER_PROCESSES', 2),
+            help='Procesos del pool (0 = ejecutar en este proceso; default: REPORT_WORKER_PROCESSES)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'REPORT_WORKER_POLL_INTERVAL', 2.0),
+            help='Segundos entre consultas a la cola cuando no hay trabajos (default: REPORT_WORKER_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina'
+        )
+
+    def handle(self, *args, **options):
+        processes = max(options['processes'], 0)
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        if processes == 0:
+            processed = self._run_inline(poll_interval, once)
+        else:
+            processed = self._run_pool(processes, poll_interval, once)
+        self.stdout.write(self.style.SUCCESS(f'✓ {processed} trabajos procesados'))
+
+    def _maintenance(self):
+        purged = purge_report_jobs()
+        if purged['expired'] or purged['timed_out']:
+            self.stdout.write(
+                f"  {purged['expired']} archivos vencidos borrados, "
+                f"{purged['timed_out']} trabajos colgados marcados como fallidos"
+            )
+
+    def _report(self, job_id, status):
+        self.stdout.write(f'  Trabajo {job_id}: {status}')
+
+    def _run_inline(self, poll_interval, once):
+        processed = 0
+        while True:
+            self._maintenance()
+            job_ids = claim_report_jobs(1)
+            for job_id in job_ids:
+                self._report(job_id, run_report_job(job_id))
+                processed += 1
+            if not job_ids:
+                if once:
+                    return processed
+                time.sleep(poll_interval)
+
+    def _run_pool(self, processes, poll_interval, once):
+        processed = 0
+        running = {}
+        # spawn: los procesos hijos no heredan conexiones a la base ni threads del padre
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=context,
+            initializer=worker.init_worker_process,
+        ) as executor:
+            try:
+                while True:
+                    self._maintenance()
+                    for job_id in claim_report_jobs(processes - len(running)):
+                        running[executor.submit(worker.run_job, job_id)] = job_id
+
+                    if not running:
+                        if once:
+                            break
+                        connections.close_all()
+                        time.sleep(poll_interval)
+                        continue
+
+                    done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id = running.pop(future)
+                        try:
+                            self._report(job_id, future.result())
+                        except Exception as exc:
+                            self.stdout.write(self.style.ERROR(f'  Trabajo {job_id}: {exc}'))
+                        processed += 1
+            except KeyboardInterrupt:
+                self.stdout.write('Deteniendo worker: se esperan los trabajos en curso...')
+        return processed
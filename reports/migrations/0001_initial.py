@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:29
+
+import django.db.models.deletion
+import django.utils.timezone
+import reports.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0006_auditlog_lookup_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report', models.CharField(max_length=50, verbose_name='Reporte')),
+                ('format', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel'), ('pdf', 'PDF')], max_length=10, verbose_name='Formato')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parámetros')),
+                ('status', models.CharField(choices=[('pending', 'En cola'), ('running', 'Generando'), ('done', 'Listo'), ('failed', 'Error'), ('expired', 'Vencido')], default='pending', max_length=20, verbose_name='Estado')),
+                ('file', models.FileField(blank=True, upload_to=reports.models.report_job_upload_to, verbose_name='Archivo')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de creación')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Vence')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to='core.company', verbose_name='Empresa')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de reporte',
+                'verbose_name_plural': 'Trabajos de reportes',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='reports_rep_status_051565_idx'), models.Index(fields=['company', '-created_at'], name='reports_rep_company_8dec2a_idx')],
+            },
+        ),
+    ]
@@ -1,8 +1,99 @@
 """
-Modelos del módulo de reportes (opcional para v1).
-En la versión 1, los reportes se generan dinámicamente.
+Modelos del módulo de reportes.
+Los reportes se generan dinámicamente (reports.engine); ReportJob es la cola de
+exportaciones pesadas que procesa `manage.py run_report_worker` fuera de los
+workers web.
 """
 
-# Por ahora, el módulo de reportes no requiere modelos.
-# Los reportes se generan dinámicamente desde las operaciones.
-# En versiones futuras se pueden agregar configuraciones de reportes guardadas.
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from core.managers import CompanyManager
+from core.models import Company
+
+
+def report_job_upload_to(instance, filename):
+    """Archivos generados: report_jobs/company_<id>/<archivo>."""
+    return f'report_jobs/company_{instance.company_id}/{filename}'
+
+
+class ReportJob(models.Model):
+    """
+    Pedido de generación de un reporte en segundo plano.
+
+    Ciclo de vida: pending -> running -> done | failed; los archivos de trabajos
+    terminados se borran al vencer expires_at y el trabajo pasa a expired.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_EXPIRED = 'expired'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En cola'),
+        (STATUS_RUNNING, 'Generando'),
+        (STATUS_DONE, 'Listo'),
+        (STATUS_FAILED, 'Error'),
+        (STATUS_EXPIRED, 'Vencido'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+        ('pdf', 'PDF'),
+    ]
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        verbose_name='Empresa',
+        related_name='report_jobs'
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        verbose_name='Solicitado por',
+        related_name='report_jobs',
+        blank=True,
+        null=True
+    )
+    report = models.CharField('Reporte', max_length=50)
+    format = models.CharField('Formato', max_length=10, choices=FORMAT_CHOICES)
+    params = models.JSONField('Parámetros', default=dict, blank=True)
+    status = models.CharField('Estado', max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    file = models.FileField('Archivo', upload_to=report_job_upload_to, blank=True)
+    error = models.TextField('Error', blank=True)
+    created_at = models.DateTimeField('Fecha de creación', default=timezone.now)
+    started_at = models.DateTimeField('Inicio', blank=True, null=True)
+    finished_at = models.DateTimeField('Fin', blank=True, null=True)
+    expires_at = models.DateTimeField('Vence', blank=True, null=True)
+
+    objects = CompanyManager()
+
+    class Meta:
+        verbose_name = 'Trabajo de reporte'
+        verbose_name_plural = 'Trabajos de reportes'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['company', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.report} ({self.format}) - {self.get_status_display()}'
+
+    @property
+    def is_active(self):
+        """True mientras el trabajo está en cola o generándose (la UI sigue consultando)."""
+        return self.status in (self.STATUS_PENDING, self.STATUS_RUNNING)
+
+    @property
+    def is_downloadable(self):
+        return (
+            self.status == self.STATUS_DONE
+            and bool(self.file)
+            and (self.expires_at is None or self.expires_at > timezone.now())
+        )
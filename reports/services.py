@@ -0,0 +1,193 @@
+"""
+Servicios del módulo reports: cola de generación de reportes en segundo plano.
+
+Las vistas encolan un ReportJob (enqueue_report_job) y responden al instante;
+`manage.py run_report_worker` reclama trabajos pendientes (claim_report_jobs),
+los ejecuta en un pool de procesos (run_report_job) y guarda el archivo en
+MEDIA_ROOT/report_jobs/. La UI consulta el estado por HTMX hasta que el archivo
+está listo. Los archivos vencidos se borran con purge_report_jobs.
+"""
+
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from core.utils.csv_export import iter_csv
+
+from .engine import REPORT_REGISTRY, get_report_class
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+# Trabajo especial: PDF del dashboard (core.services.render_dashboard_pdf)
+DASHBOARD_PDF_REPORT = 'dashboard_pdf'
+
+# Formatos que se generan en segundo plano
+REPORT_JOB_FORMATS = ('csv', 'xlsx')
+
+
+def get_report_job_ttl():
+    """Tiempo que se conserva el archivo generado (settings.REPORT_JOB_TTL_HOURS)."""
+    return timedelta(hours=getattr(settings, 'REPORT_JOB_TTL_HOURS', 24))
+
+
+def enqueue_report_job(company, user, report, fmt, params=None):
+    """
+    Encola la generación de un reporte para la empresa.
+
+    Args:
+        report: slug de un reporte registrado (reports.definitions) o 'dashboard_pdf'
+        fmt: 'csv' | 'xlsx' para reportes, 'pdf' para el dashboard
+        params: parámetros del reporte (start_date, end_date, status) o del dashboard (period)
+
+    Raises:
+        ValidationError: si el reporte, el formato o las fechas no son válidos
+    """
+    params = dict(params or {})
+    if report == DASHBOARD_PDF_REPORT:
+        if fmt != 'pdf':
+            raise ValidationError('El reporte del dashboard solo se genera en PDF.')
+        from core.services import normalize_period
+        params = {'period': normalize_period(params.get('period'))}
+    elif report in REPORT_REGISTRY:
+        if fmt not in REPORT_JOB_FORMATS:
+            raise ValidationError(f'Formato no soportado: {fmt}.')
+        try:
+            params = get_report_class(report).from_params(company, params).params
+        except ValueError:
+            raise ValidationError('Fechas inválidas.')
+    else:
+        raise ValidationError(f'Reporte desconocido: {report}.')
+
+    return ReportJob.objects.create(
+        company=company,
+        requested_by=user,
+        report=report,
+        format=fmt,
+        params=params,
+    )
+
+
+def claim_report_jobs(limit):
+    """
+    Reclama hasta `limit` trabajos pendientes (los más antiguos primero) y los
+    marca como running. El cambio de estado es condicional (UPDATE ... WHERE
+    status='pending'), así que varios workers pueden reclamar en paralelo sin
+    ejecutar dos veces el mismo trabajo.
+
+    Returns:
+        list: ids de los trabajos reclamados
+    """
+    if limit <= 0:
+        return []
+    candidates = list(
+        ReportJob.objects.filter(status=ReportJob.STATUS_PENDING)
+        .order_by('created_at', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    claimed = []
+    for job_id in candidates:
+        updated = ReportJob.objects.filter(pk=job_id, status=ReportJob.STATUS_PENDING).update(
+            status=ReportJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+        )
+        if updated:
+            claimed.append(job_id)
+    return claimed
+
+
+def _generate_report_file(job):
+    """Genera el contenido del trabajo. Devuelve (File, nombre de archivo)."""
+    if job.report == DASHBOARD_PDF_REPORT:
+        from core.services import render_dashboard_pdf
+        content, filename = render_dashboard_pdf(job.company, job.params.get('period'))
+        return ContentFile(content), filename
+
+    report = get_report_class(job.report).from_params(job.company, job.params)
+    output = tempfile.TemporaryFile()
+    if job.format == 'xlsx':
+        report.write_xlsx(output)
+    else:
+        for chunk in iter_csv(report.headers(), report.iter_csv_rows(), bom=False):
+            output.write(chunk)
+    output.seek(0)
+    return File(output), f'{report.filename}.{job.format}'
+
+
+def run_report_job(job_id):
+    """
+    Ejecuta un trabajo reclamado: genera el archivo, lo guarda en el storage y
+    marca el trabajo como done (o failed con el error). Pensado para correr en un
+    proceso del pool de run_report_worker.
+
+    El estado final solo se escribe si el trabajo sigue running: si purge_report_jobs
+    ya lo marcó como failed por timeout, se descarta el archivo generado.
+
+    Returns:
+        str: estado final del trabajo
+    """
+    job = ReportJob.objects.select_related('company').get(pk=job_id)
+    running = ReportJob.objects.filter(pk=job.pk, status=ReportJob.STATUS_RUNNING)
+    try:
+        content, filename = _generate_report_file(job)
+        try:
+            job.file.save(filename, content, save=False)
+        finally:
+            content.close()
+    except Exception as exc:
+        logger.exception('Error generando el trabajo de reporte %s', job_id)
+        running.update(
+            status=ReportJob.STATUS_FAILED,
+            error=str(exc)[:1000] or exc.__class__.__name__,
+            finished_at=timezone.now(),
+        )
+        return ReportJob.objects.values_list('status', flat=True).get(pk=job.pk)
+
+    finished_at = timezone.now()
+    updated = running.update(
+        status=ReportJob.STATUS_DONE,
+        file=job.file.name,
+        finished_at=finished_at,
+        expires_at=finished_at + get_report_job_ttl(),
+    )
+    if not updated:
+        logger.warning('El trabajo de reporte %s terminó después de vencer su tiempo; se descarta el archivo', job_id)
+        job.file.delete(save=False)
+    return ReportJob.objects.values_list('status', flat=True).get(pk=job.pk)
+
+
+def purge_report_jobs(now=None):
+    """
+    Mantenimiento de la cola:
+    - borra los archivos de trabajos terminados cuyo expires_at ya pasó (quedan como expired);
+    - marca como failed los trabajos running que superaron REPORT_JOB_TIMEOUT
+      (worker caído o detenido a mitad de un trabajo).
+
+    Returns:
+        dict: {'expired': n, 'timed_out': n}
+    """
+    now = now or timezone.now()
+    expired = 0
+    for job in ReportJob.objects.filter(status=ReportJob.STATUS_DONE, expires_at__lte=now).iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.status = ReportJob.STATUS_EXPIRED
+        job.save(update_fields=['status', 'file'])
+        expired += 1
+
+    timeout = timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 900))
+    timed_out = ReportJob.objects.filter(
+        status=ReportJob.STATUS_RUNNING,
+        started_at__lt=now - timeout,
+    ).update(
+        status=ReportJob.STATUS_FAILED,
+        error='Tiempo de ejecución excedido.',
+        finished_at=now,
+    )
+    return {'expired': expired, 'timed_out': timed_out}
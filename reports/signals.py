@@ -0,0 +1,21 @@
+"""
+Señales del módulo reports.
+Incrementan la versión de datos de los reportes (reports.engine) cuando cambian
+operaciones, clientes o proveedores de una empresa, invalidando sus resultados cacheados.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from customers.models import Customer
+from operations.models import Operation
+from suppliers.models import Supplier
+
+from .engine import invalidate_reports_cache
+
+
+@receiver([post_save, post_delete], sender=Operation)
+@receiver([post_save, post_delete], sender=Customer)
+@receiver([post_save, post_delete], sender=Supplier)
+def report_data_changed(sender, instance, **kwargs):
+    invalidate_reports_cache(instance.company_id)
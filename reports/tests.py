@@ -3,7 +3,21 @@ Tests del módulo reports.
 Verifica que los reportes solo incluyan datos de la empresa activa.
 """
 
-from django.test import TestCase, Client
+import json
+import shutil
+import tempfile
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from io import StringIO
+from pathlib import Path
 from django.contrib.auth.models import User
 from django.urls import reverse
 from decimal import Decimal
@@ -14,6 +28,10 @@ from suppliers.models import Supplier
 from products.models import Product
 from operations.models import Operation, OperationItem
 from operations.services import create_operation, recalculate_operation_totals
+from reports.definitions import SalesByPeriodReport, SummaryByCustomerReport
+from reports.models import ReportJob
+from reports import services
+from reports.services import claim_report_jobs, enqueue_report_job, purge_report_jobs, run_report_job
 
 
 class ReportsMultiTenantTestCase(TestCase):
@@ -21,6 +39,7 @@ class ReportsMultiTenantTestCase(TestCase):
     
     def setUp(self):
         """Configurar datos de prueba."""
+        cache.clear()
         # Crear usuario
         self.user1 = User.objects.create_user(
             username='user1',
@@ -160,13 +179,19 @@ class ReportsMultiTenantTestCase(TestCase):
         
         # Verificar que solo incluye operación de company1
         self.assertEqual(response.status_code, 200)
-        self.assertIn(b'Cliente 1', response.content or b'')
-        self.assertNotIn(b'Cliente 2', response.content or b'')
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        self.assertIn(b'Cliente 1', content)
+        self.assertNotIn(b'Cliente 2', content)
         # Verificar que contiene el número de operación de company1
-        self.assertIn(self.operation1.number.encode('utf-8'), response.content or b'')
+        self.assertIn(self.operation1.number.encode('utf-8'), content)
+        self.assertIn(b'TOTALES', content)
     
     def test_summary_by_customer_only_includes_company_data(self):
         """El resumen por cliente solo incluye datos de la empresa activa."""
+        # El resumen incluye por defecto solo operaciones confirmadas
+        Operation.objects.filter(pk__in=[self.operation1.pk, self.operation2.pk]).update(status='confirmed')
+        
         # Login como user1
         self.client.login(username='user1', password='testpass123')
         
@@ -184,5 +209,309 @@ class ReportsMultiTenantTestCase(TestCase):
         
         # Verificar que solo incluye cliente de company1
         self.assertEqual(response.status_code, 200)
-        self.assertIn(b'Cliente 1', response.content or b'')
-        self.assertNotIn(b'Cliente 2', response.content or b'')
+        content = b''.join(response.streaming_content)
+        self.assertIn(b'Cliente 1', content)
+        self.assertNotIn(b'Cliente 2', content)
+
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class ReportEngineTestCase(TestCase):
+    """Tests del motor de reportes: totales en SQL, filtro de estado, paginación, caché y formatos."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reporter', password='testpass123')
+        self.company = Company.objects.create(name='Empresa Reportes', email='rep@test.com', active=True)
+        Membership.objects.create(user=self.user, company=self.company, role='admin', active=True)
+        self.today = datetime.now().date()
+        self.customers = [
+            Customer.objects.create(company=self.company, code=f'C{i:03d}', name=f'Cliente {i}', active=True)
+            for i in range(3)
+        ]
+        # Cliente 0: 2 confirmadas (100 + 50); Cliente 1: 1 confirmada (300);
+        # Cliente 2: 1 borrador (1000) y 1 cancelada (500)
+        self._operation(self.customers[0], '100.00', 'confirmed')
+        self._operation(self.customers[0], '50.00', 'confirmed')
+        self._operation(self.customers[1], '300.00', 'confirmed')
+        self._operation(self.customers[2], '1000.00', 'draft')
+        self._operation(self.customers[2], '500.00', 'cancelled')
+        
+        self.client = Client()
+        self.client.login(username='reporter', password='testpass123')
+        session = self.client.session
+        session['current_company_id'] = self.company.id
+        session.save()
+    
+    def _operation(self, customer, total, status):
+        operation = create_operation(company=self.company, type='sale', date=self.today, customer=customer)
+        Operation.objects.filter(pk=operation.pk).update(total=Decimal(total), status=status)
+        return operation
+    
+    def _summary(self, status='confirmed'):
+        return SummaryByCustomerReport(
+            self.company, self.today - timedelta(days=1), self.today, status=status,
+        )
+    
+    def test_default_excludes_draft_and_cancelled(self):
+        """Por defecto el resumen solo suma operaciones confirmadas."""
+        report = self._summary(status=None)
+        self.assertEqual(report.status, 'confirmed')
+        self.assertEqual(report.summary['totals']['total'], Decimal('450.00'))
+        self.assertEqual(report.summary['count'], 2)
+        rows = list(report.rows_queryset())
+        self.assertEqual([r['name'] for r in rows], ['Cliente 1', 'Cliente 0'])
+        self.assertEqual(rows[1]['total_operations'], 2)
+        self.assertEqual(rows[1]['total'], Decimal('150.00'))
+    
+    def test_status_filter(self):
+        """El filtro de estado cambia filas y total general; 'all' incluye todo."""
+        self.assertEqual(self._summary('draft').summary['totals']['total'], Decimal('1000.00'))
+        self.assertEqual(self._summary('cancelled').summary['totals']['total'], Decimal('500.00'))
+        self.assertEqual(self._summary('all').summary['totals']['total'], Decimal('1950.00'))
+    
+    def test_period_report_defaults_to_all_statuses(self):
+        """El reporte por período lista todas las operaciones salvo que se filtre."""
+        report = SalesByPeriodReport(self.company, self.today, self.today)
+        self.assertEqual(report.summary['count'], 5)
+        self.assertEqual(report.summary['totals']['total'], Decimal('1950.00'))
+        self.assertEqual(list(report.rows_queryset())[0]['party'], 'Cliente 2')
+    
+    def test_page_uses_fixed_queries_and_cache(self):
+        """Página y totales: dos consultas sin caché (sin COUNT del paginador) y ninguna con caché."""
+        with CaptureQueriesContext(connection) as ctx:
+            page = self._summary().get_page(2, per_page=1)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(page.paginator.num_pages, 2)
+        self.assertEqual([r['name'] for r in page.object_list], ['Cliente 0'])
+        
+        with CaptureQueriesContext(connection) as ctx:
+            cached = self._summary().get_page(2, per_page=1)
+            self._summary().summary
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(cached.object_list, page.object_list)
+    
+    def test_cache_invalidated_when_operations_change(self):
+        """Guardar una operación incrementa la versión de datos de los reportes."""
+        self.assertEqual(self._summary().summary['totals']['total'], Decimal('450.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            operation = create_operation(company=self.company, type='sale', date=self.today, customer=self.customers[1])
+            operation.total = Decimal('25.00')
+            operation.status = 'confirmed'
+            operation.save(update_fields=['total', 'status'])
+        self.assertEqual(self._summary().summary['totals']['total'], Decimal('475.00'))
+    
+    def test_summary_view_html_and_csv(self):
+        """La vista muestra el total general de SQL y el CSV respeta el filtro de estado."""
+        url = reverse('reports:summary_by_customer')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['totals']['total'], Decimal('450.00'))
+        self.assertContains(response, 'Cliente 1')
+        self.assertNotContains(response, 'Cliente 2')
+        
+        response = self.client.get(f'{url}?status=all&format=csv')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('Cliente 2', content)
+        self.assertIn('TOTAL GENERAL,,,1950.00', content)
+    
+    def test_period_view_paginates(self):
+        """El reporte por período pagina en el servidor y conserva fechas y estado en los links."""
+        url = reverse('reports:sales_by_period')
+        with patch.object(SalesByPeriodReport, 'page_size', 2):
+            response = self.client.get(f'{url}?page=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['rows']), 2)
+        self.assertTrue(response.context['is_paginated'])
+        self.assertEqual(response.context['totals']['total'], Decimal('1950.00'))
+        self.assertContains(response, f'&status=all&start_date={(self.today - timedelta(days=30)).isoformat()}')
+    
+    def test_json_format(self):
+        """format=json devuelve columnas, filas de la página y totales."""
+        response = self.client.get(reverse('reports:sales_by_period') + '?format=json&status=confirmed')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['report'], 'sales_by_period')
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(len(data['rows']), 3)
+        self.assertEqual(Decimal(data['totals']['total']), Decimal('450.00'))
+        self.assertEqual([c['key'] for c in data['columns']][:3], ['number', 'date', 'party'])
+    
+    @skipUnless(openpyxl, 'openpyxl no está instalado')
+    def test_xlsx_format(self):
+        """format=xlsx devuelve una planilla con encabezados, filas y totales."""
+        from io import BytesIO
+        
+        response = self.client.get(reverse('reports:summary_by_customer') + '?format=xlsx')
+        self.assertEqual(response.status_code, 200)
+        sheet = openpyxl.load_workbook(BytesIO(response.content)).active
+        values = list(sheet.values)
+        self.assertEqual(values[0][0], 'Cliente')
+        self.assertEqual(values[-1][0], 'TOTAL GENERAL')
+        self.assertEqual(float(values[-1][3]), 450.0)
+
+
+class ReportJobTestCase(TestCase):
+    """Tests de la cola de reportes en segundo plano y el worker."""
+    
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        
+        self.user = User.objects.create_user(username='jobs', password='testpass123')
+        self.company = Company.objects.create(name='Empresa Jobs', email='jobs@test.com', active=True)
+        self.other_company = Company.objects.create(name='Otra Empresa', email='otra@test.com', active=True)
+        Membership.objects.create(user=self.user, company=self.company, role='admin', active=True)
+        Membership.objects.create(user=self.user, company=self.other_company, role='admin', active=True)
+        customer = Customer.objects.create(company=self.company, code='C001', name='Cliente Job', active=True)
+        operation = create_operation(company=self.company, type='sale', date=datetime.now().date(), customer=customer)
+        Operation.objects.filter(pk=operation.pk).update(total=Decimal('120.00'), status='confirmed')
+        
+        self.client = Client()
+        self.client.login(username='jobs', password='testpass123')
+        self._select_company(self.company)
+    
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def _select_company(self, company):
+        session = self.client.session
+        session['current_company_id'] = company.id
+        session.save()
+    
+    def _run_worker(self):
+        out = StringIO()
+        call_command('run_report_worker', processes=0, once=True, stdout=out)
+        return out.getvalue()
+    
+    def test_enqueue_validates_report_format_and_dates(self):
+        """Reporte desconocido, formato no soportado o fechas inválidas no se encolan."""
+        with self.assertRaises(ValidationError):
+            enqueue_report_job(self.company, self.user, 'no_existe', 'csv')
+        with self.assertRaises(ValidationError):
+            enqueue_report_job(self.company, self.user, 'sales_by_period', 'pdf')
+        with self.assertRaises(ValidationError):
+            enqueue_report_job(self.company, self.user, 'sales_by_period', 'csv', {'start_date': 'x'})
+        with self.assertRaises(ValidationError):
+            enqueue_report_job(self.company, self.user, 'dashboard_pdf', 'csv')
+        self.assertFalse(ReportJob.objects.exists())
+    
+    def test_worker_generates_file_and_download(self):
+        """El worker genera el CSV, marca el trabajo como listo con vencimiento y se puede descargar."""
+        job = enqueue_report_job(self.company, self.user, 'summary_by_customer', 'csv', {'status': 'confirmed'})
+        self.assertEqual(job.params['status'], 'confirmed')
+        self.assertIn('start_date', job.params)
+        
+        output = self._run_worker()
+        self.assertIn('1 trabajos procesados', output)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_DONE)
+        self.assertIsNotNone(job.expires_at)
+        self.assertTrue(job.file.name.startswith(f'report_jobs/company_{self.company.id}/'))
+        
+        response = self.client.get(reverse('reports:job_download', args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('Cliente Job', content)
+        self.assertIn('TOTAL GENERAL,,,120.00', content)
+        
+        # Otra empresa no ve el trabajo
+        self._select_company(self.other_company)
+        response = self.client.get(reverse('reports:job_download', args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_htmx_create_and_status_polling(self):
+        """Con HTMX se encola el trabajo y el widget sigue consultando hasta que termina."""
+        response = self.client.post(
+            reverse('reports:job_create'),
+            {'report': 'sales_by_period', 'format': 'csv', 'status': 'all'},
+            HTTP_HX_REQUEST='true',
+        )
+        self.assertEqual(response.status_code, 200)
+        job = ReportJob.objects.get()
+        status_url = reverse('reports:job_status', args=[job.pk])
+        self.assertContains(response, 'id="report-job-slot"')
+        self.assertContains(response, f'hx-get="{status_url}"')
+        
+        self._run_worker()
+        response = self.client.get(status_url)
+        self.assertNotContains(response, 'hx-trigger')
+        self.assertContains(response, reverse('reports:job_download', args=[job.pk]))
+    
+    def test_failed_job_records_error(self):
+        """Un error al generar deja el trabajo en failed con el mensaje."""
+        job = enqueue_report_job(self.company, self.user, 'sales_by_period', 'csv')
+        with patch('reports.services._generate_report_file', side_effect=RuntimeError('sin disco')), \
+                self.assertLogs('reports.services', 'ERROR'):
+            self._run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_FAILED)
+        self.assertEqual(job.error, 'sin disco')
+    
+    def test_claim_is_exclusive(self):
+        """Un trabajo reclamado no se vuelve a entregar."""
+        job = enqueue_report_job(self.company, self.user, 'sales_by_period', 'csv')
+        self.assertEqual(claim_report_jobs(5), [job.pk])
+        self.assertEqual(claim_report_jobs(5), [])
+        self.assertEqual(ReportJob.objects.get(pk=job.pk).status, ReportJob.STATUS_RUNNING)
+    
+    def test_purge_expired_files_and_stale_jobs(self):
+        """Los archivos vencidos se borran y los trabajos colgados pasan a failed."""
+        job = enqueue_report_job(self.company, self.user, 'sales_by_period', 'csv')
+        self._run_worker()
+        job.refresh_from_db()
+        path = job.file.path
+        stale = enqueue_report_job(self.company, self.user, 'sales_by_period', 'csv')
+        ReportJob.objects.filter(pk=stale.pk).update(
+            status=ReportJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(hours=2),
+        )
+        
+        result = purge_report_jobs(now=job.expires_at + timedelta(seconds=1))
+        self.assertEqual(result, {'expired': 1, 'timed_out': 1})
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_EXPIRED)
+        self.assertFalse(job.file)
+        self.assertFalse(Path(path).exists())
+        self.assertEqual(ReportJob.objects.get(pk=stale.pk).status, ReportJob.STATUS_FAILED)
+    
+    def test_jobs_are_private_to_the_requesting_user(self):
+        """Otro usuario de la misma empresa no puede consultar ni descargar el trabajo."""
+        job = enqueue_report_job(self.company, self.user, 'sales_by_period', 'csv')
+        self._run_worker()
+        
+        other_user = User.objects.create_user(username='colega', password='testpass123')
+        Membership.objects.create(user=other_user, company=self.company, role='admin', active=True)
+        self.client.login(username='colega', password='testpass123')
+        self._select_company(self.company)
+        
+        self.assertEqual(self.client.get(reverse('reports:job_status', args=[job.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('reports:job_download', args=[job.pk])).status_code, 404)
+    
+    def test_timed_out_job_is_not_marked_done(self):
+        """Si el trabajo venció mientras se generaba, queda failed y se descarta el archivo."""
+        job = enqueue_report_job(self.company, self.user, 'sales_by_period', 'csv')
+        self.assertEqual(claim_report_jobs(1), [job.pk])
+        generate = services._generate_report_file
+        
+        def generate_then_time_out(running_job):
+            result = generate(running_job)
+            purge_report_jobs(now=timezone.now() + timedelta(days=1))
+            return result
+        
+        with patch('reports.services._generate_report_file', side_effect=generate_then_time_out), \
+                self.assertLogs('reports.services', 'WARNING'):
+            status = run_report_job(job.pk)
+        
+        self.assertEqual(status, ReportJob.STATUS_FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_FAILED)
+        self.assertFalse(job.file)
+        self.assertEqual([path for path in Path(self.media_root).rglob('*') if path.is_file()], [])
@@ -11,4 +11,8 @@ urlpatterns = [
     path('compras-periodo/', views.PurchasesByPeriodView.as_view(), name='purchases_by_period'),
     path('resumen-clientes/', views.SummaryByCustomerView.as_view(), name='summary_by_customer'),
     path('resumen-proveedores/', views.SummaryBySupplierView.as_view(), name='summary_by_supplier'),
+    path('trabajos/', views.ReportJobListView.as_view(), name='jobs'),
+    path('trabajos/nuevo/', views.ReportJobCreateView.as_view(), name='job_create'),
+    path('trabajos/<int:pk>/estado/', views.ReportJobStatusView.as_view(), name='job_status'),
+    path('trabajos/<int:pk>/descargar/', views.ReportJobDownloadView.as_view(), name='job_download'),
 ]
@@ -1,22 +1,25 @@
 """Vistas del módulo reports."""
 
-import csv
-from datetime import datetime, timedelta
-from django.http import HttpResponse
 from django.views.generic import ListView, View
-from django.shortcuts import redirect, render
+from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import messages
-from django.db.models import Sum, Count
+from django.core.exceptions import ValidationError
+from django.http import FileResponse, Http404
 from core.mixins import (
     CompanyRequiredMixin, 
     CompanyContextMixin, 
-    CompanyFilterMixin,
     RoleRequiredMixin,
 )
 from core.constants import ROLE_ADMIN, ROLE_MANAGER, ROLE_OPERATOR
-from operations.models import Operation
-from customers.models import Customer
-from suppliers.models import Supplier
+from .definitions import (
+    PurchasesByPeriodReport,
+    SalesByPeriodReport,
+    SummaryByCustomerReport,
+    SummaryBySupplierReport,
+)
+from .engine import REPORT_FORMATS, render_report
+from .models import ReportJob
+from .services import enqueue_report_job
 
 
 class ReportsListView(
@@ -54,299 +57,138 @@ class ReportsListView(
         ]
 
 
-class SalesByPeriodView(
+class ReportView(
     CompanyRequiredMixin,
     CompanyContextMixin,
     RoleRequiredMixin,
     View
 ):
-    """Reporte de ventas por período."""
+    """
+    Vista genérica de un reporte declarado en reports.definitions.
+    GET ?start_date=&end_date=&status=&page=&format=html|csv|json|xlsx
+    """
     required_roles = [ROLE_ADMIN, ROLE_MANAGER, ROLE_OPERATOR]
+    report_class = None
     
     def get(self, request):
-        """Genera reporte de ventas por período."""
-        company = request.current_company
-        
-        # Obtener fechas del request
-        start_date = request.GET.get('start_date', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
-        end_date = request.GET.get('end_date', datetime.now().strftime('%Y-%m-%d'))
-        
+        """Ejecuta el reporte para la empresa actual y lo renderiza en el formato pedido."""
         try:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+            report = self.report_class.from_params(request.current_company, request.GET)
         except ValueError:
             messages.error(request, 'Fechas inválidas.')
             return redirect('reports:list')
         
-        # Filtrar operaciones por empresa, tipo y fechas
-        operations = Operation.objects.for_company(company).filter(
-            type='sale',
-            date__gte=start_date,
-            date__lte=end_date
-        ).select_related('customer').order_by('-date', '-number')
-        
-        # Exportar CSV si se solicita
-        if request.GET.get('format') == 'csv':
-            response = HttpResponse(content_type='text/csv; charset=utf-8')
-            response['Content-Disposition'] = f'attachment; filename="ventas_{start_date}_{end_date}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow(['Número', 'Fecha', 'Cliente', 'Subtotal', 'Impuesto', 'Total', 'Estado'])
-            
-            for operation in operations:
-                writer.writerow([
-                    operation.number,
-                    operation.date.strftime('%d/%m/%Y'),
-                    operation.customer.name if operation.customer else '-',
-                    f'{operation.subtotal:.2f}',
-                    f'{operation.tax:.2f}',
-                    f'{operation.total:.2f}',
-                    operation.get_status_display(),
-                ])
-            
-            # Totales
-            totals = operations.aggregate(
-                subtotal=Sum('subtotal'),
-                tax=Sum('tax'),
-                total=Sum('total')
-            )
-            
-            writer.writerow([])
-            writer.writerow(['TOTALES', '', '', 
-                           f"{totals['subtotal'] or 0:.2f}",
-                           f"{totals['tax'] or 0:.2f}",
-                           f"{totals['total'] or 0:.2f}",
-                           ''])
-            
-            return response
-        
-        # Renderizar template
-        context = {
-            'operations': operations,
-            'start_date': start_date,
-            'end_date': end_date,
-            'totals': operations.aggregate(
-                subtotal=Sum('subtotal'),
-                tax=Sum('tax'),
-                total=Sum('total')
-            ),
-        }
-        return render(request, 'reports/sales_by_period.html', context)
+        fmt = request.GET.get('format', 'html')
+        if fmt not in REPORT_FORMATS:
+            fmt = 'html'
+        return render_report(request, report, fmt)
+
+
+class SalesByPeriodView(ReportView):
+    """Reporte de ventas por período."""
+    report_class = SalesByPeriodReport
+
+
+class PurchasesByPeriodView(ReportView):
+    """Reporte de compras por período."""
+    report_class = PurchasesByPeriodReport
+
+
+class SummaryByCustomerView(ReportView):
+    """Resumen de ventas por cliente."""
+    report_class = SummaryByCustomerReport
 
 
-class PurchasesByPeriodView(
+class SummaryBySupplierView(ReportView):
+    """Resumen de compras por proveedor."""
+    report_class = SummaryBySupplierReport
+
+
+class ReportJobListView(
+    CompanyRequiredMixin,
+    CompanyContextMixin,
+    RoleRequiredMixin,
+    ListView
+):
+    """Últimos reportes generados en segundo plano por el usuario en la empresa actual."""
+    template_name = 'reports/jobs.html'
+    context_object_name = 'jobs'
+    required_roles = [ROLE_ADMIN, ROLE_MANAGER, ROLE_OPERATOR]
+    
+    def get_queryset(self):
+        return ReportJob.objects.for_company(self.get_company()).filter(
+            requested_by=self.request.user,
+        )[:50]
+
+
+class ReportJobCreateView(
     CompanyRequiredMixin,
     CompanyContextMixin,
     RoleRequiredMixin,
     View
 ):
-    """Reporte de compras por período."""
+    """
+    Encola un reporte para generarlo en segundo plano.
+    POST report=<slug>|dashboard_pdf, format=csv|xlsx|pdf y los parámetros del reporte.
+    Con HTMX devuelve el widget de estado (que se refresca solo); sin HTMX redirige a la lista.
+    """
     required_roles = [ROLE_ADMIN, ROLE_MANAGER, ROLE_OPERATOR]
     
-    def get(self, request):
-        """Genera reporte de compras por período."""
-        company = request.current_company
-        
-        # Obtener fechas del request
-        start_date = request.GET.get('start_date', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
-        end_date = request.GET.get('end_date', datetime.now().strftime('%Y-%m-%d'))
-        
+    def post(self, request):
         try:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        except ValueError:
-            messages.error(request, 'Fechas inválidas.')
-            return redirect('reports:list')
-        
-        # Filtrar operaciones por empresa, tipo y fechas
-        operations = Operation.objects.for_company(company).filter(
-            type='purchase',
-            date__gte=start_date,
-            date__lte=end_date
-        ).select_related('supplier').order_by('-date', '-number')
-        
-        # Exportar CSV si se solicita
-        if request.GET.get('format') == 'csv':
-            response = HttpResponse(content_type='text/csv; charset=utf-8')
-            response['Content-Disposition'] = f'attachment; filename="compras_{start_date}_{end_date}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow(['Número', 'Fecha', 'Proveedor', 'Subtotal', 'Impuesto', 'Total', 'Estado'])
-            
-            for operation in operations:
-                writer.writerow([
-                    operation.number,
-                    operation.date.strftime('%d/%m/%Y'),
-                    operation.supplier.name if operation.supplier else '-',
-                    f'{operation.subtotal:.2f}',
-                    f'{operation.tax:.2f}',
-                    f'{operation.total:.2f}',
-                    operation.get_status_display(),
-                ])
-            
-            # Totales
-            totals = operations.aggregate(
-                subtotal=Sum('subtotal'),
-                tax=Sum('tax'),
-                total=Sum('total')
+            job = enqueue_report_job(
+                request.current_company,
+                request.user,
+                request.POST.get('report', ''),
+                request.POST.get('format', ''),
+                params=request.POST.dict(),
             )
-            
-            writer.writerow([])
-            writer.writerow(['TOTALES', '', '', 
-                           f"{totals['subtotal'] or 0:.2f}",
-                           f"{totals['tax'] or 0:.2f}",
-                           f"{totals['total'] or 0:.2f}",
-                           ''])
-            
-            return response
+        except ValidationError as e:
+            if request.headers.get('HX-Request') == 'true':
+                return render(request, 'reports/_report_job.html', {'error': e.messages[0], 'with_slot': True})
+            messages.error(request, e.messages[0])
+            return redirect('reports:list')
         
-        # Renderizar template
-        context = {
-            'operations': operations,
-            'start_date': start_date,
-            'end_date': end_date,
-            'totals': operations.aggregate(
-                subtotal=Sum('subtotal'),
-                tax=Sum('tax'),
-                total=Sum('total')
-            ),
-        }
-        return render(request, 'reports/purchases_by_period.html', context)
+        if request.headers.get('HX-Request') == 'true':
+            return render(request, 'reports/_report_job.html', {'job': job, 'with_slot': True})
+        messages.success(request, 'El reporte se está generando. Lo vas a poder descargar desde esta lista.')
+        return redirect('reports:jobs')
 
 
-class SummaryByCustomerView(
+class ReportJobStatusView(
     CompanyRequiredMixin,
     CompanyContextMixin,
     RoleRequiredMixin,
     View
 ):
-    """Resumen de ventas por cliente."""
+    """Fragmento HTMX con el estado de un trabajo del usuario (sondeado mientras está en cola o generándose)."""
     required_roles = [ROLE_ADMIN, ROLE_MANAGER, ROLE_OPERATOR]
     
-    def get(self, request):
-        """Genera resumen de ventas por cliente."""
-        company = request.current_company
-        
-        # Obtener fechas del request
-        start_date = request.GET.get('start_date', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
-        end_date = request.GET.get('end_date', datetime.now().strftime('%Y-%m-%d'))
-        
-        try:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        except ValueError:
-            messages.error(request, 'Fechas inválidas.')
-            return redirect('reports:list')
-        
-        # Agrupar ventas por cliente
-        customers = Customer.objects.for_company(company).filter(
-            operations__type='sale',
-            operations__date__gte=start_date,
-            operations__date__lte=end_date,
-            operations__company=company
-        ).annotate(
-            total_operations=Count('operations'),
-            total_sales=Sum('operations__total')
-        ).filter(total_operations__gt=0).order_by('-total_sales')
-        
-        # Exportar CSV si se solicita
-        if request.GET.get('format') == 'csv':
-            response = HttpResponse(content_type='text/csv; charset=utf-8')
-            response['Content-Disposition'] = f'attachment; filename="resumen_clientes_{start_date}_{end_date}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow(['Cliente', 'Código', 'Cantidad de Ventas', 'Total Ventas'])
-            
-            total_general = 0
-            for customer in customers:
-                total = customer.total_sales or 0
-                total_general += total
-                writer.writerow([
-                    customer.name,
-                    customer.code,
-                    customer.total_operations,
-                    f'{total:.2f}',
-                ])
-            
-            writer.writerow([])
-            writer.writerow(['TOTAL GENERAL', '', '', f'{total_general:.2f}'])
-            
-            return response
-        
-        # Renderizar template
-        context = {
-            'customers': customers,
-            'start_date': start_date,
-            'end_date': end_date,
-            'total_general': sum(c.total_sales or 0 for c in customers),
-        }
-        return render(request, 'reports/summary_by_customer.html', context)
+    def get(self, request, pk):
+        job = get_object_or_404(
+            ReportJob.objects.for_company(request.current_company),
+            pk=pk,
+            requested_by=request.user,
+        )
+        return render(request, 'reports/_report_job.html', {'job': job})
 
 
-class SummaryBySupplierView(
+class ReportJobDownloadView(
     CompanyRequiredMixin,
     CompanyContextMixin,
     RoleRequiredMixin,
     View
 ):
-    """Resumen de compras por proveedor."""
+    """Descarga el archivo generado (solo trabajos propios de la empresa actual y mientras no venció)."""
     required_roles = [ROLE_ADMIN, ROLE_MANAGER, ROLE_OPERATOR]
     
-    def get(self, request):
-        """Genera resumen de compras por proveedor."""
-        company = request.current_company
-        
-        # Obtener fechas del request
-        start_date = request.GET.get('start_date', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
-        end_date = request.GET.get('end_date', datetime.now().strftime('%Y-%m-%d'))
-        
-        try:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        except ValueError:
-            messages.error(request, 'Fechas inválidas.')
-            return redirect('reports:list')
-        
-        # Agrupar compras por proveedor
-        suppliers = Supplier.objects.for_company(company).filter(
-            operations__type='purchase',
-            operations__date__gte=start_date,
-            operations__date__lte=end_date,
-            operations__company=company
-        ).annotate(
-            total_operations=Count('operations'),
-            total_purchases=Sum('operations__total')
-        ).filter(total_operations__gt=0).order_by('-total_purchases')
-        
-        # Exportar CSV si se solicita
-        if request.GET.get('format') == 'csv':
-            response = HttpResponse(content_type='text/csv; charset=utf-8')
-            response['Content-Disposition'] = f'attachment; filename="resumen_proveedores_{start_date}_{end_date}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow(['Proveedor', 'Código', 'Cantidad de Compras', 'Total Compras'])
-            
-            total_general = 0
-            for supplier in suppliers:
-                total = supplier.total_purchases or 0
-                total_general += total
-                writer.writerow([
-                    supplier.name,
-                    supplier.code,
-                    supplier.total_operations,
-                    f'{total:.2f}',
-                ])
-            
-            writer.writerow([])
-            writer.writerow(['TOTAL GENERAL', '', '', f'{total_general:.2f}'])
-            
-            return response
-        
-        # Renderizar template
-        context = {
-            'suppliers': suppliers,
-            'start_date': start_date,
-            'end_date': end_date,
-            'total_general': sum(s.total_purchases or 0 for s in suppliers),
-        }
-        return render(request, 'reports/summary_by_supplier.html', context)
+    def get(self, request, pk):
+        job = get_object_or_404(
+            ReportJob.objects.for_company(request.current_company),
+            pk=pk,
+            requested_by=request.user,
+        )
+        if not job.is_downloadable:
+            raise Http404('El archivo no está disponible.')
+        filename = job.file.name.rsplit('/', 1)[-1]
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=filename)
@@ -0,0 +1,19 @@
+"""
+Puntos de entrada de los procesos del pool de run_report_worker.
+
+Con el contexto spawn, cada proceso hijo importa este módulo antes de que Django
+esté configurado: por eso no importa modelos a nivel de módulo.
+"""
+
+import django
+
+
+def init_worker_process():
+    """Inicializa Django en el proceso hijo."""
+    django.setup()
+
+
+def run_job(job_id):
+    """Ejecuta un ReportJob reclamado (ver reports.services.run_report_job)."""
+    from reports.services import run_report_job
+    return run_report_job(job_id)
@@ -0,0 +1,25 @@
+"""
+Importador masivo de proveedores (core.utils.bulk_import).
+"""
+
+from core.utils.bulk_import import BulkImporter
+
+from .forms import SupplierForm
+from .models import Supplier
+
+
+class SupplierImporter(BulkImporter):
+    """Proveedores por código; acepta las columnas de la exportación CSV."""
+    model = Supplier
+    form_class = SupplierForm
+    fields = ('code', 'name', 'tax_id', 'email', 'phone', 'address', 'notes', 'active')
+    aliases = {
+        'tax_id': ('CUIT', 'RUT', 'NIT'),
+        'active': ('Estado',),
+    }
+    label = 'proveedores'
+
+    def after_import(self, result):
+        super().after_import(result)
+        from reports.engine import invalidate_reports_cache
+        invalidate_reports_cache(self.company)
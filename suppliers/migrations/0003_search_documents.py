@@ -0,0 +1,31 @@
+# Carga inicial de los documentos de búsqueda (core.utils.search)
+
+from django.db import migrations
+
+from core.utils.search import index_queryset
+
+# Copia congelada de Supplier.search_fields al momento de la migración
+SEARCH_FIELDS = ('code', 'name', 'tax_id', 'email')
+
+
+def build_search_documents(apps, schema_editor):
+    model = apps.get_model('suppliers', 'Supplier')
+    document_model = apps.get_model('core', 'SearchDocument')
+    index_queryset(model.objects.all(), fields=SEARCH_FIELDS, document_model=document_model)
+
+
+def delete_search_documents(apps, schema_editor):
+    document_model = apps.get_model('core', 'SearchDocument')
+    document_model.objects.filter(model='suppliers.supplier').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_searchdocument'),
+        ('suppliers', '0002_supplier_suppliers_s_company_6228e2_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_documents, delete_search_documents),
+    ]
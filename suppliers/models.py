@@ -19,6 +19,9 @@ class Supplier(CompanyModelMixin):
     notes = models.TextField('Notas', blank=True, null=True)
     active = models.BooleanField('Activo', default=True)
     
+    # Campos del documento de búsqueda (core.utils.search)
+    search_fields = ('code', 'name', 'tax_id', 'email')
+    
     objects = CompanyManager()
     
     class Meta:
@@ -105,7 +105,7 @@ class SupplierMultiTenantTestCase(TestCase):
         # Verificar que solo se muestran proveedores de company1
         self.assertEqual(response.status_code, 200)
         suppliers = response.context['suppliers']
-        self.assertEqual(suppliers.count(), 2)
+        self.assertEqual(len(suppliers), 2)
         self.assertIn(self.supplier1_company1, suppliers)
         self.assertIn(self.supplier2_company1, suppliers)
         self.assertNotIn(self.supplier1_company2, suppliers)
@@ -12,4 +12,5 @@ urlpatterns = [
     path('<int:pk>/editar/', views.SupplierUpdateView.as_view(), name='update'),
     path('<int:pk>/eliminar/', views.SupplierDeleteView.as_view(), name='delete'),
     path('exportar/', views.SupplierExportCSVView.as_view(), name='export_csv'),
+    path('importar/', views.SupplierImportView.as_view(), name='import'),
 ]
@@ -3,7 +3,6 @@
 from django.views.generic import ListView, CreateView, DetailView, UpdateView, DeleteView, View
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.db import models
 from core.mixins import (
     CompanyRequiredMixin, 
     CompanyContextMixin, 
@@ -11,14 +10,17 @@ from core.mixins import (
     CompanyObjectMixin,
     RoleRequiredMixin,
     HTMXResponseMixin,
+    KeysetPaginationMixin,
 )
 from core.constants import ROLE_ADMIN, ROLE_MANAGER, ROLE_OPERATOR
 from core.utils import log_audit
 from core.utils.request import get_client_ip
 from core.utils.security_services import check_anomalous_behavior
-from core.utils.csv_export import export_csv_response
+from core.utils.csv_export import export_csv_response, CSV_CHUNK_SIZE
+from core.views import BulkImportView
 from .models import Supplier
 from .forms import SupplierForm
+from .importers import SupplierImporter
 
 
 class SupplierListView(
@@ -26,6 +28,7 @@ class SupplierListView(
     CompanyContextMixin, 
     CompanyFilterMixin,
     HTMXResponseMixin,
+    KeysetPaginationMixin,
     ListView
 ):
     """
@@ -38,6 +41,7 @@ class SupplierListView(
     model = Supplier
     context_object_name = 'suppliers'
     paginate_by = 25
+    keyset_ordering = ('name', 'id')
     
     def get_queryset(self):
         """Filtra proveedores por empresa actual. El filtrado por empresa es automático por CompanyFilterMixin."""
@@ -50,12 +54,7 @@ class SupplierListView(
         # Aplicar búsqueda si existe
         search = self.request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                models.Q(name__icontains=search) |
-                models.Q(code__icontains=search) |
-                models.Q(email__icontains=search) |
-                models.Q(tax_id__icontains=search)
-            )
+            queryset = queryset.search(search)
         
         # Aplicar filtro de activos si existe
         active_filter = self.request.GET.get('active', '')
@@ -64,7 +63,7 @@ class SupplierListView(
         elif active_filter == '0':
             queryset = queryset.filter(active=False)
         
-        return queryset.order_by('name')
+        return queryset.order_by('name', 'id')
     
     def get_context_data(self, **kwargs):
         """Añade datos adicionales al contexto."""
@@ -254,12 +253,7 @@ class SupplierExportCSVView(
         # Aplicar búsqueda
         search = request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                models.Q(name__icontains=search) |
-                models.Q(code__icontains=search) |
-                models.Q(email__icontains=search) |
-                models.Q(tax_id__icontains=search)
-            )
+            queryset = queryset.search(search)
         
         # Aplicar filtro de activos
         active_filter = request.GET.get('active', '')
@@ -268,22 +262,33 @@ class SupplierExportCSVView(
         elif active_filter == '0':
             queryset = queryset.filter(active=False)
         
-        suppliers = queryset.order_by('name')
-        
-        # Preparar datos para CSV
+        # Preparar datos para CSV (streaming: sin materializar el queryset)
         headers = ['Código', 'Nombre', 'CUIT/RUT/NIT', 'Email', 'Teléfono', 'Dirección', 'Estado']
-        rows = []
-        
-        for supplier in suppliers:
-            rows.append([
-                supplier.code,
-                supplier.name,
-                supplier.tax_id or '',
-                supplier.email or '',
-                supplier.phone or '',
-                supplier.address or '',
-                'Activo' if supplier.active else 'Inactivo',
-            ])
+        suppliers = queryset.order_by('name').values_list(
+            'code', 'name', 'tax_id', 'email', 'phone', 'address', 'active'
+        ).iterator(chunk_size=CSV_CHUNK_SIZE)
+        rows = (
+            [
+                code,
+                name,
+                tax_id or '',
+                email or '',
+                phone or '',
+                address or '',
+                'Activo' if active else 'Inactivo',
+            ]
+            for code, name, tax_id, email, phone, address, active in suppliers
+        )
         
         filename = f'proveedores_{company.name.replace(" ", "_")}'
         return export_csv_response(filename, headers, rows)
+
+
+class SupplierImportView(BulkImportView):
+    """
+    Importación masiva de proveedores desde CSV/XLSX (upsert por código).
+    Protegido por tenant y roles (admin, manager).
+    """
+    importer_class = SupplierImporter
+    title = 'Proveedores'
+    list_url = reverse_lazy('suppliers:list')